@@ -1,107 +1,280 @@
-from flask import Flask, request, render_template, redirect, url_for, send_from_directory, jsonify
+from flask import Flask, request, render_template, redirect, url_for, jsonify, Response, stream_with_context
 import re
 import json
 import os
-import string
-import glob
-import sys
+import random
+import sqlite3
+import atexit
+import time
+import uuid
+
+import archive
+from attempts import ATTEMPT_LOG_FILENAME, AttemptLog
+from bundles import SubjectBundleCache
+from catalog import QuizCatalog, describe_quiz, subject_name
+from dedup import QUIZ_DUPLICATE_RATIO, DuplicateIndex
+import metrics
+from quiz_assets import QuizAssetCache, compress_body
+from quiz_parser import parse_quiz_from_content
+import quiz_upload
+from sampling import SubjectIndex
+from search import SearchIndex
+from stats import STATS_SNAPSHOT_FILENAME, AttemptStats
+from storage import open_storage
+from text_normalize import sanitize_filename
+from write_queue import WriteBehindQueue
 
 
 # --- PHẦN 1: KHỞI TẠO ỨNG DỤNG FLASK ---
 app = Flask(__name__)
 
-# Tạo thư mục 'data' nếu chưa tồn tại
-if not os.path.exists('data'):
-    os.makedirs('data')
+# Thư mục dữ liệu lấy từ QUIZ_DATA_DIR (mặc định 'data' trong thư mục làm việc); tạo nếu chưa tồn tại
+app.config['DATA_DIR'] = os.path.abspath(os.environ.get('QUIZ_DATA_DIR', 'data'))
+DATA_DIR = app.config['DATA_DIR']
+os.makedirs(DATA_DIR, exist_ok=True)
+
+# Backend lưu trữ: 'file' (mỗi bài một tệp JSON) hoặc 'sqlite' (data/quizzes.sqlite3)
+app.config['QUIZ_STORAGE'] = os.environ.get('QUIZ_STORAGE', 'file')
+storage = open_storage(app.config['QUIZ_STORAGE'], DATA_DIR)
+
+# Số đo hiệu năng xuất ra /metrics (định dạng văn bản Prometheus)
+registry = metrics.MetricsRegistry()
+request_seconds = registry.histogram('quiz_http_request_duration_seconds',
+                                     'Thời gian xử lý request theo route.', ('route', 'method'))
+requests_total = registry.counter('quiz_http_requests_total', 'Số request theo route và mã trạng thái.',
+                                  ('route', 'method', 'status'))
+parse_seconds = registry.histogram('quiz_parse_duration_seconds', 'Thời gian phân tích nội dung markdown của một bài.')
+parse_bytes = registry.counter('quiz_parse_bytes_total', 'Tổng số byte markdown đã phân tích.')
+storage_seconds = registry.histogram('quiz_storage_operation_duration_seconds',
+                                     'Thời gian các thao tác đọc/ghi của backend lưu trữ.', ('backend', 'operation'))
+template_seconds = registry.histogram('quiz_template_render_duration_seconds', 'Thời gian render template.',
+                                      ('template',))
+metrics.instrument_storage(storage, storage_seconds)
+
+# Đặt SLOW_REQUEST_PROFILE=<số giây> để lấy mẫu ngăn xếp và ghi tệp flamegraph (.folded) vào
+# PROFILE_DIR cho các request chậm hơn ngưỡng đó; mặc định tắt
+app.config['SLOW_REQUEST_PROFILE'] = float(os.environ.get('SLOW_REQUEST_PROFILE', '0'))
+app.config['PROFILE_DIR'] = os.environ.get('PROFILE_DIR', os.path.join(os.getcwd(), 'profiles'))
+profiler = None
+if app.config['SLOW_REQUEST_PROFILE'] > 0:
+    profiler = metrics.SlowRequestProfiler(app.config['SLOW_REQUEST_PROFILE'], app.config['PROFILE_DIR'])
+metrics.instrument_app(app, request_seconds, requests_total, template_seconds, profiler)
+
+# Nội dung JSON (rút gọn, nén sẵn gzip/brotli) và ETag của từng bài, tính lại một lần sau mỗi lần ghi
+assets = QuizAssetCache(storage)
+
+# URL JSON có tham số ?v=<phiên bản> được trình duyệt và proxy lưu đệm vĩnh viễn
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# Biên dịch sẵn template trang làm bài; Jinja giữ bản đã biên dịch trong bộ nhớ cho mọi request
+QUIZ_PAGE_TEMPLATE = 'quiz_page_template.html'
+app.jinja_env.get_template(QUIZ_PAGE_TEMPLATE)
+
+# Trang làm bài đã render và nén sẵn: khóa bài -> (phiên bản JSON, tên bài, CompressedBody)
+quiz_pages = {}
+
+# Service worker của trang làm bài: lưu đệm trang và dữ liệu theo phiên bản, xếp hàng góp ý khi mất mạng.
+# Trang làm bài trong bộ nhớ đệm của trình duyệt được kiểm tra lại ngầm tối đa một lần mỗi khoảng này (giây)
+QUIZ_SW_TEMPLATE = 'quiz_sw.js'
+app.config['SHELL_REVALIDATE_SECONDS'] = int(os.environ.get('SHELL_REVALIDATE_SECONDS', '60'))
+
+# Số câu hỏi mặc định và tối đa trong một trang của API /api/quiz/<khóa>/page/<số trang>
+app.config['QUESTION_PAGE_SIZE'] = int(os.environ.get('QUESTION_PAGE_SIZE', '20'))
+MAX_QUESTION_PAGE_SIZE = 200
+
+# Danh mục bài trắc nghiệm được dựng một lần khi khởi động, dùng cho trang chủ
+catalog = QuizCatalog(storage)
+
+# Chỉ mục câu hỏi theo môn cho API lấy mẫu đề ngẫu nhiên; số câu tối đa của một đề
+subject_index = SubjectIndex(catalog, assets)
+MAX_SAMPLE_SIZE = 500
+
+# Gói JSON nén sẵn gồm mọi bài (hoặc một nhóm bài) của một môn, bỏ khi một bài trong gói thay đổi
+subject_bundles = SubjectBundleCache(catalog, assets)
+
+# Chỉ mục tìm kiếm toàn văn, dựng trên luồng nền khi khởi động và cập nhật sau mỗi lần ghi
+search_index = SearchIndex(storage)
+search_index.start_background_build()
+MAX_SEARCH_RESULTS = 100
+
+# Chỉ mục MinHash/LSH để cảnh báo khi bài sắp tạo phần lớn trùng với một bài đã có
+duplicate_index = DuplicateIndex(storage)
+duplicate_index.start_background_build()
+registry.gauge('quiz_search_index_questions', 'Số câu hỏi trong chỉ mục tìm kiếm.', lambda: search_index.size)
+registry.gauge('quiz_duplicate_index_questions', 'Số câu hỏi trong chỉ mục trùng lặp.', lambda: duplicate_index.size)
+
+# Nhập hàng loạt: số luồng phân tích song song và tổng dung lượng giải nén tối đa (byte)
+app.config['IMPORT_WORKERS'] = int(os.environ.get('IMPORT_WORKERS', str(os.cpu_count() or 1)))
+app.config['IMPORT_MAX_BYTES'] = int(os.environ.get('IMPORT_MAX_BYTES', str(archive.DEFAULT_MAX_BYTES)))
+
+# Tải lên tệp markdown lớn qua /create/upload: dung lượng tối đa (byte)
+app.config['UPLOAD_MAX_BYTES'] = int(os.environ.get('UPLOAD_MAX_BYTES', str(quiz_upload.DEFAULT_MAX_BYTES)))
+
+# Số góp ý tối đa trong một request /suggest-update/batch
+MAX_SUGGESTION_BATCH = 100
+
+# Góp ý được gộp trong khoảng thời gian này (giây) rồi mới ghi; 0 để ghi ngay trong request
+app.config['SUGGEST_WRITE_DELAY'] = float(os.environ.get('SUGGEST_WRITE_DELAY', '0.5'))
+write_queue = WriteBehindQueue(storage, app.config['SUGGEST_WRITE_DELAY'], app.logger)
+atexit.register(write_queue.flush)
+registry.gauge('quiz_suggest_queue_pending', 'Số góp ý đang chờ ghi.', write_queue.pending_count)
+
+# Nhật ký lượt làm bài: ghi theo lô khi đủ ATTEMPT_BATCH_SIZE câu trả lời hoặc sau ATTEMPT_FLUSH_INTERVAL giây
+app.config['ATTEMPT_BATCH_SIZE'] = int(os.environ.get('ATTEMPT_BATCH_SIZE', '200'))
+app.config['ATTEMPT_FLUSH_INTERVAL'] = float(os.environ.get('ATTEMPT_FLUSH_INTERVAL', '1.0'))
+attempt_log = AttemptLog(os.path.join(DATA_DIR, ATTEMPT_LOG_FILENAME),
+                         app.config['ATTEMPT_BATCH_SIZE'], app.config['ATTEMPT_FLUSH_INTERVAL'])
+atexit.register(attempt_log.flush)
+# Số câu trả lời tối đa trong một request /attempt và định dạng mã lượt làm bài do trình duyệt tạo
+MAX_ATTEMPT_ANSWERS = 1000
+ATTEMPT_ID_RE = re.compile(r'[A-Za-z0-9_-]{1,64}')
+
+registry.gauge('quiz_attempt_log_pending', 'Số câu trả lời đang chờ ghi vào nhật ký.', attempt_log.pending_count)
+
+# Bộ đếm theo câu hỏi, cộng dần từ phần mới của nhật ký và lưu snapshot định kỳ
+attempt_stats = AttemptStats(attempt_log.path, os.path.join(DATA_DIR, STATS_SNAPSHOT_FILENAME))
+attempt_stats.start_background_refresh()
+atexit.register(attempt_stats.save_snapshot)
+# Số câu hỏi khó nhất hiển thị cho mỗi môn trên trang thống kê
+HARDEST_PER_SUBJECT = 10
 
 # --- PHẦN 2: CÁC HÀM TIỆN ÍCH ---
-def parse_quiz_from_content(content: str) -> list:
-    """Phân tích nội dung markdown từ một chuỗi thay vì một tệp."""
-    blocks = re.split(r'(\n\s*\*\*\d+\.\s*)', content)
-    full_blocks = [blocks[i] + blocks[i+1] for i in range(1, len(blocks)-1, 2)]
-    if blocks and blocks[0].strip().startswith('**'):
-        full_blocks.insert(0, blocks[0])
-    parser_regex = re.compile(
-        r"\*\*(\d+)\.\s*(?P<question>.*?)\*\*\s*"
-        r"(?P<options>(?:^[A-D]\..*$\n?)+)"
-        r"đáp án:\s*(?P<answer>[A-D])\s*"
-        r"Giải thích:\s*(?P<explanation>.*)",
-        re.MULTILINE | re.DOTALL | re.IGNORECASE
+def quiz_key(filename: str, extension: str):
+    """Lấy khóa bài trắc nghiệm từ tên tệp (ví dụ 's---a.json' -> 's---a'), None nếu không hợp lệ."""
+    if not filename or not filename.endswith(extension):
+        return None
+    key = filename[:-len(extension)]
+    if not key or key != os.path.basename(key) or key.startswith('.'):
+        return None
+    return key
+
+def send_compressed(compressed, mimetype):
+    """Trả về bản nén sẵn phù hợp với Accept-Encoding của trình duyệt, không nén lại trong request."""
+    encoding = compressed.negotiate(request.accept_encodings)
+    response = app.response_class(compressed.variants[encoding], mimetype=mimetype)
+    if encoding != 'identity':
+        response.content_encoding = encoding
+    response.vary.add('Accept-Encoding')
+    response.set_etag(compressed.variant_etag(encoding))
+    return response
+
+def build_quiz_page(key, asset):
+    """Render và nén trang làm bài; chỉ làm lại khi JSON hoặc tên bài thay đổi."""
+    entry = describe_quiz(key)
+    title = storage.get_title(key) or (entry['name'] if entry else key)
+    cached = quiz_pages.get(key)
+    if cached is not None and cached[0] == asset.version and cached[1] == title:
+        return cached[2]
+
+    html = render_template(
+        QUIZ_PAGE_TEMPLATE,
+        QUIZ_TITLE=title,
+        JSON_FILENAME=f"{key}.json",
+        API_URL=f"/api/quiz/{key}",
+        QUIZ_VERSION=asset.version,
+        PAGE_SIZE=app.config['QUESTION_PAGE_SIZE']
     )
-    option_regex = re.compile(r"^(?P<key>[A-D])\.\s*(?P<value>.*)$", re.MULTILINE)
-    quiz_data = []
-    for block in full_blocks:
-        match = parser_regex.search(block)
-        if match:
-            data = match.groupdict()
-            options_dict = {
-                opt_match.group('key'): opt_match.group('value').strip()
-                for opt_match in option_regex.finditer(data['options'])
-            }
-            quiz_data.append({
-                "id": int(match.group(1)),
-                "question": data['question'].strip(),
-                "options": options_dict,
-                "answer": data['answer'].strip().upper(),
-                "explanation": data['explanation'].strip()
-            })
-    return quiz_data
-
-def sanitize_filename(name: str) -> str:
-    """Chuẩn hóa chuỗi thành tên tệp hợp lệ."""
-    sanitized = name.lower()
-    sanitized = re.sub(r'[àáạảãâầấậẩẫăằắặẳẵ]', 'a', sanitized)
-    sanitized = re.sub(r'[èéẹẻẽêềếệểễ]', 'e', sanitized)
-    sanitized = re.sub(r'[ìíịỉĩ]', 'i', sanitized)
-    sanitized = re.sub(r'[òóọỏõôồốộổỗơờớợởỡ]', 'o', sanitized)
-    sanitized = re.sub(r'[ùúụủũưừứựửữ]', 'u', sanitized)
-    sanitized = re.sub(r'[ỳýỵỷỹ]', 'y', sanitized)
-    sanitized = re.sub(r'[đ]', 'd', sanitized)
-    sanitized = re.sub(r'\s+', '_', sanitized)
-    valid_chars = "-_.() %s%s" % (string.ascii_letters, string.digits)
-    sanitized = ''.join(c for c in sanitized if c in valid_chars)
-    return sanitized
+    page = compress_body(html.encode('utf-8'))
+    quiz_pages[key] = (asset.version, title, page)
+    return page
+
+def prerender_quiz_page(key):
+    """Được backend lưu trữ gọi sau mỗi lần ghi để trang mới được render và nén ngay lúc ghi."""
+    asset = assets.get(key)
+    if asset is None:
+        quiz_pages.pop(key, None)
+        return
+    with app.app_context():
+        build_quiz_page(key, asset)
+
+storage.subscribe(prerender_quiz_page)
+
+def render_quiz_page(key):
+    """Trang làm bài chỉ khác nhau ở tên bài và đường dẫn JSON nên không cần lưu thành tệp riêng."""
+    asset = assets.get(key) if key is not None else None
+    if asset is None:
+        return "Không tìm thấy bài kiểm tra.", 404
+    response = send_compressed(build_quiz_page(key, asset), 'text/html')
+    # Trang luôn được kiểm tra lại (rẻ nhờ ETag) vì nó trỏ tới phiên bản JSON mới nhất
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+def cache_by_version(response, asset):
+    """Đặt Last-Modified và Cache-Control theo tham số ?v= của request rồi xử lý request có điều kiện."""
+    response.last_modified = asset.last_modified
+    if request.args.get('v') == asset.version:
+        # URL có phiên bản không bao giờ đổi nội dung nên có thể lưu đệm vĩnh viễn
+        response.cache_control.public = True
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+def serve_quiz_json(key):
+    """Phục vụ JSON của bài kèm ETag/Last-Modified; trả về 304 nếu trình duyệt đã có bản mới nhất."""
+    asset = assets.get(key)
+    if asset is None:
+        return "Không tìm thấy bài kiểm tra.", 404
+    return cache_by_version(send_compressed(asset.json, 'application/json'), asset)
+
+def api_asset(key, flush=True):
+    """
+    QuizAsset cho các route /api/quiz/<khóa>, None nếu khóa không hợp lệ. Nếu bài còn góp ý đang chờ
+    thì ghi trước (trừ khi flush=False), còn không thì không chạm tới hàng đợi ghi trễ.
+    """
+    if quiz_key(f"{key}.json", '.json') is None:
+        return None
+    if flush and write_queue.is_pending(key):
+        write_queue.flush(key)
+    return assets.get(key)
+
+def question_body(key, question_id):
+    """
+    JSON (bytes) của một câu hỏi, hoặc None nếu không có.
+
+    Lấy từ bộ nhớ đệm nếu bài đã nạp; nếu không thì chỉ đọc câu đó từ backend thay vì nạp và nén
+    cả bài, vì kết quả tìm kiếm và trang thống kê chỉ cần vài câu rải rác trong nhiều bài.
+    """
+    asset = assets.current(key)
+    if asset is not None:
+        return asset.question_json(question_id)
+    question = storage.load_question(key, question_id)
+    if question is None:
+        return None
+    return json.dumps(question, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def question_page_size() -> int:
+    size = request.args.get('size', app.config['QUESTION_PAGE_SIZE'], type=int)
+    return max(1, min(size, MAX_QUESTION_PAGE_SIZE))
+
+def render_creator_page(form=None, duplicates=None, import_report=None):
+    """
+    Render trang chủ; `form` điền lại nội dung đã nhập, `duplicates` là các bài gần trùng cần cảnh báo,
+    `import_report` là kết quả của lần nhập hàng loạt vừa xong.
+    """
+    catalog.refresh_if_stale()
+    quizzes_by_subject = catalog.by_subject()
+    # Chỉ báo cáo kích thước cho các bài đã được nén trong bộ nhớ, không đọc lại dữ liệu từ backend
+    size_reports = {}
+    for quizzes in quizzes_by_subject.values():
+        for quiz in quizzes:
+            asset = assets.peek(quiz['key'])
+            if asset is not None:
+                size_reports[quiz['key']] = asset.size_report()
+    return render_template('creator_page.html', quizzes_by_subject=quizzes_by_subject, size_reports=size_reports,
+                           form=form or {}, duplicates=duplicates or [], import_report=import_report)
+
 
 # --- PHẦN 3: CÁC ROUTE CỦA MÁY CHỦ WEB ---
 @app.route('/')
 def index():
     """Hiển thị trang chủ để tạo bài trắc nghiệm và liệt kê các bài đã có."""
-    data_dir = os.path.join(os.getcwd(), 'data')
-    quiz_files = glob.glob(os.path.join(data_dir, '*.html'))
-    
-    quizzes_by_subject = {}
-
-    for f in quiz_files:
-        basename = os.path.basename(f)
-        if basename.startswith('creator_') or basename.startswith('quiz_page_'):
-            continue
-
-        if os.path.exists(os.path.join(data_dir, basename.replace('.html', '.json'))):
-            # Quy ước tên tệp: subject_name---quiz_name.html
-            parts = basename.replace('.html', '').split('---')
-            if len(parts) == 2:
-                subject_sanitized, quiz_name_sanitized = parts
-                subject_name = subject_sanitized.replace('_', ' ').title()
-                quiz_name = quiz_name_sanitized.replace('_', ' ').title()
-            else:
-                # Xử lý cho các tệp cũ không theo quy ước
-                subject_name = "Chưa phân loại"
-                quiz_name = basename.replace('.html', '').replace('_', ' ').title()
-
-            if subject_name not in quizzes_by_subject:
-                quizzes_by_subject[subject_name] = []
-            
-            quizzes_by_subject[subject_name].append({
-                'url': f'/data/{basename}', 
-                'name': quiz_name, 
-                'filename': basename
-            })
-        
-    return render_template('creator_page.html', quizzes_by_subject=quizzes_by_subject)
+    return render_creator_page()
 
 @app.route('/create', methods=['POST'])
 def create_quiz():
-    """Nhận dữ liệu từ form, xử lý và tạo các tệp."""
+    """Nhận dữ liệu từ form, phân tích và lưu bài trắc nghiệm."""
     subject_name = request.form.get('subject_name')
     quiz_title = request.form.get('quiz_name')
     md_content = request.form.get('md_content')
@@ -109,106 +282,562 @@ def create_quiz():
     if not all([subject_name, quiz_title, md_content]):
         return "Lỗi: Vui lòng cung cấp đầy đủ tên môn học, tên bài trắc nghiệm và nội dung.", 400
 
-    extracted_data = parse_quiz_from_content(md_content)
+    with parse_seconds.time():
+        extracted_data = parse_quiz_from_content(md_content)
+    parse_bytes.inc(len(md_content.encode('utf-8')))
     if not extracted_data:
         return "Lỗi: Không trích xuất được câu hỏi nào từ nội dung bạn cung cấp. Vui lòng kiểm tra lại định dạng.", 400
 
-    # Quy ước tên tệp mới: subject---quiz.html
+    # Quy ước tên tệp mới: subject---quiz (trang được render tại /data/subject---quiz.html)
     base_filename = f"{sanitize_filename(subject_name)}---{sanitize_filename(quiz_title)}"
-    json_filename = f"{base_filename}.json"
-    html_filename = f"{base_filename}.html"
-
-    data_dir = os.path.join(os.getcwd(), 'data')
-    with open(os.path.join(data_dir, json_filename), 'w', encoding='utf-8') as f:
-        json.dump(extracted_data, f, ensure_ascii=False, indent=4)
-
-    with open(os.path.join(app.root_path, 'templates', 'quiz_page_template.html'), 'r', encoding='utf-8') as f:
-        template_content = f.read()
-
-    # Quay lại sử dụng string.Template hoặc str.format vì HTML sẽ không chứa dữ liệu nữa
-    # mà sẽ fetch từ file JSON.
-    html_content = template_content.replace(
-        '{{ QUIZ_TITLE }}', quiz_title
-    ).replace(
-        '{{ JSON_FILENAME }}', json_filename
-    )
 
-    with open(os.path.join(data_dir, html_filename), 'w', encoding='utf-8') as f:
-        f.write(html_content)
+    # Cảnh báo trước khi lưu nếu phần lớn câu hỏi đã có trong một bài khác; người dùng có thể gửi lại để lưu
+    if not request.form.get('allow_duplicates'):
+        duplicates = []
+        for match in duplicate_index.check_quiz(extracted_data, exclude_key=base_filename):
+            entry = describe_quiz(match.key)
+            if entry and match.ratio >= QUIZ_DUPLICATE_RATIO:
+                duplicates.append({**entry, 'matched': match.matched, 'total': match.total,
+                                   'percent': round(match.ratio * 100)})
+        if duplicates:
+            return render_creator_page(form=request.form, duplicates=duplicates), 409
+
+    storage.save_quiz(base_filename, quiz_title, extracted_data)
 
+    catalog.add(base_filename)
     return redirect(url_for('index'))
 
-@app.route('/suggest-update', methods=['POST'])
-def suggest_update():
-    """Nhận góp ý và cập nhật trực tiếp vào tệp JSON của bài trắc nghiệm."""
-    data = request.get_json()
-    if not data:
-        return jsonify({"success": False, "message": "Dữ liệu không hợp lệ"}), 400
+@app.route('/create/upload', methods=['POST'])
+def upload_quiz():
+    """
+    Nhận tệp markdown làm thân request (tên môn và tên bài trong query string), phân tích và ghi dần
+    từng câu hỏi; trả về các sự kiện tiến độ và lỗi dạng NDJSON, mỗi dòng một sự kiện.
+    """
+    subject_name = request.args.get('subject_name')
+    quiz_title = request.args.get('quiz_name')
+    if not subject_name or not quiz_title:
+        return "Lỗi: Vui lòng cung cấp đầy đủ tên môn học và tên bài trắc nghiệm.", 400
+    max_bytes = app.config['UPLOAD_MAX_BYTES']
+    total = request.content_length
+    if total is not None and total > max_bytes:
+        return f"Lỗi: Tệp vượt quá {max_bytes // (1024 * 1024)} MB.", 413
+
+    base_filename = f"{sanitize_filename(subject_name)}---{sanitize_filename(quiz_title)}"
+    stream = request.stream
+
+    def generate():
+        # Không kiểm tra trùng lặp trước khi lưu như /create vì câu hỏi được ghi ngay khi phân tích xong
+        start = time.perf_counter()
+        with storage.open_writer(base_filename, quiz_title) as writer:
+            for event in quiz_upload.iter_upload(stream, writer, total, max_bytes):
+                if event['event'] == 'done':
+                    parse_seconds.observe(time.perf_counter() - start)
+                    parse_bytes.inc(event['bytes'])
+                    catalog.add(base_filename)
+                    event['url'] = describe_quiz(base_filename)['url']
+                yield json.dumps(event, ensure_ascii=False) + '\n'
+
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    response.cache_control.no_store = True
+    # Để proxy (nginx) chuyển từng sự kiện ngay thay vì đệm cả phản hồi
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/export')
+@app.route('/export/<subject>')
+def export_quizzes(subject=None):
+    """Tải về một môn (phần trước '---' của khóa) hoặc mọi bài dưới dạng một tệp .tar.gz, sinh dần từng bài."""
+    write_queue.flush()
+    keys = archive.subject_keys(storage, subject)
+    if not keys:
+        return "Không có bài trắc nghiệm nào để xuất.", 404
+    filename = f"{subject or 'tat_ca'}.tar.gz"
+    return Response(archive.iter_export(storage, keys), mimetype='application/gzip',
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+@app.route('/import', methods=['POST'])
+def import_quizzes():
+    """Nhập một tệp nén (.tar.gz, .zip) và/hoặc nhiều tệp .json, markdown; lưu tất cả trong một lần."""
+    subject = request.form.get('subject_name') or None
+    entries = []
+    try:
+        for upload in request.files.getlist('files'):
+            if not upload.filename:
+                continue
+            name = os.path.basename(upload.filename)
+            if archive.is_archive(name):
+                entries.extend(archive.read_archive(upload.stream, name, app.config['IMPORT_MAX_BYTES']))
+            else:
+                entries.append(archive.ImportEntry(name, upload.read()))
+    except ValueError as e:
+        return f"Lỗi: {e}", 400
+    if not entries:
+        return "Lỗi: Vui lòng chọn tệp nén hoặc các tệp .json/markdown cần nhập.", 400
 
+    try:
+        result = archive.import_entries(storage, entries, subject, app.config['IMPORT_WORKERS'])
+    except sqlite3.IntegrityError as e:
+        return f"Lỗi: Không lưu được các bài đã nhập: {e}", 409
+    except (ValueError, TypeError, sqlite3.Error) as e:
+        return f"Lỗi: Không lưu được các bài đã nhập: {e}", 400
+    # Danh mục chỉ được cập nhật một lần cho cả lô
+    catalog.add_many(result.saved)
+    report = {
+        'saved': [describe_quiz(key) for key in result.saved],
+        'errors': result.errors,
+    }
+    return render_creator_page(import_report=report), 200 if result.saved else 400
+
+def read_suggestion(data):
+    """
+    Kiểm tra một góp ý {quiz_filename, question_id, new_answer, new_explanation}.
+
+    Trả về (khóa bài, ID câu hỏi, các trường mới, None), hoặc (None, None, None, (thông báo, mã HTTP)).
+    """
     quiz_filename = data.get('quiz_filename')
     question_id = data.get('question_id') # Đây là kiểu int
     new_answer = data.get('new_answer')
     new_explanation = data.get('new_explanation')
 
     if not all([quiz_filename, question_id, new_answer, new_explanation]):
-        return jsonify({"success": False, "message": "Thiếu thông tin cần thiết"}), 400
+        return None, None, None, ("Thiếu thông tin cần thiết", 400)
 
-    # Tệp JSON giờ nằm trong thư mục 'data'
-    data_dir = os.path.join(os.getcwd(), 'data')
-    json_path = os.path.join(data_dir, quiz_filename)
-    
-    if not os.path.exists(json_path):
-        return jsonify({"success": False, "message": f"Không tìm thấy tệp {quiz_filename}"}), 404
+    key = quiz_key(quiz_filename, '.json')
+    if key is None:
+        return None, None, None, (f"Không tìm thấy tệp {quiz_filename}", 404)
+    # ID câu hỏi luôn là số nguyên; giá trị khác (chuỗi, danh sách) không thể khớp câu nào
+    if not isinstance(question_id, int) or isinstance(question_id, bool):
+        return None, None, None, (f"Không tìm thấy câu hỏi với ID {question_id}", 404)
+    return key, question_id, {'answer': new_answer, 'explanation': new_explanation}, None
 
-    try:
-        with open(json_path, 'r', encoding='utf-8') as f:
-            quiz_data = json.load(f)
-
-        question_found = False
-        for question in quiz_data:
-            if question.get('id') == question_id:
-                question['answer'] = new_answer
-                question['explanation'] = new_explanation
-                question_found = True
-                break
-        
-        if not question_found:
-            return jsonify({"success": False, "message": f"Không tìm thấy câu hỏi với ID {question_id}"}), 404
+@app.route('/suggest-update', methods=['POST'])
+def suggest_update():
+    """Nhận góp ý và cập nhật câu hỏi tương ứng (ghi ngay hoặc gộp qua hàng đợi ghi trễ)."""
+    data = request.get_json()
+    if not data:
+        return jsonify({"success": False, "message": "Dữ liệu không hợp lệ"}), 400
 
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(quiz_data, f, ensure_ascii=False, indent=4)
+    key, question_id, fields, error = read_suggestion(data)
+    if error is not None:
+        return jsonify({"success": False, "message": error[0]}), error[1]
+    quiz_filename = data.get('quiz_filename')
 
+    if app.config['SUGGEST_WRITE_DELAY'] > 0:
+        # Kiểm tra trên bản trong bộ nhớ đệm; góp ý chỉ sửa đáp án và giải thích nên không làm đổi ID câu hỏi
+        asset = assets.get(key)
+        if asset is None:
+            return jsonify({"success": False, "message": f"Không tìm thấy tệp {quiz_filename}"}), 404
+        if question_id not in asset.positions:
+            return jsonify({"success": False, "message": f"Không tìm thấy câu hỏi với ID {question_id}"}), 404
+        write_queue.submit(key, question_id, fields)
         return jsonify({"success": True, "message": "Cập nhật câu hỏi thành công!"})
 
+    try:
+        question_found = storage.update_question(key, question_id, fields)
+    except KeyError:
+        return jsonify({"success": False, "message": f"Không tìm thấy tệp {quiz_filename}"}), 404
     except Exception as e:
-        print(f"Lỗi khi cập nhật tệp JSON: {e}")
+        print(f"Lỗi khi cập nhật bài trắc nghiệm: {e}")
         return jsonify({"success": False, "message": "Đã xảy ra lỗi phía máy chủ."}), 500
 
+    if not question_found:
+        return jsonify({"success": False, "message": f"Không tìm thấy câu hỏi với ID {question_id}"}), 404
+
+    return jsonify({"success": True, "message": "Cập nhật câu hỏi thành công!"})
+
+@app.route('/suggest-update/batch', methods=['POST'])
+def suggest_update_batch():
+    """
+    Nhận nhiều góp ý trong một request (hàng đợi ngoại tuyến của trang làm bài gửi lại khi có mạng).
+
+    Các góp ý được gom theo bài và mỗi bài chỉ được ghi một lần. Trả về kết quả theo đúng thứ tự
+    gửi lên; lỗi 500 nghĩa là có thể gửi lại cả lô (góp ý chỉ đặt lại đáp án và giải thích nên
+    áp dụng lại không sao).
+    """
+    data = request.get_json(silent=True)
+    suggestions = data.get('suggestions') if isinstance(data, dict) else None
+    if not isinstance(suggestions, list) or not suggestions or len(suggestions) > MAX_SUGGESTION_BATCH:
+        return jsonify({"success": False, "message": f"Cần từ 1 đến {MAX_SUGGESTION_BATCH} góp ý"}), 400
+
+    results = [None] * len(suggestions)
+    # khóa bài -> {ID câu hỏi: các trường mới}, và các vị trí trong lô của từng câu
+    updates_by_key = {}
+    indexes_by_key = {}
+    for index, item in enumerate(suggestions):
+        key, question_id, fields, error = read_suggestion(item if isinstance(item, dict) else {})
+        if error is not None:
+            results[index] = {"success": False, "message": error[0]}
+            continue
+        # Góp ý sau cho cùng một câu hỏi thắng, như hàng đợi ghi trễ
+        updates_by_key.setdefault(key, {})[question_id] = fields
+        indexes_by_key.setdefault(key, []).append((index, question_id))
+
+    success = {"success": True, "message": "Cập nhật câu hỏi thành công!"}
+    for key, updates in updates_by_key.items():
+        missing = ()
+        if not storage.exists(key):
+            missing = None
+        elif app.config['SUGGEST_WRITE_DELAY'] > 0:
+            asset = assets.get(key)
+            if asset is None:
+                missing = None
+            else:
+                missing = {question_id for question_id in updates if question_id not in asset.positions}
+                for question_id, fields in updates.items():
+                    if question_id not in missing:
+                        write_queue.submit(key, question_id, fields)
+        else:
+            try:
+                missing = set(storage.update_questions(key, updates))
+            except KeyError:
+                missing = None
+            except Exception as e:
+                print(f"Lỗi khi cập nhật bài trắc nghiệm: {e}")
+                return jsonify({"success": False, "message": "Đã xảy ra lỗi phía máy chủ."}), 500
+        for index, question_id in indexes_by_key[key]:
+            if missing is None:
+                results[index] = {"success": False, "message": f"Không tìm thấy tệp {key}.json"}
+            elif question_id in missing:
+                results[index] = {"success": False, "message": f"Không tìm thấy câu hỏi với ID {question_id}"}
+            else:
+                results[index] = success
+
+    return jsonify({"success": True, "results": results})
+
+@app.route('/attempt', methods=['POST'])
+def record_attempt():
+    """Chấm các câu trả lời theo đáp án đang lưu và ghi vào nhật ký lượt làm bài (không chờ ghi đĩa)."""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"success": False, "message": "Dữ liệu không hợp lệ"}), 400
+
+    # Chấp nhận một câu trả lời ({question_id, answer}) hoặc cả danh sách trong "answers"
+    answers = data.get('answers')
+    if answers is None and 'question_id' in data:
+        answers = [{'question_id': data.get('question_id'), 'answer': data.get('answer')}]
+    if not isinstance(answers, list) or not answers or len(answers) > MAX_ATTEMPT_ANSWERS:
+        return jsonify({"success": False, "message": f"Cần từ 1 đến {MAX_ATTEMPT_ANSWERS} câu trả lời"}), 400
+
+    attempt_id = data.get('attempt_id') or uuid.uuid4().hex
+    if not isinstance(attempt_id, str) or not ATTEMPT_ID_RE.fullmatch(attempt_id):
+        return jsonify({"success": False, "message": "Mã lượt làm bài không hợp lệ"}), 400
+
+    key = data.get('quiz')
+    # Chấm theo đáp án đã lưu; không ghi hàng đợi góp ý để mỗi lượt chấm không phá khoảng gộp ghi
+    asset = api_asset(key, flush=False) if isinstance(key, str) else None
+    if asset is None:
+        return jsonify({"success": False, "message": "Không tìm thấy bài kiểm tra."}), 404
+
+    now = round(time.time(), 3)
+    results = []
+    events = []
+    for item in answers:
+        question_id = item.get('question_id') if isinstance(item, dict) else None
+        correct_answer = asset.answer(question_id) if isinstance(question_id, int) else None
+        if correct_answer is None:
+            results.append({"question_id": question_id, "message": "Không tìm thấy câu hỏi"})
+            continue
+        answer = str(item.get('answer') or '').strip().upper()
+        correct = answer == correct_answer
+        results.append({"question_id": question_id, "correct": correct, "answer": correct_answer})
+        events.append({
+            "time": now,
+            "attempt": attempt_id,
+            "quiz": key,
+            "version": asset.version,
+            "question_id": question_id,
+            "answer": answer,
+            "correct": correct
+        })
+    attempt_log.record(events)
+
+    return jsonify({
+        "success": True,
+        "attempt_id": attempt_id,
+        "graded": len(events),
+        "correct": sum(1 for event in events if event['correct']),
+        "results": results
+    })
+
+def refresh_stats():
+    """Ghi các câu trả lời đang chờ của tiến trình này rồi cộng phần nhật ký mới vào bộ đếm."""
+    attempt_log.flush()
+    attempt_stats.refresh()
+
+def question_stats_json(stats, asset=None):
+    result = {
+        "question_id": stats.question_id,
+        "attempts": stats.attempts,
+        "correct": stats.correct,
+        "correct_rate": round(stats.correct_rate, 4),
+        "options": stats.options
+    }
+    if asset is not None:
+        result["answer"] = asset.answer(stats.question_id)
+    return result
+
+@app.route('/stats')
+def stats_dashboard():
+    """Trang thống kê: các câu hỏi có tỷ lệ trả lời đúng thấp nhất của từng môn."""
+    refresh_stats()
+    min_attempts = max(1, request.args.get('min_attempts', 5, type=int))
+    ranking = attempt_stats.hardest_by_subject(HARDEST_PER_SUBJECT, min_attempts)
+
+    subjects = {}
+    for subject, questions in ranking.items():
+        rows = []
+        for stats in questions:
+            body = question_body(stats.key, stats.question_id)
+            entry = describe_quiz(stats.key)
+            if body is None or entry is None:
+                continue
+            question = json.loads(body)
+            rows.append({
+                "quiz": entry,
+                "question": question,
+                "stats": stats,
+                "percent": round(stats.correct_rate * 100, 1)
+            })
+        if rows:
+            subjects[subject] = rows
+    return render_template('stats_page.html', subjects=subjects, min_attempts=min_attempts,
+                           option_keys=('A', 'B', 'C', 'D', '?'))
+
+@app.route('/api/stats/quiz/<key>')
+def quiz_stats(key):
+    """Thống kê đã tổng hợp của một bài và từng câu hỏi trong bài."""
+    asset = api_asset(key)
+    if asset is None:
+        return jsonify({"success": False, "message": "Không tìm thấy bài kiểm tra."}), 404
+    refresh_stats()
+    summary = attempt_stats.quiz(key) or {"attempts": 0, "correct": 0, "questions": []}
+    return jsonify({
+        "quiz": key,
+        "attempts": summary['attempts'],
+        "correct": summary['correct'],
+        "correct_rate": round(summary['correct'] / summary['attempts'], 4) if summary['attempts'] else None,
+        "questions": [question_stats_json(stats, asset) for stats in summary['questions']]
+    })
+
 @app.route('/delete/<path:filename>', methods=['POST'])
 def delete_quiz(filename):
-    """Xóa tệp .html và .json của một bài trắc nghiệm."""
-    data_dir = os.path.join(os.getcwd(), 'data')
-    html_path = os.path.join(data_dir, filename)
-    json_path = os.path.join(data_dir, filename.replace('.html', '.json'))
-    
+    """Xóa dữ liệu câu hỏi của một bài trắc nghiệm."""
+    key = quiz_key(filename, '.html')
+    if key is None:
+        return "Không tìm thấy bài kiểm tra.", 404
+    # Trang .html tĩnh do các phiên bản cũ sinh ra, nếu vẫn còn trên đĩa
+    legacy_html_path = os.path.join(DATA_DIR, filename)
+
     try:
-        if os.path.exists(html_path): os.remove(html_path)
-        if os.path.exists(json_path): os.remove(json_path)
+        write_queue.flush(key)
+        if os.path.exists(legacy_html_path): os.remove(legacy_html_path)
+        storage.delete_quiz(key)
     except OSError as e:
         print(f"Lỗi khi xóa tệp: {e}")
         return "Đã xảy ra lỗi khi xóa bài kiểm tra.", 500
 
+    catalog.remove(key)
     return redirect(url_for('index'))
 
+@app.route('/api/quiz/<key>')
+def quiz_outline(key):
+    """Trả về thứ tự câu hỏi (xáo trộn bởi seed do máy chủ chọn) và thông tin phân trang của một bài."""
+    asset = api_asset(key)
+    if asset is None:
+        return jsonify({"success": False, "message": "Không tìm thấy bài kiểm tra."}), 404
+
+    page_size = question_page_size()
+    seed = None
+    if request.args.get('shuffle') != '0':
+        seed = request.args.get('seed', type=int)
+        if seed is None:
+            seed = random.randrange(2 ** 31)
+    order = asset.order(seed)
+
+    entry = describe_quiz(key)
+    response = jsonify({
+        "key": key,
+        "title": storage.get_title(key) or (entry['name'] if entry else key),
+        "version": asset.version,
+        "seed": seed,
+        "count": len(order),
+        "page_size": page_size,
+        "pages": -(-len(order) // page_size),
+        "order": [asset.ids[p] for p in order]
+    })
+    if 'seed' not in request.args and seed is not None:
+        # Mỗi lần tải là một seed mới nên không được lưu đệm
+        response.cache_control.no_store = True
+        return response
+    return cache_by_version(response, asset)
+
+@app.route('/api/quiz/<key>/page/<int:page>')
+def quiz_question_page(key, page):
+    """Trả về một trang câu hỏi theo thứ tự của seed (?seed=), hoặc theo thứ tự gốc nếu không có seed."""
+    asset = api_asset(key)
+    if asset is None:
+        return jsonify({"success": False, "message": "Không tìm thấy bài kiểm tra."}), 404
+
+    page_size = question_page_size()
+    seed = request.args.get('seed', type=int)
+    order = asset.order(seed)
+    pages = -(-len(order) // page_size)
+    if page >= pages:
+        return jsonify({"success": False, "message": f"Không có trang {page}."}), 404
+
+    questions = asset.questions_json(order[page * page_size:(page + 1) * page_size])
+    body = b'{"page":%d,"pages":%d,"page_size":%d,"questions":%s}' % (page, pages, page_size, questions)
+    response = app.response_class(body, mimetype='application/json')
+    response.set_etag(f"{asset.etag}-{'goc' if seed is None else seed}-{page_size}-{page}")
+    return cache_by_version(response, asset)
+
+@app.route('/api/quiz/<key>/question/<int:question_id>')
+def quiz_question(key, question_id):
+    """Trả về một câu hỏi theo ID."""
+    asset = api_asset(key)
+    if asset is None:
+        return jsonify({"success": False, "message": "Không tìm thấy bài kiểm tra."}), 404
+    body = asset.question_json(question_id)
+    if body is None:
+        return jsonify({"success": False, "message": f"Không tìm thấy câu hỏi với ID {question_id}"}), 404
+
+    response = app.response_class(body, mimetype='application/json')
+    response.set_etag(f"{asset.etag}-q{question_id}")
+    return cache_by_version(response, asset)
+
+@app.route('/api/subject/<subject>/sample')
+def sample_subject(subject):
+    """Tạo đề gồm ?n= câu hỏi ngẫu nhiên từ mọi bài của một môn; cùng ?seed= luôn cho lại đúng đề đó."""
+    count = request.args.get('n', type=int)
+    if not count or count < 1:
+        return jsonify({"success": False, "message": "Tham số n phải là số nguyên dương."}), 400
+    count = min(count, MAX_SAMPLE_SIZE)
+    seed = request.args.get('seed', type=int)
+    if seed is None:
+        seed = random.randrange(2 ** 31)
+
+    # Chấp nhận cả tên môn trong khóa (lich_su) lẫn tên hiển thị (Lich Su)
+    catalog.refresh_if_stale()
+    name = subject if subject in catalog.by_subject() else subject_name(subject)
+    # Chỉ ghi các góp ý đang chờ của các bài trong môn này
+    for entry in catalog.by_subject().get(name, []):
+        if write_queue.is_pending(entry['key']):
+            write_queue.flush(entry['key'])
+    result = subject_index.sample(name, count, seed)
+    if result is None:
+        return jsonify({"success": False, "message": f"Không tìm thấy môn học {subject}"}), 404
+    index, picked = result
+
+    header = json.dumps({
+        "subject": name,
+        "seed": seed,
+        "count": len(picked),
+        "total": index.total,
+        "versions": index.versions
+    }, ensure_ascii=False).encode('utf-8')
+    # Thêm khóa bài vào JSON có sẵn của từng câu vì ID câu hỏi chỉ duy nhất trong một bài
+    questions = b','.join(b'{"quiz":%s,%s' % (json.dumps(key).encode('utf-8'), body[1:]) for key, body in picked)
+    response = app.response_class(header[:-1] + b',"questions":[' + questions + b']}', mimetype='application/json')
+    response.cache_control.no_store = True
+    return response
+
+@app.route('/api/subject/<subject>/bundle')
+def subject_bundle(subject):
+    """
+    Trả về mọi bài của một môn trong một phản hồi JSON nén sẵn, hoặc chỉ các bài trong ?quizzes=
+    (tên bài trong khóa hoặc khóa đầy đủ, cách nhau bởi dấu phẩy).
+    """
+    catalog.refresh_if_stale()
+    name = subject if subject in catalog.by_subject() else subject_name(subject)
+    entries = catalog.by_subject().get(name)
+    if not entries:
+        return jsonify({"success": False, "message": f"Không tìm thấy môn học {subject}"}), 404
+
+    keys = None
+    if request.args.get('quizzes'):
+        by_name = {}
+        for entry in entries:
+            by_name[entry['key']] = entry['key']
+            by_name[entry['key'].split('---', 1)[-1]] = entry['key']
+        requested = [part.strip() for part in request.args['quizzes'].split(',') if part.strip()]
+        missing = [part for part in requested if part not in by_name]
+        if missing:
+            return jsonify({"success": False, "message": f"Không tìm thấy bài: {', '.join(missing)}"}), 404
+        keys = tuple(by_name[part] for part in requested)
+    # Ghi các góp ý đang chờ của các bài trong gói; lần ghi sẽ bỏ gói cũ qua thông báo của backend
+    for key in keys if keys is not None else [entry['key'] for entry in entries]:
+        if write_queue.is_pending(key):
+            write_queue.flush(key)
+
+    bundle = subject_bundles.get(name, keys)
+    if bundle is None:
+        return jsonify({"success": False, "message": f"Không tìm thấy môn học {subject}"}), 404
+    return cache_by_version(send_compressed(bundle.json, 'application/json'), bundle)
+
+@app.route('/search')
+def search_questions():
+    """Tìm câu hỏi trong mọi bài (không phân biệt dấu), trả về các kết quả đã xếp hạng."""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"success": False, "message": "Vui lòng nhập từ khóa tìm kiếm."}), 400
+    limit = max(1, min(request.args.get('limit', 20, type=int), MAX_SEARCH_RESULTS))
+    # ?subject= là tên môn trong khóa (ví dụ lich_su) để chỉ tìm trong một môn
+    subject = request.args.get('subject')
+    key_prefix = f"{sanitize_filename(subject)}---" if subject else None
+
+    start = time.perf_counter()
+    total, hits = search_index.search(query, limit, key_prefix)
+    results = []
+    for key, question_id, score in hits:
+        body = question_body(key, question_id)
+        entry = describe_quiz(key)
+        if body is None or entry is None:
+            continue
+        results.append({
+            "quiz": key,
+            "subject": entry['subject'],
+            "name": entry['name'],
+            "url": entry['url'],
+            "score": round(score, 3),
+            **json.loads(body)
+        })
+    return jsonify({
+        "query": query,
+        "total": total,
+        "took_ms": round((time.perf_counter() - start) * 1000, 2),
+        "hits": results
+    })
+
 @app.route('/data/<path:filename>')
 def serve_quiz_page(filename):
-    """Phục vụ các tệp HTML và JSON được tạo ra."""
-    data_dir = os.path.join(os.getcwd(), 'data')
-    return send_from_directory(data_dir, filename)
+    """Render trang làm bài từ template trong bộ nhớ và phục vụ dữ liệu JSON từ backend lưu trữ."""
+    key = quiz_key(filename, '.json')
+    if key is None:
+        return render_quiz_page(quiz_key(filename, '.html'))
+
+    # Ghi các góp ý đang chờ của bài này trước để người dùng luôn thấy thay đổi của chính mình
+    write_queue.flush(key)
+    return serve_quiz_json(key)
+
+@app.route('/quiz-sw.js')
+def quiz_service_worker():
+    """Service worker của trang làm bài, phục vụ ở gốc trang web để điều khiển cả /data/ và /api/quiz/."""
+    script = render_template(QUIZ_SW_TEMPLATE, SHELL_REVALIDATE_SECONDS=app.config['SHELL_REVALIDATE_SECONDS'],
+                             SUGGESTION_BATCH_SIZE=MAX_SUGGESTION_BATCH)
+    response = app.response_class(script, mimetype='application/javascript')
+    # Trình duyệt tự kiểm tra bản mới của service worker; không để proxy giữ bản cũ
+    response.cache_control.no_cache = True
+    return response
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Số đo hiệu năng của tiến trình này theo định dạng văn bản của Prometheus."""
+    return Response(registry.render(), content_type=metrics.CONTENT_TYPE)
 
 
 # --- PHẦN 4: CHẠY ỨNG DỤNG ---
 if __name__ == '__main__':
     print("Máy chủ đang chạy tại: http://127.0.0.1:5000")
     print("Mở trình duyệt và truy cập địa chỉ trên để sử dụng.")
+    print("Đây là máy chủ debug; để chạy thật với nhiều worker dùng: python serve.py")
     app.run(debug=True, port=5000)
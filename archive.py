@@ -0,0 +1,339 @@
+"""
+Xuất và nhập hàng loạt bài trắc nghiệm dưới dạng một tệp nén.
+
+Tệp xuất là một tar.gz gồm manifest.json (tên gốc của các bài) và một tệp <khóa>.json cho mỗi
+bài, được sinh dần từng bài để máy chủ không phải dựng cả tệp nén trong bộ nhớ. Khi nhập, tệp
+nén (.tar.gz, .tgz, .tar, .zip) hoặc nhiều tệp tải lên (.json theo định dạng trên, hoặc markdown)
+được phân tích song song (nhóm tiến trình ở dòng lệnh, nhóm luồng trong máy chủ) rồi được lưu bằng
+một lần save_many.
+
+    python archive.py export --subject lich_su --output lich_su.tar.gz
+    python archive.py import lich_su.tar.gz cac_bai_moi/*.md --subject "Lịch sử"
+"""
+import argparse
+import datetime
+import gzip
+import io
+import json
+import multiprocessing
+import os
+import string
+import sys
+import tarfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator, NamedTuple, Optional
+
+from quiz_parser import parse_quiz_from_content
+from storage import QuizStorage, open_storage
+from text_normalize import sanitize_filename
+
+MANIFEST_NAME = 'manifest.json'
+ARCHIVE_FORMAT = 1
+ARCHIVE_SUFFIXES = ('.tar.gz', '.tgz', '.tar', '.zip')
+MARKDOWN_SUFFIXES = ('.md', '.markdown', '.txt')
+EXPORT_GZIP_LEVEL = 6
+# Các trường bắt buộc của mỗi câu hỏi trong tệp .json được nhập
+QUESTION_FIELDS = ('id', 'question', 'options', 'answer', 'explanation')
+TEXT_FIELDS = ('question', 'answer', 'explanation')
+ANSWER_LETTERS = ('A', 'B', 'C', 'D')
+# Tổng dung lượng (sau giải nén) tối đa của một lần nhập, chặn các tệp nén "bom"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Chỉ phân tích song song khi tổng dữ liệu lớn hơn ngưỡng này; nhỏ hơn thì phân tích ngay tại chỗ
+PARALLEL_MIN_BYTES = 8 * 1024 * 1024
+KEY_CHARS = frozenset("-_.()" + string.ascii_letters + string.digits)
+
+
+class ImportEntry(NamedTuple):
+    # Tên tệp (không có thư mục) trong tệp nén hoặc của tệp tải lên
+    name: str
+    data: bytes
+    # Tên gốc của bài lấy từ manifest.json, nếu có
+    title: Optional[str] = None
+
+
+class ImportResult(NamedTuple):
+    # Các khóa đã lưu, theo thứ tự trong tệp nén
+    saved: list
+    # Các bộ (tên tệp, thông báo lỗi) của những mục bị bỏ qua
+    errors: list
+
+
+# --- PHẦN 1: XUẤT ---
+class _ChunkSink:
+    """Đích ghi của tarfile/gzip, gom các byte đã sinh để trả dần cho response."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self) -> bytes:
+        data, self._chunks = b''.join(self._chunks), []
+        return data
+
+
+def _add_file(tar: tarfile.TarFile, name: str, data: bytes, mtime: float):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = int(mtime)
+    info.mode = 0o644
+    tar.addfile(info, io.BytesIO(data))
+
+
+def iter_export(storage: QuizStorage, keys: list) -> Iterator[bytes]:
+    """Sinh dần nội dung tar.gz của các bài `keys`; mỗi lần chỉ giữ một bài trong bộ nhớ."""
+    sink = _ChunkSink()
+    now = time.time()
+    with gzip.GzipFile(fileobj=sink, mode='wb', compresslevel=EXPORT_GZIP_LEVEL, mtime=int(now)) as compressed:
+        with tarfile.open(fileobj=compressed, mode='w|', format=tarfile.PAX_FORMAT) as tar:
+            manifest = {
+                'format': ARCHIVE_FORMAT,
+                'exported_at': datetime.datetime.fromtimestamp(now).isoformat(timespec='seconds'),
+                'quizzes': {key: storage.get_title(key) for key in keys},
+            }
+            _add_file(tar, MANIFEST_NAME, json.dumps(manifest, ensure_ascii=False, indent=4).encode('utf-8'), now)
+            yield sink.take()
+            for key in keys:
+                questions = storage.load_quiz(key)
+                if questions is None:
+                    continue
+                version = storage.version(key)
+                data = json.dumps(questions, ensure_ascii=False, indent=4).encode('utf-8')
+                _add_file(tar, f"{key}.json", data, version[1] if version else now)
+                chunk = sink.take()
+                if chunk:
+                    yield chunk
+    yield sink.take()
+
+
+def subject_keys(storage: QuizStorage, subject: Optional[str] = None) -> list:
+    """Khóa của các bài thuộc một môn (phần trước '---' của khóa), hoặc của mọi bài nếu subject là None."""
+    keys = sorted(storage.list_quizzes())
+    if subject is None:
+        return keys
+    prefix = f"{subject}---"
+    return [key for key in keys if key.startswith(prefix)]
+
+
+# --- PHẦN 2: ĐỌC TỆP NÉN VÀ TỆP TẢI LÊN ---
+def is_archive(filename: str) -> bool:
+    return filename.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def _wanted(name: str) -> bool:
+    basename = os.path.basename(name)
+    return (not basename.startswith('.')
+            and (basename == MANIFEST_NAME or basename.lower().endswith(('.json',) + MARKDOWN_SUFFIXES)))
+
+
+def read_archive(fileobj, filename: str, max_bytes: int = DEFAULT_MAX_BYTES) -> list:
+    """
+    Đọc các mục bài trắc nghiệm từ một tệp .tar(.gz)/.tgz/.zip; tên gốc trong manifest.json được gán vào từng mục.
+
+    Ném ValueError nếu tệp hỏng hoặc tổng dung lượng giải nén vượt quá `max_bytes`.
+    """
+    files = []
+    total = 0
+
+    def add(name, size, read):
+        nonlocal total
+        total += size
+        if total > max_bytes:
+            raise ValueError(f"Tệp nén vượt quá {max_bytes // (1024 * 1024)} MB sau khi giải nén.")
+        files.append((os.path.basename(name), read()))
+
+    try:
+        if filename.lower().endswith('.zip'):
+            with zipfile.ZipFile(fileobj) as archive:
+                for info in archive.infolist():
+                    if not info.is_dir() and _wanted(info.filename):
+                        add(info.filename, info.file_size, lambda: archive.read(info))
+        else:
+            # Chế độ luồng ("r|*"): đọc tuần tự, không cần tua lại tệp tải lên
+            with tarfile.open(fileobj=fileobj, mode='r|*') as archive:
+                for member in archive:
+                    if member.isfile() and _wanted(member.name):
+                        add(member.name, member.size, lambda: archive.extractfile(member).read())
+    except (tarfile.TarError, zipfile.BadZipFile, EOFError, OSError) as e:
+        raise ValueError(f"Không đọc được tệp nén {filename}: {e}")
+
+    titles = {}
+    entries = []
+    for name, data in files:
+        if name == MANIFEST_NAME:
+            try:
+                titles = json.loads(data).get('quizzes', {})
+            except (ValueError, AttributeError):
+                raise ValueError(f"{MANIFEST_NAME} trong {filename} không hợp lệ.")
+        else:
+            entries.append((name, data))
+    return [ImportEntry(name, data, titles.get(os.path.splitext(name)[0])) for name, data in entries]
+
+
+# --- PHẦN 3: PHÂN TÍCH SONG SONG ---
+def _key_part(text: str) -> str:
+    # Giữ nguyên phần khóa đã hợp lệ (ví dụ khóa của tệp vừa xuất) để nhập lại đúng khóa cũ
+    if text and not text.startswith('.') and all(c in KEY_CHARS for c in text):
+        return text
+    return sanitize_filename(text)
+
+
+def entry_key(name: str, subject: Optional[str]) -> str:
+    """Khóa của một mục: giữ dạng subject---quiz của tên tệp, hoặc ghép với `subject` nếu tên chỉ có tên bài."""
+    stem = os.path.splitext(name)[0]
+    if '---' in stem:
+        subject_part, quiz_part = stem.split('---', 1)
+    elif subject:
+        subject_part, quiz_part = sanitize_filename(subject), stem
+    else:
+        raise ValueError("tên tệp không có dạng môn---bài và chưa nhập tên môn học")
+    key = f"{_key_part(subject_part)}---{_key_part(quiz_part)}"
+    if key.startswith('---') or key.endswith('---'):
+        raise ValueError("không tạo được khóa hợp lệ từ tên tệp")
+    return key
+
+
+def validate_questions(questions) -> list:
+    if not isinstance(questions, list) or not questions:
+        raise ValueError("tệp JSON phải là một danh sách câu hỏi")
+    for number, question in enumerate(questions, 1):
+        if not isinstance(question, dict) or any(field not in question for field in QUESTION_FIELDS):
+            raise ValueError(f"câu hỏi thứ {number} thiếu trường hoặc sai định dạng")
+        # bool là lớp con của int nhưng không phải một ID hợp lệ
+        if not isinstance(question['id'], int) or isinstance(question['id'], bool):
+            raise ValueError(f"câu hỏi thứ {number}: trường id phải là số nguyên")
+        for field in TEXT_FIELDS:
+            if not isinstance(question[field], str):
+                raise ValueError(f"câu hỏi thứ {number}: trường {field} phải là chuỗi")
+        if question['answer'] not in ANSWER_LETTERS:
+            raise ValueError(f"câu hỏi thứ {number}: đáp án phải là một trong A, B, C, D")
+        options = question['options']
+        if not isinstance(options, dict) or not all(isinstance(text, str) for text in options.values()):
+            raise ValueError(f"câu hỏi thứ {number}: options phải là một object với các giá trị là chuỗi")
+    return questions
+
+
+def parse_entry(entry: ImportEntry, subject: Optional[str] = None) -> tuple:
+    """Trả về (khóa, tên, câu hỏi) của một mục; ném ValueError nếu mục không hợp lệ."""
+    key = entry_key(entry.name, subject)
+    stem = os.path.splitext(entry.name)[0]
+    try:
+        text = entry.data.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        raise ValueError("tệp không phải văn bản UTF-8")
+    if entry.name.lower().endswith('.json'):
+        try:
+            questions = validate_questions(json.loads(text))
+        except json.JSONDecodeError as e:
+            raise ValueError(f"JSON không hợp lệ: {e}")
+        title = entry.title or stem.split('---')[-1].replace('_', ' ').title()
+    else:
+        questions = parse_quiz_from_content(text)
+        if not questions:
+            raise ValueError("không trích xuất được câu hỏi nào")
+        # Tên tệp markdown gốc (có dấu) là tên bài
+        title = entry.title or stem.split('---')[-1]
+    return key, title, questions
+
+
+def _safe_parse(entry: ImportEntry, subject: Optional[str]):
+    try:
+        return parse_entry(entry, subject)
+    except ValueError as e:
+        return str(e)
+
+
+def parse_entries(entries: list, subject: Optional[str] = None, workers: int = 1,
+                  processes: bool = False) -> tuple:
+    """
+    Phân tích các mục trên `workers` luồng (hoặc tiến trình nếu processes=True); trả về (các bộ (khóa,
+    tên, câu hỏi), các bộ (tên tệp, lỗi)).
+
+    Máy chủ chạy nhiều luồng nên không được fork (tiến trình con có thể kẹt ở một khóa đang bị luồng khác
+    giữ), còn spawn/forkserver lại nạp lại app.py trong mỗi tiến trình con: trong máy chủ các mục được
+    phân tích trên một nhóm luồng, dữ liệu đã bị chặn bởi IMPORT_MAX_BYTES. Dòng lệnh chỉ có một luồng
+    và dùng nhóm tiến trình spawn. Nếu nhiều mục có cùng khóa, mục sau cùng được giữ lại.
+    """
+    outcomes = None
+    total = sum(len(entry.data) for entry in entries)
+    if workers > 1 and len(entries) > 1 and total >= PARALLEL_MIN_BYTES:
+        count = min(workers, len(entries), os.cpu_count() or 1)
+        if processes:
+            try:
+                with ProcessPoolExecutor(count, mp_context=multiprocessing.get_context('spawn')) as pool:
+                    outcomes = list(pool.map(_safe_parse, entries, [subject] * len(entries)))
+            except BrokenProcessPool as e:
+                print(f"Không dùng được nhóm tiến trình ({e}), phân tích tuần tự.")
+        else:
+            with ThreadPoolExecutor(count, thread_name_prefix='import-parse') as pool:
+                outcomes = list(pool.map(_safe_parse, entries, [subject] * len(entries)))
+    if outcomes is None:
+        outcomes = [_safe_parse(entry, subject) for entry in entries]
+
+    parsed, errors = {}, []
+    for entry, outcome in zip(entries, outcomes):
+        if isinstance(outcome, str):
+            errors.append((entry.name, outcome))
+        else:
+            parsed[outcome[0]] = outcome
+    return list(parsed.values()), errors
+
+
+def import_entries(storage: QuizStorage, entries: list, subject: Optional[str] = None,
+                   workers: int = 1, processes: bool = False) -> ImportResult:
+    """Phân tích (xem parse_entries) rồi lưu mọi mục hợp lệ bằng một lần save_many (một giao dịch với SQLite)."""
+    parsed, errors = parse_entries(entries, subject, workers, processes)
+    if parsed:
+        storage.save_many(parsed)
+    return ImportResult([key for key, _, _ in parsed], errors)
+
+
+# --- PHẦN 4: DÒNG LỆNH ---
+def main():
+    parser = argparse.ArgumentParser(description="Xuất/nhập hàng loạt bài trắc nghiệm dưới dạng tệp nén.")
+    parser.add_argument("--data-dir", default=os.environ.get('QUIZ_DATA_DIR', 'data'), help="Thư mục dữ liệu.")
+    parser.add_argument("--storage", choices=("file", "packed", "sqlite"), default=os.environ.get('QUIZ_STORAGE', 'file'),
+                        help="Backend lưu trữ.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export", help="Xuất một môn (hoặc mọi môn) ra tệp .tar.gz.")
+    export_parser.add_argument("--subject", help="Phần môn học của khóa (ví dụ lich_su); mặc định xuất mọi bài.")
+    export_parser.add_argument("--output", required=True, help="Tệp .tar.gz đích.")
+    import_parser = commands.add_parser("import", help="Nhập các tệp nén, tệp .json hoặc markdown.")
+    import_parser.add_argument("paths", nargs='+', help="Các tệp cần nhập.")
+    import_parser.add_argument("--subject", help="Tên môn học cho các tệp không có dạng môn---bài.")
+    import_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Số tiến trình phân tích.")
+    args = parser.parse_args()
+
+    storage = open_storage(args.storage, args.data_dir)
+    start = time.perf_counter()
+    if args.command == 'export':
+        keys = subject_keys(storage, args.subject)
+        if not keys:
+            sys.exit("Không có bài trắc nghiệm nào để xuất.")
+        with open(args.output, 'wb') as f:
+            for chunk in iter_export(storage, keys):
+                f.write(chunk)
+        print(f"Đã xuất {len(keys)} bài vào {args.output} trong {time.perf_counter() - start:.2f} giây.")
+        return
+
+    entries = []
+    for path in args.paths:
+        name = os.path.basename(path)
+        with open(path, 'rb') as f:
+            entries.extend(read_archive(f, name) if is_archive(name) else [ImportEntry(name, f.read())])
+    result = import_entries(storage, entries, args.subject, args.workers, processes=True)
+    for name, error in result.errors:
+        print(f"  Bỏ qua {name}: {error}")
+    print(f"Đã nhập {len(result.saved)} bài trong {time.perf_counter() - start:.2f} giây.")
+
+
+if __name__ == '__main__':
+    main()
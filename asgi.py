@@ -0,0 +1,284 @@
+"""
+Ứng dụng ASGI cho chế độ chạy thật (xem serve.py), không cần thư viện ngoài.
+
+Các request đọc GET/HEAD /data/<khóa>.json và /data/<khóa>.html được phục vụ thẳng trên vòng lặp
+sự kiện từ bộ nhớ đệm đã nén sẵn của app.py: chỉ kiểm tra token phiên bản của backend, chọn bản
+nén và xử lý If-None-Match, không đi qua Flask. Khi bộ nhớ đệm chưa có bài, bài vừa đổi, bài còn
+góp ý chưa ghi hoặc request có điều kiện theo thời gian, request được chuyển cho ứng dụng Flask
+chạy trong một nhóm luồng, giống mọi route khác.
+
+    uvicorn asgi:application --workers 4
+"""
+import asyncio
+import io
+import os
+import sys
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.http import http_date, parse_accept_header, parse_etags, quote_etag
+
+import app as quiz_app
+
+# Số luồng chạy ứng dụng Flask cho các request không đi đường nhanh, trong mỗi tiến trình
+ASGI_THREADS = int(os.environ.get('ASGI_THREADS', '16'))
+DATA_ROUTE = '/data/<path:filename>'
+# Thân request lớn hơn ngưỡng này (hoặc gửi chunked) được đọc dần trong lúc route chạy thay vì đệm trước
+BUFFER_BODY_BYTES = 64 * 1024
+
+
+# --- PHẦN 1: CHẠY ỨNG DỤNG WSGI TRONG NHÓM LUỒNG ---
+class AsgiInput(io.RawIOBase):
+    """
+    wsgi.input đọc dần thân request từ receive() của ASGI, gọi từ luồng đang chạy ứng dụng WSGI.
+
+    Mỗi lần cần thêm dữ liệu, luồng chờ một thông điệp tiếp theo trên vòng lặp sự kiện, nên máy khách
+    chỉ gửi tiếp khi ứng dụng đọc (tệp tải lên không bị đệm trọn trong bộ nhớ trước khi route chạy).
+    """
+
+    def __init__(self, receive, loop: asyncio.AbstractEventLoop, first: bytes):
+        self._receive = receive
+        self._loop = loop
+        self._data = memoryview(first)
+        self._more = True
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._data and self._more:
+            message = asyncio.run_coroutine_threadsafe(self._receive(), self._loop).result()
+            if message['type'] == 'http.disconnect':
+                self._more = False
+                raise ConnectionResetError("Máy khách đã ngắt kết nối khi đang gửi dữ liệu")
+            self._data = memoryview(message.get('body', b''))
+            self._more = message.get('more_body', False)
+        size = min(len(buffer), len(self._data))
+        buffer[:size] = self._data[:size]
+        self._data = self._data[size:]
+        return size
+
+
+class WsgiBridge:
+    """
+    Chạy một ứng dụng WSGI cho các request ASGI.
+
+    Thân request gửi trong một thông điệp và response có Content-Length được đệm trọn (một lần chuyển
+    giữa luồng và vòng lặp sự kiện). Thân request nhiều phần được đọc dần qua AsgiInput, và response
+    dạng luồng (NDJSON của /create/upload, tệp nén của /export) được gửi đi ngay từng phần.
+    """
+
+    def __init__(self, wsgi_app, executor: ThreadPoolExecutor):
+        self.wsgi_app = wsgi_app
+        self.executor = executor
+
+    async def __call__(self, scope, receive, send):
+        loop = asyncio.get_running_loop()
+        body = bytearray()
+        stream = None
+        if self._buffer_body(scope):
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    return
+                body += message.get('body', b'')
+                if not message.get('more_body', False):
+                    break
+        else:
+            # Chưa đọc gì trước khi route chạy, để route có thể từ chối theo Content-Length (413) ngay
+            stream = io.BufferedReader(AsgiInput(receive, loop, b''))
+        environ = self._environ(scope, bytes(body), stream)
+        buffered = await loop.run_in_executor(self.executor, self._run, environ, send, loop)
+        if buffered is not None:
+            status, headers, chunks = buffered
+            await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+            await send({'type': 'http.response.body', 'body': b''.join(chunks)})
+
+    @staticmethod
+    def _buffer_body(scope) -> bool:
+        """Đệm trọn thân request khi không có thân hoặc Content-Length không quá BUFFER_BODY_BYTES."""
+        length = None
+        for name, value in scope.get('headers', []):
+            if name == b'transfer-encoding':
+                return False
+            if name == b'content-length':
+                length = value
+        return length is None or (length.isdigit() and int(length) <= BUFFER_BODY_BYTES)
+
+    def _run(self, environ, send, loop):
+        """Chạy ứng dụng; trả về (status, headers, các phần) để gửi một lần, hoặc None nếu đã gửi dần."""
+        response = {}
+        chunks = []
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+            return chunks.append
+
+        def send_now(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        result = self.wsgi_app(environ, start_response)
+        try:
+            if any(name == b'content-length' for name, _ in response.get('headers', ())):
+                for data in result:
+                    if data:
+                        chunks.append(data)
+                return response['status'], response['headers'], chunks
+
+            started = False
+            for data in result:
+                if chunks:
+                    data = b''.join(chunks) + data
+                    chunks.clear()
+                if not data:
+                    continue
+                if not started:
+                    send_now({'type': 'http.response.start', 'status': response['status'],
+                              'headers': response['headers']})
+                    started = True
+                send_now({'type': 'http.response.body', 'body': data, 'more_body': True})
+            if not started:
+                send_now({'type': 'http.response.start', 'status': response['status'], 'headers': response['headers']})
+            send_now({'type': 'http.response.body', 'body': b''.join(chunks)})
+            return None
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+
+    @staticmethod
+    def _environ(scope, body: bytes, stream=None) -> dict:
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+            # PEP 3333: đường dẫn là chuỗi byte UTF-8 được giải mã như latin-1
+            'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1] or 80),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': client[0],
+            'REMOTE_PORT': str(client[1]),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        if stream is None:
+            environ['CONTENT_LENGTH'] = str(len(body))
+            environ['wsgi.input'] = io.BytesIO(body)
+        for name, value in scope.get('headers', []):
+            name = name.decode('latin-1').upper().replace('-', '_')
+            value = value.decode('latin-1')
+            if name == 'CONTENT_TYPE':
+                environ['CONTENT_TYPE'] = value
+                continue
+            if name == 'CONTENT_LENGTH':
+                # Thân request đọc dần: giữ Content-Length của máy khách để route kiểm tra trước khi đọc
+                if stream is not None:
+                    environ['CONTENT_LENGTH'] = value
+                continue
+            key = f'HTTP_{name}'
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+        if stream is not None:
+            environ['wsgi.input'] = stream
+        # Cả hai luồng đều tự kết thúc ở cuối thân request, kể cả khi máy khách gửi chunked (không có
+        # Content-Length); thiếu khóa này Werkzeug sẽ trả về luồng rỗng cho request chunked
+        environ['wsgi.input_terminated'] = True
+        return environ
+
+
+# --- PHẦN 2: ĐƯỜNG NHANH CHO TRANG LÀM BÀI VÀ JSON ---
+def cached_data_response(scope, headers: dict):
+    """
+    (status, headers, body) của một request /data/ lấy từ bộ nhớ đệm, hoặc None nếu phải chuyển cho Flask.
+
+    Cùng header với send_compressed, cache_by_version và render_quiz_page của app.py.
+    """
+    filename = scope['path'][len('/data/'):]
+    json_key = quiz_app.quiz_key(filename, '.json')
+    key = json_key or quiz_app.quiz_key(filename, '.html')
+    if key is None or 'if-modified-since' in headers or quiz_app.write_queue.is_pending(key):
+        return None
+    asset = quiz_app.assets.current(key)
+    if asset is None:
+        return None
+    if json_key is not None:
+        compressed, content_type = asset.json, 'application/json'
+    else:
+        page = quiz_app.quiz_pages.get(key)
+        if page is None or page[0] != asset.version:
+            return None
+        compressed, content_type = page[2], 'text/html; charset=utf-8'
+
+    encoding = compressed.negotiate(parse_accept_header(headers.get('accept-encoding')))
+    etag = compressed.variant_etag(encoding)
+    response_headers = [(b'etag', quote_etag(etag).encode('latin-1')), (b'vary', b'Accept-Encoding')]
+    if json_key is not None:
+        response_headers.append((b'last-modified', http_date(asset.last_modified).encode('latin-1')))
+        query = urllib.parse.parse_qs(scope.get('query_string', b'').decode('latin-1'))
+        if query.get('v', [None])[0] == asset.version:
+            cache_control = f"public, max-age={quiz_app.IMMUTABLE_MAX_AGE}, immutable"
+        else:
+            cache_control = 'no-cache'
+    else:
+        cache_control = 'no-cache'
+    response_headers.append((b'cache-control', cache_control.encode('latin-1')))
+
+    if 'if-none-match' in headers and parse_etags(headers['if-none-match']).contains_weak(etag):
+        return 304, response_headers, b''
+    body = compressed.variants[encoding]
+    response_headers.append((b'content-type', content_type.encode('latin-1')))
+    response_headers.append((b'content-length', str(len(body)).encode('latin-1')))
+    if encoding != 'identity':
+        response_headers.append((b'content-encoding', encoding.encode('latin-1')))
+    return 200, response_headers, body
+
+
+# --- PHẦN 3: ỨNG DỤNG ASGI ---
+executor = ThreadPoolExecutor(ASGI_THREADS, thread_name_prefix='asgi-wsgi')
+wsgi = WsgiBridge(quiz_app.app, executor)
+
+
+def shutdown():
+    """Ghi mọi góp ý, câu trả lời và thống kê đang chờ trước khi tiến trình dừng."""
+    quiz_app.write_queue.flush()
+    quiz_app.attempt_log.flush()
+    quiz_app.attempt_stats.save_snapshot()
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await asyncio.get_running_loop().run_in_executor(executor, shutdown)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+
+    method = scope['method']
+    if method in ('GET', 'HEAD') and scope['path'].startswith('/data/'):
+        start = time.perf_counter()
+        headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope.get('headers', [])}
+        cached = cached_data_response(scope, headers)
+        if cached is not None:
+            status, response_headers, body = cached
+            await send({'type': 'http.response.start', 'status': status, 'headers': response_headers})
+            await send({'type': 'http.response.body', 'body': b'' if method == 'HEAD' else body})
+            quiz_app.request_seconds.observe(time.perf_counter() - start, route=DATA_ROUTE, method=method)
+            quiz_app.requests_total.inc(route=DATA_ROUTE, method=method, status=str(status))
+            return
+    await wsgi(scope, receive, send)
@@ -0,0 +1,100 @@
+import json
+import os
+import threading
+import time
+
+from storage import LOCK_DIRNAME, file_lock
+
+# Nhật ký lượt làm bài nằm trong thư mục dữ liệu, mỗi dòng là một câu trả lời đã chấm
+ATTEMPT_LOG_FILENAME = 'attempts.jsonl'
+
+
+class AttemptLog:
+    """
+    Nhật ký chỉ ghi thêm các câu trả lời đã chấm, mỗi dòng một sự kiện JSON.
+
+    record() chỉ nối sự kiện vào bộ đệm trong bộ nhớ rồi trả về ngay. Một luồng nền ghi cả lô
+    xuống tệp bằng một lần write và một lần fsync khi bộ đệm đủ `batch_size` sự kiện, hoặc khi
+    sự kiện cũ nhất đã chờ `interval` giây, nên cả lớp nộp bài cùng lúc cũng chỉ tốn vài lần
+    fsync. Tệp được mở với O_APPEND và khóa khi ghi nên nhiều worker có thể ghi chung một nhật ký.
+    """
+
+    def __init__(self, path: str, batch_size: int, interval: float):
+        self.path = path
+        self.batch_size = batch_size
+        self.interval = interval
+        self._lock_path = os.path.join(os.path.dirname(path), LOCK_DIRNAME, f"{os.path.basename(path)}.lock")
+        self._cond = threading.Condition()
+        # Các dòng JSON (bytes) đang chờ ghi và thời điểm (monotonic) lô hiện tại phải được ghi
+        self._buffer = []
+        self._deadline = None
+        self._thread = None
+        # Giữ thứ tự ghi giữa luồng nền và các lần flush() trực tiếp
+        self._write_lock = threading.Lock()
+
+    def record(self, events: list):
+        """Đưa các sự kiện vào bộ đệm; không chờ ghi xuống đĩa."""
+        if not events:
+            return
+        lines = [json.dumps(event, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+                 for event in events]
+        with self._cond:
+            self._buffer.extend(lines)
+            if self._deadline is None:
+                self._deadline = time.monotonic() + self.interval
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='attempt-log', daemon=True)
+                self._thread.start()
+            if len(self._buffer) >= self.batch_size:
+                self._cond.notify()
+
+    def pending_count(self) -> int:
+        with self._cond:
+            return len(self._buffer)
+
+    def flush(self):
+        """Ghi ngay mọi sự kiện đang chờ."""
+        with self._write_lock:
+            with self._cond:
+                lines = self._take()
+            self._write(lines)
+
+    def _take(self) -> list:
+        lines, self._buffer = self._buffer, []
+        self._deadline = None
+        return lines
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if not self._buffer:
+                        self._cond.wait()
+                        continue
+                    remaining = self._deadline - time.monotonic()
+                    if remaining <= 0 or len(self._buffer) >= self.batch_size:
+                        break
+                    self._cond.wait(remaining)
+            self.flush()
+
+    def _write(self, lines: list):
+        if not lines:
+            return
+        data = b''.join(lines)
+        try:
+            with file_lock(self._lock_path):
+                fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    view = memoryview(data)
+                    while view:
+                        view = view[os.write(fd, view):]
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+        except OSError as e:
+            # Đưa lô trở lại đầu bộ đệm để thử lại ở lần ghi sau
+            print(f"Lỗi khi ghi nhật ký lượt làm bài ({len(lines)} sự kiện): {e}")
+            with self._cond:
+                self._buffer[:0] = lines
+                if self._deadline is None:
+                    self._deadline = time.monotonic() + self.interval
@@ -0,0 +1,71 @@
+"""
+So sánh chi phí phục vụ JSON của bài trắc nghiệm khi nén trong từng request và khi dùng bản nén sẵn
+lúc ghi (quiz_assets), cùng thời gian truyền ước tính trên đường mạng chậm.
+
+Chạy từ thư mục gốc của dự án:
+    python -m benchmarks.bench_compression --questions 50 200 1000 --requests 200
+"""
+import argparse
+import gzip
+import json
+import time
+
+from benchmarks.bench_parser import make_bank
+from quiz_assets import brotli, compress_body
+from quiz_parser import parse_quiz_from_content
+
+# Mức nén thường dùng khi nén trong request (ví dụ nginx gzip_comp_level, Flask-Compress)
+ON_THE_FLY_GZIP_LEVEL = 6
+ON_THE_FLY_BROTLI_QUALITY = 4
+
+
+def per_request(func, body: bytes, requests: int) -> float:
+    """Thời gian trung bình (giây) cho mỗi request khi phải chạy `func(body)`."""
+    start = time.perf_counter()
+    for _ in range(requests):
+        func(body)
+    return (time.perf_counter() - start) / requests
+
+
+def transfer_ms(size: int, mbit_per_s: float) -> float:
+    return size * 8 / (mbit_per_s * 1_000_000) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo thời gian tiết kiệm được nhờ nén sẵn JSON của bài trắc nghiệm.")
+    parser.add_argument("--questions", type=int, nargs='+', default=[50, 200, 1000], help="Số câu hỏi của từng bài giả lập.")
+    parser.add_argument("--requests", type=int, default=200, help="Số request mô phỏng cho mỗi phép đo.")
+    parser.add_argument("--bandwidth", type=float, default=5.0, help="Băng thông giả định (Mbit/s) để ước tính thời gian truyền.")
+    args = parser.parse_args()
+
+    if brotli is None:
+        print("Chưa cài gói brotli: chỉ đo gzip.")
+
+    for num_questions in args.questions:
+        questions = parse_quiz_from_content(make_bank(num_questions))
+        original = json.dumps(questions, ensure_ascii=False, indent=4).encode('utf-8')
+
+        start = time.perf_counter()
+        body = json.dumps(questions, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        compressed = compress_body(body)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        print(f"\n{num_questions} câu hỏi — nén sẵn một lần lúc ghi: {build_ms:.1f} ms")
+        print(f"  {'biểu diễn':<12} {'kích thước':>12} {'truyền':>10}")
+        print(f"  {'gốc indent=4':<12} {len(original):>10} B {transfer_ms(len(original), args.bandwidth):>8.1f} ms")
+        for encoding, data in compressed.variants.items():
+            print(f"  {encoding:<12} {len(data):>10} B {transfer_ms(len(data), args.bandwidth):>8.1f} ms")
+
+        on_the_fly = {'gzip': lambda b: gzip.compress(b, compresslevel=ON_THE_FLY_GZIP_LEVEL)}
+        if brotli is not None:
+            on_the_fly['br'] = lambda b: brotli.compress(b, quality=ON_THE_FLY_BROTLI_QUALITY)
+        precompressed = per_request(lambda b: compressed.variants['gzip'], body, args.requests)
+        for encoding, func in on_the_fly.items():
+            elapsed = per_request(func, body, args.requests)
+            print(f"  nén {encoding} trong request: {elapsed * 1000:7.3f} ms/request, "
+                  f"nén sẵn: {precompressed * 1000:7.4f} ms/request "
+                  f"→ tiết kiệm {(elapsed - precompressed) * args.requests * 1000:.0f} ms CPU cho {args.requests} request")
+
+
+if __name__ == '__main__':
+    main()
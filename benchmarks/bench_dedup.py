@@ -0,0 +1,78 @@
+"""
+Đo thời gian dựng chỉ mục câu hỏi gần trùng (dedup.py) và độ phủ trên một kho có cài sẵn bản sao.
+
+Chạy từ thư mục gốc của dự án:
+    python -m benchmarks.bench_dedup --questions 100000 --duplicates 0.1
+"""
+import argparse
+import random
+import shutil
+import tempfile
+import time
+
+from benchmarks.bench_search import make_quizzes
+from dedup import DuplicateIndex
+from storage import FileStorage
+
+
+def near_copy(rng: random.Random, question: dict) -> dict:
+    """Bản sao sửa nhẹ: thay một âm tiết của câu hỏi và đảo thứ tự các lựa chọn."""
+    words = question['question'].split()
+    words[rng.randrange(len(words))] = "khác"
+    options = list(question['options'].values())
+    rng.shuffle(options)
+    return {**question, "question": ' '.join(words), "options": dict(zip("ABCD", options))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo tốc độ và độ phủ của phát hiện câu hỏi gần trùng.")
+    parser.add_argument("--questions", type=int, default=100000, help="Tổng số câu hỏi của kho giả lập.")
+    parser.add_argument("--per-quiz", type=int, default=500, help="Số câu hỏi mỗi bài.")
+    parser.add_argument("--duplicates", type=float, default=0.1, help="Tỷ lệ câu hỏi được chép sang bài khác.")
+    args = parser.parse_args()
+
+    rng = random.Random(2)
+    quizzes = list(make_quizzes(args.questions, args.per_quiz))
+    # Chép một phần câu hỏi (đã sửa nhẹ) sang cuối một bài ngẫu nhiên khác
+    planted = set()
+    for _ in range(int(args.questions * args.duplicates)):
+        source_key, _, source = rng.choice(quizzes)
+        target_key, _, target = rng.choice(quizzes)
+        question = rng.choice(source)
+        copy = {**near_copy(rng, question), "id": len(target) + 1}
+        target.append(copy)
+        planted.add(((source_key, question['id']), (target_key, copy['id'])))
+
+    data_dir = tempfile.mkdtemp(prefix="bench_dedup_")
+    try:
+        storage = FileStorage(data_dir)
+        storage.save_many(quizzes)
+        total = sum(len(questions) for _, _, questions in quizzes)
+        print(f"Kho giả lập: {total} câu hỏi trong {len(quizzes)} bài, {len(planted)} bản sao sửa nhẹ")
+
+        index = DuplicateIndex(storage)
+        start = time.perf_counter()
+        index.refresh()
+        print(f"Dựng chỉ mục: {time.perf_counter() - start:.2f} giây, {len(index._buckets)} nhóm LSH")
+
+        start = time.perf_counter()
+        clusters = index.clusters()
+        print(f"Gom cụm: {time.perf_counter() - start:.2f} giây, {len(clusters)} cụm")
+
+        cluster_of = {doc: number for number, group in enumerate(clusters) for doc in group}
+        found = sum(1 for a, b in planted if a in cluster_of and cluster_of.get(a) == cluster_of.get(b))
+        print(f"Độ phủ: {found}/{len(planted)} bản sao được gom cùng cụm với câu gốc ({found / len(planted):.1%})")
+        planted_docs = {doc for pair in planted for doc in pair}
+        spurious = sum(1 for doc in cluster_of if doc not in planted_docs)
+        print(f"Câu hỏi bị gom nhầm (không thuộc cặp nào được cài): {spurious}")
+
+        key, _, questions = quizzes[0]
+        start = time.perf_counter()
+        index.check_quiz(questions, exclude_key=key)
+        print(f"Kiểm tra một bài {len(questions)} câu khi tạo: {(time.perf_counter() - start) * 1000:.1f} ms")
+    finally:
+        shutil.rmtree(data_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+So sánh text_normalize (một bảng str.translate, nhớ kết quả theo tên) với cách cũ dùng một lượt re.sub
+cho mỗi nguyên âm, trên tên môn/bài và trên nội dung câu hỏi như khi lập chỉ mục tìm kiếm.
+
+Chạy từ thư mục gốc của dự án:
+    python -m benchmarks.bench_normalize --names 5000 --questions 2000 --repeat 5
+"""
+import argparse
+import random
+import re
+import string
+import unicodedata
+
+from benchmarks.bench_parser import make_bank, measure
+from quiz_parser import parse_quiz_from_content
+from text_normalize import fold_diacritics, sanitize_filename
+
+# --- PHẦN 1: CÁCH CHUẨN HÓA CŨ (ĐỂ ĐỐI CHIẾU) ---
+LEGACY_PATTERNS = [
+    (re.compile(r'[àáạảãâầấậẩẫăằắặẳẵ]'), 'a'),
+    (re.compile(r'[èéẹẻẽêềếệểễ]'), 'e'),
+    (re.compile(r'[ìíịỉĩ]'), 'i'),
+    (re.compile(r'[òóọỏõôồốộổỗơờớợởỡ]'), 'o'),
+    (re.compile(r'[ùúụủũưừứựửữ]'), 'u'),
+    (re.compile(r'[ỳýỵỷỹ]'), 'y'),
+    (re.compile(r'[đ]'), 'd'),
+]
+
+
+def legacy_fold(text: str) -> str:
+    """Bản sao của catalog.fold_diacritics trước khi chuyển sang text_normalize."""
+    folded = text.lower()
+    for pattern, replacement in LEGACY_PATTERNS:
+        folded = pattern.sub(replacement, folded)
+    return folded
+
+
+def legacy_sanitize(name: str) -> str:
+    """Bản sao của catalog.sanitize_filename trước khi chuyển sang text_normalize."""
+    sanitized = legacy_fold(name)
+    sanitized = re.sub(r'\s+', '_', sanitized)
+    valid_chars = "-_.() %s%s" % (string.ascii_letters, string.digits)
+    sanitized = ''.join(c for c in sanitized if c in valid_chars)
+    return sanitized
+
+
+# --- PHẦN 2: DỮ LIỆU GIẢ LẬP ---
+SYLLABLES = "Lịch Sử Địa Lý Toán Học Vật Lý Hóa Sinh Ngữ Văn Tiếng Anh Chương Bài Ôn Tập Kiểm Tra Giữa Kỳ".split()
+
+
+def make_names(count: int, distinct: int, seed: int = 0) -> list:
+    """`count` tên môn/bài lấy lặp lại từ `distinct` tên khác nhau, như khi dựng danh mục nhiều lần."""
+    rng = random.Random(seed)
+    pool = [' '.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 6))) + f" {i}" for i in range(distinct)]
+    return [rng.choice(pool) for _ in range(count)]
+
+
+def check_equivalent(names: list, texts: list):
+    for name in names:
+        assert sanitize_filename(name) == legacy_sanitize(name), name
+        # Văn bản dạng NFD cho cùng kết quả với dạng NFC
+        assert sanitize_filename(unicodedata.normalize('NFD', name)) == legacy_sanitize(name), name
+    for text in texts:
+        assert fold_diacritics(text) == legacy_fold(text)
+
+
+# --- PHẦN 3: ĐO ĐẠC ---
+def main():
+    parser = argparse.ArgumentParser(description="So sánh text_normalize với cách chuẩn hóa cũ.")
+    parser.add_argument("--names", type=int, default=5000, help="Số tên cần chuẩn hóa.")
+    parser.add_argument("--distinct", type=int, default=500, help="Số tên khác nhau trong đó.")
+    parser.add_argument("--questions", type=int, default=2000, help="Số câu hỏi cần bỏ dấu.")
+    parser.add_argument("--repeat", type=int, default=5, help="Số lần lặp, lấy lần nhanh nhất.")
+    args = parser.parse_args()
+
+    names = make_names(args.names, args.distinct)
+    texts = [
+        '\0'.join((q['question'], *q['options'].values(), q['explanation']))
+        for q in parse_quiz_from_content(make_bank(args.questions))
+    ]
+    check_equivalent(names[:args.distinct], texts[:200])
+
+    def sanitize_uncached(batch):
+        for name in batch:
+            sanitize_filename.__wrapped__(name)
+
+    cases = [
+        (f"sanitize_filename x{len(names)}", names, (
+            ("cũ (re.sub)", lambda batch: [legacy_sanitize(n) for n in batch]),
+            ("translate", sanitize_uncached),
+            ("translate + lru", lambda batch: [sanitize_filename(n) for n in batch]),
+        )),
+        (f"fold_diacritics x{len(texts)} câu", texts, (
+            ("cũ (re.sub)", lambda batch: [legacy_fold(t) for t in batch]),
+            ("translate", lambda batch: [fold_diacritics(t) for t in batch]),
+        )),
+    ]
+    for title, data, variants in cases:
+        print(f"\n{title}")
+        baseline = None
+        for label, func in variants:
+            best = measure(func, data, args.repeat)
+            baseline = baseline or best
+            print(f"  {label:<16} {best * 1000:9.2f} ms  (x{baseline / best:.1f})")
+
+
+if __name__ == '__main__':
+    main()
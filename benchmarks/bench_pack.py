@@ -0,0 +1,120 @@
+"""
+So sánh định dạng nhị phân .qpk (PackedStorage) với tệp JSON (FileStorage) cho các ngân hàng lớn:
+kích thước tệp, nạp cả bài, đọc một câu hỏi theo ID và sửa một câu hỏi.
+
+Chạy từ thư mục gốc của dự án:
+    python -m benchmarks.bench_pack --questions 1000 20000 --repeat 20
+
+Kiểm tra bài tải lên dạng luồng (QuizWriter) được lưu giống hệt save_quiz trên mọi backend (thoát với mã 1 nếu lệch):
+    python -m benchmarks.bench_pack --check 200
+"""
+import argparse
+import io
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_parser import make_bank
+from quiz_parser import parse_quiz_from_content
+from quiz_upload import iter_upload
+from storage import open_storage
+
+QUIZ_KEY = 'bench---bai'
+UPLOAD_KEY = 'bench---tai-len'
+# Các ký tự mà str.splitlines (và textwrap) coi là xuống dòng nhưng bộ phân tích giữ nguyên trong nội dung
+CHECK_CHARS = ('\u2028', '\u2029', '\x85', '\x0b', '\x0c', '\x1c', '\x1d', '\x1e', '\r', '\t', '"', '\\')
+
+
+def per_call_ms(func, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def bench_backend(kind: str, data_dir: str, questions: list, repeat: int) -> dict:
+    storage = open_storage(kind, data_dir)
+    storage.save_quiz(QUIZ_KEY, "Bài đo", questions)
+    rng = random.Random(0)
+    ids = [rng.choice(questions)['id'] for _ in range(repeat)]
+    lookups = iter(ids * 2)
+    return {
+        'size_kb': os.path.getsize(storage.quiz_path(QUIZ_KEY)) / 1024,
+        'load_ms': per_call_ms(lambda: storage.load_quiz(QUIZ_KEY), repeat),
+        'question_ms': per_call_ms(lambda: storage.load_question(QUIZ_KEY, next(lookups)), repeat),
+        'update_ms': per_call_ms(
+            lambda: storage.update_question(QUIZ_KEY, next(lookups), {"explanation": "Đã sửa."}), repeat),
+    }
+
+
+def check_upload(kind: str, count: int, seed: int = 0) -> list:
+    """
+    Tải lên `count` ngân hàng ngẫu nhiên (chèn CHECK_CHARS) qua iter_upload và so sánh bài đã lưu với
+    save_quiz của cùng các câu hỏi; trả về các tài liệu cho kết quả khác.
+    """
+    rng = random.Random(seed)
+    root = tempfile.mkdtemp(prefix="bench_pack_")
+    mismatches = []
+    try:
+        storage = open_storage(kind, root)
+        for _ in range(count):
+            content = make_bank(rng.randint(1, 5), seed=rng.randrange(1 << 30))
+            chars = list(content)
+            for _ in range(rng.randint(1, 10)):
+                chars.insert(rng.randrange(len(chars) + 1), rng.choice(CHECK_CHARS))
+            content = ''.join(chars)
+            questions = parse_quiz_from_content(content)
+            if not questions:
+                continue
+            storage.save_quiz(QUIZ_KEY, "Bài đo", questions)
+            with storage.open_writer(UPLOAD_KEY, "Bài đo") as writer:
+                events = list(iter_upload(io.BytesIO(content.encode('utf-8')), writer, None))
+            same = events[-1]['event'] == 'done' and storage.load_quiz(UPLOAD_KEY) == storage.load_quiz(QUIZ_KEY)
+            if same and kind == 'file':
+                with open(storage.quiz_path(UPLOAD_KEY), 'rb') as a, open(storage.quiz_path(QUIZ_KEY), 'rb') as b:
+                    same = a.read() == b.read()
+            if not same:
+                mismatches.append(content)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="So sánh tệp .qpk với tệp JSON.")
+    parser.add_argument("--questions", type=int, nargs='+', default=[1000, 20000], help="Số câu hỏi của mỗi bài giả lập.")
+    parser.add_argument("--repeat", type=int, default=20, help="Số lần lặp mỗi phép đo.")
+    parser.add_argument("--check", type=int, metavar="N",
+                        help="Chỉ so sánh N bài tải lên dạng luồng với save_quiz trên từng backend.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed của các ngân hàng ngẫu nhiên cho --check.")
+    args = parser.parse_args()
+
+    if args.check:
+        failed = False
+        for kind in ('file', 'packed', 'sqlite'):
+            mismatches = check_upload(kind, args.check, args.seed)
+            print(f"{kind}: {len(mismatches)}/{args.check} bài tải lên khác với save_quiz.")
+            for content in sorted(mismatches, key=len)[:3]:
+                print(f"  {content!r}")
+            failed = failed or bool(mismatches)
+        sys.exit(1 if failed else 0)
+
+    columns = ('size_kb', 'load_ms', 'question_ms', 'update_ms')
+    for num_questions in args.questions:
+        questions = parse_quiz_from_content(make_bank(num_questions))
+        print(f"\n{num_questions} câu hỏi")
+        print(f"  {'backend':<8}" + ''.join(f"{name:>14}" for name in columns))
+        for kind in ('file', 'packed'):
+            root = tempfile.mkdtemp(prefix="bench_pack_")
+            try:
+                results = bench_backend(kind, root, questions, args.repeat)
+            finally:
+                shutil.rmtree(root, ignore_errors=True)
+            print(f"  {kind:<8}" + ''.join(f"{results[name]:>14.2f}" for name in columns))
+
+
+if __name__ == '__main__':
+    main()
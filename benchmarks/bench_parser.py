@@ -0,0 +1,203 @@
+"""
+So sánh tốc độ giữa bộ phân tích theo dòng (quiz_parser) và cách cũ dùng re.split + regex DOTALL.
+
+Chạy từ thư mục gốc của dự án:
+    python -m benchmarks.bench_parser --questions 20000 --repeat 3
+
+Kiểm tra hai bộ phân tích cho cùng kết quả trên các tài liệu sinh ngẫu nhiên (thoát với mã 1 nếu lệch):
+    python -m benchmarks.bench_parser --check 200000
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from quiz_parser import iter_blocks, iter_questions, parse_quiz_from_content
+
+# --- PHẦN 1: DỮ LIỆU GIẢ LẬP ---
+WORDS = (
+    "câu hỏi đáp án giải thích mạng máy tính giao thức dữ liệu hệ điều hành bộ nhớ "
+    "tiến trình luồng khởi nghiệp đổi mới sáng tạo thị trường khách hàng sản phẩm"
+).split()
+
+
+def _sentence(rng: random.Random, min_words: int, max_words: int) -> str:
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words))).capitalize()
+
+
+def make_bank(num_questions: int, seed: int = 0, newline: str = '\n') -> str:
+    """Sinh một ngân hàng câu hỏi markdown đúng định dạng `**N.` / `A.` / `đáp án:` / `Giải thích:`."""
+    rng = random.Random(seed)
+    parts = ["# Ngân hàng câu hỏi giả lập", ""]
+    for i in range(1, num_questions + 1):
+        parts.append(f"**{i}. {_sentence(rng, 8, 25)}?**")
+        for key in "ABCD":
+            parts.append(f"{key}. {_sentence(rng, 2, 10)}")
+        parts.append(f"đáp án: {rng.choice('ABCD')}")
+        parts.append(f"Giải thích: {_sentence(rng, 10, 60)}.")
+        parts.append("")
+        parts.append("---")
+        parts.append("")
+    return newline.join(parts)
+
+
+# --- PHẦN 2: CÁCH PHÂN TÍCH CŨ (ĐỂ ĐỐI CHIẾU) ---
+def legacy_parse(content: str) -> list:
+    """Bản sao nguyên vẹn của parse_quiz_from_content trước khi chuyển sang quiz_parser."""
+    blocks = re.split(r'(\n\s*\*\*\d+\.\s*)', content)
+    full_blocks = [blocks[i] + blocks[i+1] for i in range(1, len(blocks)-1, 2)]
+    if blocks and blocks[0].strip().startswith('**'):
+        full_blocks.insert(0, blocks[0])
+    parser_regex = re.compile(
+        r"\*\*(\d+)\.\s*(?P<question>.*?)\*\*\s*"
+        r"(?P<options>(?:^[A-D]\..*$\n?)+)"
+        r"đáp án:\s*(?P<answer>[A-D])\s*"
+        r"Giải thích:\s*(?P<explanation>.*)",
+        re.MULTILINE | re.DOTALL | re.IGNORECASE
+    )
+    option_regex = re.compile(r"^(?P<key>[A-D])\.\s*(?P<value>.*)$", re.MULTILINE)
+    quiz_data = []
+    for block in full_blocks:
+        match = parser_regex.search(block)
+        if match:
+            data = match.groupdict()
+            options_dict = {
+                opt_match.group('key'): opt_match.group('value').strip()
+                for opt_match in option_regex.finditer(data['options'])
+            }
+            quiz_data.append({
+                "id": int(match.group(1)),
+                "question": data['question'].strip(),
+                "options": options_dict,
+                "answer": data['answer'].strip().upper(),
+                "explanation": data['explanation'].strip()
+            })
+    return quiz_data
+
+
+# --- PHẦN 3: KIỂM TRA TƯƠNG ĐƯƠNG ---
+# Các dòng dùng để sinh tài liệu kiểm tra, gồm cả những trường hợp lệch chuẩn mà regex cũ vẫn chấp nhận:
+# đáp án và giải thích nằm ở dòng sau, lựa chọn trống, tiêu đề giữa dòng, chữ hoa/thường, \r, khoảng trắng lạ
+CHECK_LINES = (
+    "**1. Q?**", "**2. Câu hai", "tiếp**", "**3.**", "  **4. X**  ", "**9.", " **11.\tQ**", "**10. a**b**",
+    "**7. inline** A. a", "x **5. y**", "**", "q**",
+    "A. a", "B. b", "c. c", "a. x", "D.", "A.", "  A. a", "E. e", "A. a\r",
+    "đáp án: A", "đáp án:", "Đáp án: c", "ĐÁP ÁN: b", "đáp án:  B  ", "đáp án:A", "đáp án: a", "  đáp án: A",
+    "đáp án: AB", "đáp án: C\r", "đáp án: A Giải thích: x", "đáp án: D\tGiải thích: t",
+    "A", "b", " C ", "E", "AGiải thích: y", "B Giải thích: w", "dGiải thích: z",
+    "Giải thích: e", "giải thích:", "Giải thích:e", "GIẢI THÍCH: g", "Giải thích: có đáp án: B", "Giải thích: r\r",
+    "", "  ", "\t", "\r", "\u00a0", "text", "---",
+)
+
+
+def random_document(rng: random.Random) -> str:
+    """Một tài liệu ngắn ghép ngẫu nhiên từ CHECK_LINES, hoặc một ngân hàng đúng định dạng bị xáo trộn vài dòng."""
+    if rng.random() < 0.2:
+        lines = make_bank(rng.randint(1, 4), seed=rng.randrange(1 << 30)).split('\n')
+        for _ in range(rng.randint(1, 4)):
+            position = rng.randrange(len(lines) + 1)
+            if rng.random() < 0.5 and position < len(lines):
+                del lines[position]
+            else:
+                lines.insert(position, rng.choice(CHECK_LINES))
+    else:
+        lines = [rng.choice(CHECK_LINES) for _ in range(rng.randint(1, 14))]
+    content = '\n'.join(lines)
+    if rng.random() < 0.3:
+        content += '\n'
+    if rng.random() < 0.2:
+        content = '\n' + content
+    return content
+
+
+def check_equivalent(count: int, seed: int = 0) -> list:
+    """
+    So sánh legacy_parse với quiz_parser (cả tài liệu và từng khối của iter_blocks như quiz_watch) trên
+    `count` tài liệu ngẫu nhiên; trả về các tài liệu cho kết quả khác.
+    """
+    rng = random.Random(seed)
+    mismatches = []
+    for _ in range(count):
+        content = random_document(rng)
+        expected = legacy_parse(content)
+        by_block = [question for block in iter_blocks(content) for question in iter_questions(block)]
+        if parse_quiz_from_content(content) != expected or by_block != expected:
+            mismatches.append(content)
+    return mismatches
+
+
+# --- PHẦN 4: ĐO ĐẠC ---
+def measure(func, arg, repeat: int) -> float:
+    """Trả về thời gian chạy tốt nhất (giây) sau `repeat` lần."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(arg)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def peak_memory(func, arg) -> int:
+    """Trả về lượng bộ nhớ cấp phát cao nhất (byte) trong khi chạy `func`, không tính dữ liệu đầu vào."""
+    tracemalloc.start()
+    try:
+        func(arg)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def stream_file(file_path: str) -> int:
+    """Đọc tuần tự từ tệp trên đĩa và chỉ đếm câu hỏi, không giữ lại nội dung hay danh sách."""
+    with open(file_path, 'r', encoding='utf-8', newline='') as f:
+        return sum(1 for _ in iter_questions(f))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo thông lượng (MB/s) của bộ phân tích markdown.")
+    parser.add_argument("--questions", type=int, default=20000, help="Số câu hỏi trong ngân hàng giả lập.")
+    parser.add_argument("--repeat", type=int, default=3, help="Số lần lặp cho mỗi phép đo.")
+    parser.add_argument("--crlf", action="store_true", help="Dùng \\r\\n như nội dung dán từ trình duyệt.")
+    parser.add_argument("--check", type=int, metavar="N",
+                        help="Chỉ so sánh kết quả của hai bộ phân tích trên N tài liệu ngẫu nhiên.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed của các tài liệu ngẫu nhiên cho --check.")
+    args = parser.parse_args()
+
+    if args.check:
+        mismatches = check_equivalent(args.check, args.seed)
+        print(f"{len(mismatches)}/{args.check} tài liệu cho kết quả khác nhau.")
+        for content in sorted(mismatches, key=len)[:5]:
+            print(f"  {content!r}")
+        sys.exit(1 if mismatches else 0)
+
+    content = make_bank(args.questions, newline='\r\n' if args.crlf else '\n')
+    size_mb = len(content.encode('utf-8')) / (1024 * 1024)
+
+    if legacy_parse(content) != parse_quiz_from_content(content):
+        print("Cảnh báo: Kết quả của hai bộ phân tích không khớp nhau!")
+
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', newline='', suffix='.md', delete=False) as f:
+        f.write(content)
+        bank_path = f.name
+
+    print(f"Ngân hàng giả lập: {args.questions} câu hỏi, {size_mb:.2f} MB")
+    candidates = (
+        ("regex cũ", legacy_parse, content),
+        ("quiz_parser", parse_quiz_from_content, content),
+        ("luồng tệp", stream_file, bank_path),
+    )
+    try:
+        for name, func, arg in candidates:
+            elapsed = measure(func, arg, args.repeat)
+            peak_mb = peak_memory(func, arg) / (1024 * 1024)
+            print(f"  {name:<12} {elapsed * 1000:8.1f} ms  {size_mb / elapsed:7.2f} MB/s  đỉnh bộ nhớ {peak_mb:7.2f} MB")
+    finally:
+        os.remove(bank_path)
+
+
+if __name__ == '__main__':
+    main()
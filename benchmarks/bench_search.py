@@ -0,0 +1,109 @@
+"""
+Đo thời gian dựng chỉ mục tìm kiếm (search.py) và độ trễ truy vấn trên một kho câu hỏi giả lập.
+
+Chạy từ thư mục gốc của dự án:
+    python -m benchmarks.bench_search --questions 100000 --queries 200
+"""
+import argparse
+import itertools
+import random
+import shutil
+import tempfile
+import time
+
+from search import SearchIndex
+from storage import FileStorage
+
+# Âm tiết tiếng Việt giả lập: phụ âm đầu + vần + dấu, phân bố theo luật Zipf như văn bản thật
+ONSETS = ["", "b", "c", "ch", "d", "đ", "g", "h", "k", "kh", "l", "m", "n", "ng", "nh", "ph", "qu", "s", "t", "th", "tr", "v", "x"]
+RHYMES = ["a", "ai", "an", "ang", "anh", "ao", "at", "ăn", "âm", "ân", "e", "em", "en", "ê", "ên", "i", "in", "inh", "o",
+          "oa", "oi", "on", "ong", "ô", "ôi", "ông", "ơ", "ơi", "u", "uy", "ung", "ư", "ương", "ước", "iên", "iết", "uôn"]
+TONES = {"a": "àáạảã", "e": "èéẹẻẽ", "i": "ìíịỉĩ", "o": "òóọỏõ", "u": "ùúụủũ",
+         "ă": "ằắặẳẵ", "â": "ầấậẩẫ", "ê": "ềếệểễ", "ô": "ồốộổỗ", "ơ": "ờớợởỡ", "ư": "ừứựửữ"}
+
+
+def make_vocabulary(rng: random.Random, size: int) -> list:
+    syllables = set()
+    while len(syllables) < size:
+        syllable = rng.choice(ONSETS) + rng.choice(RHYMES)
+        vowel = next((ch for ch in syllable if ch in TONES), None)
+        if vowel and rng.random() < 0.7:
+            syllable = syllable.replace(vowel, rng.choice(TONES[vowel]), 1)
+        syllables.add(syllable)
+    return sorted(syllables)
+
+
+def make_quizzes(num_questions: int, per_quiz: int, seed: int = 0):
+    """Sinh các bộ (khóa, tên, câu hỏi) với văn bản theo phân bố Zipf trên một bộ từ vựng lớn."""
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(rng, 4000)
+    weights = list(itertools.accumulate(1 / rank for rank in range(1, len(vocabulary) + 1)))
+
+    def sentence(words: int) -> str:
+        return ' '.join(rng.choices(vocabulary, cum_weights=weights, k=words)).capitalize()
+
+    for quiz in range(0, num_questions, per_quiz):
+        questions = [
+            {
+                "id": i + 1,
+                "question": sentence(rng.randint(8, 25)),
+                "options": {key: sentence(rng.randint(2, 10)) for key in "ABCD"},
+                "answer": rng.choice("ABCD"),
+                "explanation": sentence(rng.randint(10, 60))
+            }
+            for i in range(min(per_quiz, num_questions - quiz))
+        ]
+        yield f"mon_{quiz // (per_quiz * 10)}---bai_{quiz // per_quiz}", f"Bài {quiz // per_quiz}", questions
+
+
+def percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo tốc độ dựng chỉ mục và truy vấn /search.")
+    parser.add_argument("--questions", type=int, default=100000, help="Tổng số câu hỏi của kho giả lập.")
+    parser.add_argument("--per-quiz", type=int, default=500, help="Số câu hỏi mỗi bài.")
+    parser.add_argument("--queries", type=int, default=200, help="Số truy vấn ngẫu nhiên cần đo.")
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix="bench_search_")
+    try:
+        storage = FileStorage(data_dir)
+        quizzes = list(make_quizzes(args.questions, args.per_quiz))
+        storage.save_many(quizzes)
+        print(f"Kho giả lập: {args.questions} câu hỏi trong {len(quizzes)} bài")
+
+        index = SearchIndex(storage)
+        start = time.perf_counter()
+        index.refresh()
+        print(f"Dựng chỉ mục: {time.perf_counter() - start:.2f} giây, {len(index._postings)} từ")
+
+        # Truy vấn là một cụm 1-4 âm tiết liền nhau lấy từ chính nội dung câu hỏi
+        rng = random.Random(1)
+        for words in (1, 2, 4):
+            timings = []
+            for _ in range(args.queries):
+                _, _, questions = rng.choice(quizzes)
+                text = rng.choice(questions)['question'].split()
+                start = rng.randrange(max(1, len(text) - words + 1))
+                query = ' '.join(text[start:start + words])
+                start = time.perf_counter()
+                index.search(query, 20)
+                timings.append((time.perf_counter() - start) * 1000)
+            print(f"  {words} từ: trung vị {percentile(timings, 0.5):6.2f} ms, "
+                  f"p95 {percentile(timings, 0.95):6.2f} ms, tối đa {max(timings):6.2f} ms")
+
+        key, title, questions = quizzes[0]
+        questions[0]['explanation'] += " cập nhật"
+        start = time.perf_counter()
+        storage.save_quiz(key, title, questions)
+        index.refresh()
+        print(f"Cập nhật một bài {len(questions)} câu: {(time.perf_counter() - start) * 1000:.1f} ms")
+    finally:
+        shutil.rmtree(data_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+"""
+So sánh thông lượng giữa máy chủ debug của app.py và các chế độ chạy của serve.py.
+
+Mỗi cấu hình được khởi động thành một tiến trình riêng trên một thư mục dữ liệu tạm (đã có sẵn một
+bài giả lập), rồi được gửi request qua HTTP bằng nhiều luồng, mỗi luồng giữ một kết nối keep-alive.
+Với --in-process, đo thêm chi phí CPU của mỗi request khi gọi thẳng asgi.application (đường nhanh
+từ bộ nhớ đệm) so với ứng dụng Flask, không qua mạng.
+
+Chạy từ thư mục gốc của dự án:
+    python -m benchmarks.bench_server --modes debug werkzeug gunicorn asgi --requests 2000
+    python -m benchmarks.bench_server --in-process
+"""
+import argparse
+import asyncio
+import http.client
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.bench_parser import make_bank
+from quiz_parser import parse_quiz_from_content
+from storage import open_storage
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+QUIZ_KEY = 'bench---bai'
+ROUTES = {
+    'json': f'/data/{QUIZ_KEY}.json',
+    'html': f'/data/{QUIZ_KEY}.html',
+    'index': '/',
+}
+
+# --- PHẦN 1: CÁC CẤU HÌNH MÁY CHỦ ---
+def server_command(mode: str, port: int, workers: int) -> list:
+    if mode == 'debug':
+        # Giống hệt `python app.py` nhưng trên cổng đo
+        return [sys.executable, '-c', f"import app; app.app.run(debug=True, port={port})"]
+    serve = [sys.executable, os.path.join(ROOT, 'serve.py'), '--port', str(port), '--workers', str(workers)]
+    if mode == 'werkzeug':
+        return serve + ['--server', 'werkzeug']
+    if mode == 'gunicorn':
+        return serve + ['--server', 'gunicorn']
+    if mode == 'asgi':
+        return serve + ['--asgi']
+    if mode == 'uvicorn':
+        return serve + ['--asgi', '--server', 'uvicorn']
+    raise ValueError(f"Chế độ không hợp lệ: {mode}")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_until_ready(port: int, timeout: float = 120.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            connection.request('GET', ROUTES['json'])
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Máy chủ không sẵn sàng trên cổng {port}")
+
+
+# --- PHẦN 2: GỬI REQUEST ---
+def hammer(port: int, path: str, requests: int, concurrency: int) -> dict:
+    headers = {'Accept-Encoding': 'gzip, br'}
+
+    def worker(count):
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        errors = 0
+        for _ in range(count):
+            try:
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                errors += response.status >= 400
+                if response.will_close:
+                    connection.close()
+            except (OSError, http.client.HTTPException):
+                errors += 1
+                connection.close()
+        connection.close()
+        return errors
+
+    counts = [requests // concurrency + (i < requests % concurrency) for i in range(concurrency)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        errors = sum(executor.map(worker, counts))
+    elapsed = time.perf_counter() - start
+    return {'req_per_s': round(requests / elapsed, 1), 'errors': errors}
+
+
+def bench_mode(mode: str, data_dir: str, requests: int, concurrency: int, workers: int) -> dict:
+    port = free_port()
+    env = dict(os.environ, QUIZ_DATA_DIR=data_dir, PYTHONPATH=ROOT)
+    process = subprocess.Popen(server_command(mode, port, workers), cwd=os.path.dirname(data_dir), env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+    try:
+        wait_until_ready(port)
+        # Làm nóng bộ nhớ đệm của mọi worker trước khi đo
+        hammer(port, ROUTES['html'], concurrency * workers, concurrency)
+        return {name: hammer(port, path, requests, concurrency) for name, path in ROUTES.items()}
+    finally:
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+# --- PHẦN 3: ĐO TRONG TIẾN TRÌNH ---
+def bench_in_process(requests: int) -> dict:
+    """Thời gian trung bình (micro giây) cho một request /data/ qua Flask và qua đường nhanh ASGI."""
+    import app as quiz_app
+    import asgi
+
+    results = {}
+    client = quiz_app.app.test_client()
+    for name in ('json', 'html'):
+        path = ROUTES[name]
+        client.get(path)
+        start = time.perf_counter()
+        for _ in range(requests):
+            client.get(path, headers={'Accept-Encoding': 'gzip, br'})
+        results[f'flask_{name}_us'] = round((time.perf_counter() - start) / requests * 1e6, 1)
+
+        scope = {'type': 'http', 'method': 'GET', 'path': path, 'query_string': b'',
+                 'headers': [(b'accept-encoding', b'gzip, br')]}
+
+        async def run():
+            async def receive():
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+            async def send(message):
+                pass
+
+            for _ in range(requests):
+                await asgi.application(scope, receive, send)
+
+        start = time.perf_counter()
+        asyncio.run(run())
+        results[f'asgi_{name}_us'] = round((time.perf_counter() - start) / requests * 1e6, 1)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="So sánh thông lượng máy chủ debug và serve.py.")
+    parser.add_argument("--modes", nargs='+', choices=("debug", "werkzeug", "gunicorn", "asgi", "uvicorn"),
+                        default=["debug", "werkzeug"], help="Các cấu hình cần đo.")
+    parser.add_argument("--questions", type=int, default=500, help="Số câu hỏi của bài giả lập.")
+    parser.add_argument("--requests", type=int, default=2000, help="Số request cho mỗi route.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Số luồng gửi request đồng thời.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Số worker của serve.py.")
+    parser.add_argument("--in-process", action="store_true", help="Đo chi phí mỗi request của Flask và ASGI trong tiến trình.")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="bench_server_")
+    data_dir = os.path.join(root, 'data')
+    try:
+        open_storage('file', data_dir).save_quiz(QUIZ_KEY, "Bài đo", parse_quiz_from_content(make_bank(args.questions)))
+        if args.in_process:
+            os.environ['QUIZ_DATA_DIR'] = data_dir
+            os.chdir(root)
+            for name, value in bench_in_process(args.requests).items():
+                print(f"  {name:<16} {value:>10} µs/request")
+            return
+        print(f"{'chế độ':<10}" + ''.join(f"{name + ' req/s':>14}" for name in ROUTES))
+        for mode in args.modes:
+            results = bench_mode(mode, data_dir, args.requests, args.concurrency, args.workers)
+            print(f"{mode:<10}" + ''.join(f"{results[name]['req_per_s']:>14}" for name in ROUTES)
+                  + ('' if not any(r['errors'] for r in results.values()) else '  (có lỗi)'))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+"""
+Bộ đo hiệu năng tổng hợp: thông lượng và bộ nhớ của bộ phân tích markdown, và kiểm thử tải các
+route chính (index, create_quiz, suggest_update, serve_quiz_page) qua test client của Flask với
+nhiều luồng đồng thời. Kết quả được ghi ra tệp JSON để so sánh giữa các commit.
+
+Chạy từ thư mục gốc của dự án:
+    python -m benchmarks.suite --sizes 50 500 5000 --workers 8 --requests 200 --output bench.json
+    python -m benchmarks.suite --compare bench_cu.json bench.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.bench_parser import make_bank, measure, peak_memory
+from quiz_parser import parse_quiz_from_content
+
+# Chỉ số chính của từng phép đo và chiều "tốt hơn" của nó khi so sánh hai lần chạy
+PRIMARY_METRICS = {
+    'parser': ('mb_per_s', True),
+    'routes': ('req_per_s', True),
+}
+# Chênh lệch nhỏ hơn tỷ lệ này được coi là nhiễu khi so sánh
+NOISE_RATIO = 0.1
+
+
+# --- PHẦN 1: THÔNG TIN LẦN CHẠY ---
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_metadata(args) -> dict:
+    return {
+        'commit': git_commit(),
+        'time': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'storage': args.storage,
+        'suggest_write_delay': args.suggest_write_delay,
+        'sizes': args.sizes,
+        'workers': args.workers,
+        'requests': args.requests,
+    }
+
+
+def percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+# --- PHẦN 2: BỘ PHÂN TÍCH ---
+def bench_parser(sizes: list, repeat: int) -> list:
+    results = []
+    for size in sizes:
+        content = make_bank(size)
+        size_bytes = len(content.encode('utf-8'))
+        elapsed = measure(parse_quiz_from_content, content, repeat)
+        result = {
+            'questions': size,
+            'bytes': size_bytes,
+            'seconds': round(elapsed, 6),
+            'mb_per_s': round(size_bytes / (1024 * 1024) / elapsed, 2),
+            'questions_per_s': round(size / elapsed),
+            'peak_mb': round(peak_memory(parse_quiz_from_content, content) / (1024 * 1024), 2),
+        }
+        print(f"  parser {size:>6} câu: {result['mb_per_s']:8.2f} MB/s, "
+              f"{result['questions_per_s']:>9} câu/s, đỉnh bộ nhớ {result['peak_mb']:.2f} MB")
+        results.append(result)
+    return results
+
+
+# --- PHẦN 3: KIỂM THỬ TẢI CÁC ROUTE ---
+def load_test(app, name: str, make_request, requests: int, workers: int) -> dict:
+    """
+    Gửi `requests` request bằng `workers` luồng, mỗi luồng một test client riêng.
+
+    `make_request(client, i)` gửi request thứ i và trả về response.
+    """
+    def worker(indices):
+        client = app.test_client()
+        timings, errors = [], 0
+        for i in indices:
+            start = time.perf_counter()
+            response = make_request(client, i)
+            timings.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+        return timings, errors
+
+    chunks = [range(w, requests, workers) for w in range(workers)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(workers) as executor:
+        outcomes = list(executor.map(worker, chunks))
+    elapsed = time.perf_counter() - start
+    timings = [t for outcome in outcomes for t in outcome[0]]
+    return {
+        'route': name,
+        'workers': workers,
+        'requests': requests,
+        'errors': sum(outcome[1] for outcome in outcomes),
+        'req_per_s': round(requests / elapsed, 1),
+        'p50_ms': round(percentile(timings, 0.5), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'p99_ms': round(percentile(timings, 0.99), 3),
+    }
+
+
+def bench_routes(sizes: list, requests: int, workers: int, storage_kind: str, suggest_write_delay) -> list:
+    """Dựng một thư mục dữ liệu tạm, nạp app trong đó rồi đo từng route với các bài cỡ khác nhau."""
+    data_root = tempfile.mkdtemp(prefix="bench_suite_")
+    previous_cwd = os.getcwd()
+    os.environ['QUIZ_STORAGE'] = storage_kind
+    if suggest_write_delay is not None:
+        os.environ['SUGGEST_WRITE_DELAY'] = str(suggest_write_delay)
+    os.chdir(data_root)
+    try:
+        import app as quiz_app
+        app = quiz_app.app
+        results = []
+
+        def record(result, size=None):
+            result['questions'] = size
+            results.append(result)
+            label = f"{result['route']} ({size} câu)" if size else result['route']
+            print(f"  {label:<32} {result['req_per_s']:8.1f} req/s  p50 {result['p50_ms']:7.2f} ms  "
+                  f"p95 {result['p95_ms']:7.2f} ms  lỗi {result['errors']}")
+
+        banks = {size: make_bank(size, seed=size) for size in sizes}
+        for size in sizes:
+            quiz_app.storage.save_quiz(f"bench---bai_{size}", f"Bài {size}", parse_quiz_from_content(banks[size]))
+
+        record(load_test(app, 'index', lambda client, i: client.get('/'), requests, workers))
+        for size in sizes:
+            key = f"bench---bai_{size}"
+            rng = random.Random(size)
+            record(load_test(app, 'serve_quiz_page', lambda client, i: client.get(
+                f'/data/{key}.html', headers={'Accept-Encoding': 'gzip, br'}), requests, workers), size)
+            record(load_test(app, 'serve_quiz_json', lambda client, i: client.get(
+                f'/data/{key}.json', headers={'Accept-Encoding': 'gzip, br'}), requests, workers), size)
+            record(load_test(app, 'suggest_update', lambda client, i: client.post('/suggest-update', json={
+                'quiz_filename': f'{key}.json',
+                'question_id': rng.randint(1, size),
+                'new_answer': 'A',
+                'new_explanation': f'Giải thích mới {i}',
+            }), requests, workers), size)
+            # Mỗi request tạo một bài mới; bỏ qua cảnh báo trùng lặp để chỉ đo phân tích và ghi
+            create_requests = max(workers, requests // 10) if size >= 5000 else requests
+            record(load_test(app, 'create_quiz', lambda client, i: client.post('/create', data={
+                'subject_name': 'Bench Create',
+                'quiz_name': f'Bai {size} {i}',
+                'md_content': banks[size],
+                'allow_duplicates': '1',
+            }), create_requests, workers), size)
+        return results
+    finally:
+        os.chdir(previous_cwd)
+        shutil.rmtree(data_root, ignore_errors=True)
+
+
+# --- PHẦN 4: SO SÁNH HAI LẦN CHẠY ---
+def compare(old_path: str, new_path: str, noise: float = NOISE_RATIO) -> int:
+    """In chênh lệch chỉ số chính giữa hai lần chạy; trả về số phép đo chậm đi quá ngưỡng nhiễu."""
+    with open(old_path, 'r', encoding='utf-8') as f:
+        old = json.load(f)
+    with open(new_path, 'r', encoding='utf-8') as f:
+        new = json.load(f)
+    print(f"So sánh {old['meta'].get('commit')} -> {new['meta'].get('commit')}")
+    regressions = 0
+    for section, (metric, higher_is_better) in PRIMARY_METRICS.items():
+        baseline = {(r.get('route'), r['questions']): r for r in old.get(section, [])}
+        for result in new.get(section, []):
+            before = baseline.get((result.get('route'), result['questions']))
+            if before is None or not before[metric]:
+                continue
+            change = (result[metric] - before[metric]) / before[metric]
+            worse = change < -noise if higher_is_better else change > noise
+            regressions += worse
+            label = result.get('route', section)
+            print(f"  {label:<18} {str(result['questions'] or ''):>6} {metric:<9} "
+                  f"{before[metric]:>10} -> {result[metric]:>10} ({change:+.1%}){'  CHẬM HƠN' if worse else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo hiệu năng bộ phân tích và các route, ghi kết quả ra JSON.")
+    parser.add_argument("--sizes", type=int, nargs='+', default=[50, 500, 5000], help="Số câu hỏi của các ngân hàng giả lập.")
+    parser.add_argument("--repeat", type=int, default=3, help="Số lần lặp khi đo bộ phân tích.")
+    parser.add_argument("--requests", type=int, default=200, help="Số request cho mỗi route và mỗi cỡ bài.")
+    parser.add_argument("--workers", type=int, default=8, help="Số luồng gửi request đồng thời.")
+    parser.add_argument("--storage", choices=("file", "packed", "sqlite"), default="file", help="Backend lưu trữ khi kiểm thử tải.")
+    parser.add_argument("--suggest-write-delay", type=float,
+                        help="Giá trị SUGGEST_WRITE_DELAY khi đo (mặc định: như ứng dụng; 0 để đo cả chi phí ghi).")
+    parser.add_argument("--skip-routes", action="store_true", help="Chỉ đo bộ phân tích.")
+    parser.add_argument("--output", default="bench_results.json", help="Tệp JSON ghi kết quả (mặc định: bench_results.json).")
+    parser.add_argument("--compare", nargs=2, metavar=("CU", "MOI"), help="So sánh hai tệp kết quả rồi thoát.")
+    parser.add_argument("--noise", type=float, default=NOISE_RATIO,
+                        help=f"Chênh lệch tối thiểu được coi là chậm đi khi so sánh (mặc định: {NOISE_RATIO}).")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.noise) else 0)
+
+    results = {'meta': run_metadata(args)}
+    print("Bộ phân tích markdown:")
+    results['parser'] = bench_parser(args.sizes, args.repeat)
+    if not args.skip_routes:
+        print(f"Các route ({args.workers} luồng, backend {args.storage}):")
+        results['routes'] = bench_routes(args.sizes, args.requests, args.workers, args.storage,
+                                         args.suggest_write_delay)
+
+    output = os.path.abspath(args.output)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"Đã ghi kết quả vào {output}")
+
+
+if __name__ == '__main__':
+    main()
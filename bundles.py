@@ -0,0 +1,122 @@
+import json
+import threading
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from catalog import QuizCatalog, describe_quiz
+from quiz_assets import CompressedBody, QuizAssetCache, compress_body
+
+# Số gói được giữ trong bộ nhớ (gói cả môn và gói một nhóm bài tùy chọn); gói ít dùng nhất bị bỏ trước
+MAX_BUNDLES = 64
+
+
+class SubjectBundle(NamedTuple):
+    """JSON đã ghép và nén sẵn của nhiều bài trong một môn, cùng phiên bản của từng bài trong đó."""
+    json: CompressedBody
+    version: str
+    last_modified: float
+    # khóa bài -> phiên bản JSON của bài tại thời điểm ghép
+    members: dict
+    # khóa bài (mọi bài được yêu cầu, theo thứ tự) -> token phiên bản của backend lúc ghép, None nếu bài không có
+    tokens: dict
+
+
+class SubjectBundleCache:
+    """
+    Gói JSON theo môn học: mọi bài của một môn, hoặc một nhóm bài được chọn, trong một phản hồi.
+
+    Gói được ghép từ JSON rút gọn có sẵn của từng bài (không tuần tự hóa lại), nén một lần rồi dùng
+    lại cho mọi request. Một gói chỉ bị bỏ khi một bài trong gói thay đổi: ngay khi backend báo bài
+    bị ghi hoặc xóa trong tiến trình này, hoặc khi token phiên bản của một bài (một lệnh stat hoặc
+    một truy vấn theo khóa chính) khác với lúc ghép, nếu bài bị sửa từ tiến trình khác. Gói cả môn
+    cũng được ghép lại khi danh sách bài của môn trong danh mục thay đổi.
+    """
+
+    def __init__(self, catalog: QuizCatalog, assets: QuizAssetCache, max_bundles: int = MAX_BUNDLES):
+        self.catalog = catalog
+        self.assets = assets
+        self.max_bundles = max_bundles
+        self._lock = threading.Lock()
+        # (tên môn, tuple khóa bài đã sắp xếp hoặc None cho cả môn) -> SubjectBundle
+        self._bundles = OrderedDict()
+        # Tăng sau mỗi thay đổi để không lưu một gói được ghép từ dữ liệu vừa bị thay đổi
+        self._generation = 0
+        assets.storage.subscribe(self._on_change)
+
+    def get(self, subject: str, keys: Optional[tuple] = None) -> Optional[SubjectBundle]:
+        """
+        Trả về gói của môn (ghép nếu cần). `keys` là các khóa bài cần lấy, None để lấy mọi bài;
+        trả về None nếu môn không có bài nào.
+        """
+        if keys is None:
+            self.catalog.refresh_if_stale()
+            entries = self.catalog.by_subject().get(subject)
+            if not entries:
+                return None
+            members = tuple(sorted(entry['key'] for entry in entries))
+            cache_key = (subject, None)
+        else:
+            members = tuple(sorted(set(keys)))
+            cache_key = (subject, members)
+
+        with self._lock:
+            cached = self._bundles.get(cache_key)
+            if cached is not None:
+                self._bundles.move_to_end(cache_key)
+            generation = self._generation
+        if cached is not None and tuple(cached.tokens) == members and self._is_current(cached):
+            return cached
+
+        bundle = self._build(subject, members)
+        with self._lock:
+            if bundle is None:
+                self._bundles.pop(cache_key, None)
+            elif generation == self._generation:
+                self._bundles[cache_key] = bundle
+                while len(self._bundles) > self.max_bundles:
+                    self._bundles.popitem(last=False)
+        return bundle
+
+    def _is_current(self, bundle: SubjectBundle) -> bool:
+        """Mọi bài trong gói vẫn có đúng token phiên bản của backend như lúc ghép."""
+        for key, token in bundle.tokens.items():
+            version = self.assets.storage.version(key)
+            if (version[0] if version is not None else None) != token:
+                return False
+        return True
+
+    def _build(self, subject: str, keys: tuple) -> Optional[SubjectBundle]:
+        parts, members, tokens = [], {}, {}
+        last_modified = 0.0
+        for key in keys:
+            # Đọc token trước khi nạp bài: nếu bài đổi ngay sau đó, lần kiểm tra sau sẽ thấy token khác
+            version = self.assets.storage.version(key)
+            tokens[key] = version[0] if version is not None else None
+            asset = self.assets.get(key)
+            entry = describe_quiz(key)
+            if asset is None or entry is None:
+                continue
+            title = self.assets.storage.get_title(key) or entry['name']
+            header = json.dumps({"key": key, "title": title, "name": entry['name'], "url": entry['url'],
+                                 "version": asset.version}, ensure_ascii=False).encode('utf-8')
+            # Dùng lại JSON rút gọn đã có của bài thay vì nạp và tuần tự hóa lại các câu hỏi
+            parts.append(header[:-1] + b',"questions":' + asset.json.body + b'}')
+            members[key] = asset.version
+            last_modified = max(last_modified, asset.last_modified)
+        if not members:
+            return None
+
+        header = json.dumps({"subject": subject, "count": len(members)}, ensure_ascii=False).encode('utf-8')
+        compressed = compress_body(header[:-1] + b',"quizzes":[' + b','.join(parts) + b']}')
+        return SubjectBundle(json=compressed, version=compressed.etag[:16],
+                             last_modified=last_modified, members=members, tokens=tokens)
+
+    def _on_change(self, key: str):
+        entry = describe_quiz(key)
+        subject = entry['subject'] if entry is not None else None
+        with self._lock:
+            self._generation += 1
+            for cache_key, bundle in list(self._bundles.items()):
+                bundle_subject, keys = cache_key
+                if key in keys if keys is not None else (bundle_subject == subject or key in bundle.tokens):
+                    del self._bundles[cache_key]
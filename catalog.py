@@ -0,0 +1,107 @@
+import threading
+from typing import Optional
+
+from storage import QuizStorage
+
+# Tên môn học dùng cho các tệp cũ không theo quy ước subject---quiz
+UNCATEGORIZED = "Chưa phân loại"
+
+
+def subject_name(subject_sanitized: str) -> str:
+    """Tên hiển thị của môn học từ phần đầu của khóa (ví dụ 'lich_su' -> 'Lich Su')."""
+    return subject_sanitized.replace('_', ' ').title()
+
+
+def describe_quiz(key: str) -> Optional[dict]:
+    """Tách khóa theo quy ước subject_name---quiz_name thành thông tin hiển thị."""
+    if key.startswith('creator_') or key.startswith('quiz_page_'):
+        return None
+
+    basename = f"{key}.html"
+    parts = key.split('---')
+    if len(parts) == 2:
+        subject_sanitized, quiz_name_sanitized = parts
+        subject = subject_name(subject_sanitized)
+        quiz_name = quiz_name_sanitized.replace('_', ' ').title()
+    else:
+        # Xử lý cho các tệp cũ không theo quy ước
+        subject = UNCATEGORIZED
+        quiz_name = key.replace('_', ' ').title()
+
+    return {
+        'subject': subject,
+        'url': f'/data/{basename}',
+        'name': quiz_name,
+        'filename': basename,
+        'key': key
+    }
+
+
+class QuizCatalog:
+    """
+    Danh mục các bài trắc nghiệm được giữ trong bộ nhớ.
+
+    Danh mục được dựng một lần khi khởi động và cập nhật trực tiếp bởi /create và /delete.
+    Các thay đổi từ bên ngoài (sao chép tệp, tiến trình khác) được phát hiện bằng dấu vân tay
+    rẻ của backend lưu trữ (thời điểm sửa thư mục, hoặc một truy vấn tổng hợp trên SQLite).
+    """
+
+    def __init__(self, storage: QuizStorage):
+        self.storage = storage
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._by_subject = None
+        self._fingerprint = None
+        self.rebuild()
+
+    def rebuild(self):
+        """Đọc lại toàn bộ danh sách bài trắc nghiệm từ backend lưu trữ."""
+        fingerprint = self.storage.fingerprint()
+        entries = {}
+        for key in self.storage.list_quizzes():
+            entry = describe_quiz(key)
+            if entry:
+                entries[key] = entry
+
+        with self._lock:
+            self._entries = entries
+            self._by_subject = None
+            self._fingerprint = fingerprint
+
+    def refresh_if_stale(self):
+        """Đọc lại nếu dữ liệu đã bị thay đổi từ bên ngoài kể từ lần đọc trước."""
+        if self.storage.fingerprint() != self._fingerprint:
+            self.rebuild()
+
+    def add(self, key: str):
+        """Thêm (hoặc ghi đè) một bài trắc nghiệm vừa được tạo."""
+        self.add_many([key])
+
+    def add_many(self, keys):
+        """Thêm nhiều bài vừa được nhập; danh sách theo môn chỉ được tính lại một lần."""
+        entries = [entry for entry in map(describe_quiz, keys) if entry]
+        if not entries:
+            return
+        with self._lock:
+            for entry in entries:
+                self._entries[entry['key']] = entry
+            self._by_subject = None
+            # Thay đổi này do chính ứng dụng tạo ra nên không cần đọc lại toàn bộ
+            self._fingerprint = self.storage.fingerprint()
+
+    def remove(self, key: str):
+        """Xóa một bài trắc nghiệm khỏi danh mục."""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._by_subject = None
+            self._fingerprint = self.storage.fingerprint()
+
+    def by_subject(self) -> dict:
+        """Trả về các bài trắc nghiệm nhóm theo môn học, được tính lại chỉ khi danh mục thay đổi."""
+        with self._lock:
+            if self._by_subject is None:
+                grouped = {}
+                for entry in sorted(self._entries.values(), key=lambda e: (e['subject'], e['name'])):
+                    grouped.setdefault(entry['subject'], []).append(entry)
+                self._by_subject = grouped
+            return self._by_subject
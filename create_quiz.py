@@ -1,8 +1,17 @@
-import re
 import json
-import os
 import argparse
 import string
+import glob
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import NamedTuple, Optional
+
+from quiz_parser import parse_quiz_from_content, parse_quiz_md
+from quiz_watch import WatchedSource, watch
+from storage import atomic_write, open_storage
+from text_normalize import sanitize_filename
 
 # --- PHẦN 1: TEMPLATE HTML ---
 # Đây là toàn bộ mã nguồn của một trang web trắc nghiệm.
@@ -205,62 +214,201 @@ HTML_TEMPLATE = string.Template("""
 """)
 
 # --- PHẦN 2: HÀM PHÂN TÍCH MARKDOWN ---
-# Hàm này được sao chép từ parser.py, không thay đổi.
-def parse_quiz_md(file_path: str) -> list:
-    if not os.path.exists(file_path):
-        print(f"Lỗi: Không tìm thấy tệp tại đường dẫn '{file_path}'")
+# Dùng chung bộ phân tích với app.py và parser.py (xem quiz_parser.py).
+
+# --- PHẦN 3: CHẾ ĐỘ HÀNG LOẠT VÀ THEO DÕI ---
+# Chuyển cả thư mục (hoặc glob) tệp .md vào thư mục dữ liệu của app.py trên nhiều tiến trình,
+# hoặc theo dõi các tệp đó và chỉ cập nhật những câu hỏi vừa được sửa.
+# Tên môn lấy từ thư mục chứa tệp, tên bài lấy từ tên tệp: <môn>/<bài>.md -> khóa <môn>---<bài>.
+
+# Lưu mã băm nguồn của lần chạy trước để bỏ qua các tệp không đổi
+BATCH_MANIFEST = '.batch_manifest.json'
+
+
+class BatchJob(NamedTuple):
+    path: str
+    key: str
+    title: str
+    known_hash: Optional[str]
+    force: bool
+
+
+class BatchResult(NamedTuple):
+    path: str
+    key: str
+    status: str
+    questions: int
+    size: int
+    source_hash: Optional[str]
+    seconds: float
+    error: Optional[str] = None
+
+
+def find_sources(pattern: str) -> list:
+    """Các tệp .md trong thư mục (đệ quy), hoặc các tệp khớp glob."""
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, '**', '*.md')
+    return sorted(path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path))
+
+
+def names_from_path(path: str) -> tuple:
+    """Suy ra (khóa, tên bài) từ đường dẫn: thư mục chứa tệp là môn, tên tệp là bài."""
+    subject = os.path.basename(os.path.dirname(os.path.abspath(path)))
+    title = os.path.splitext(os.path.basename(path))[0]
+    return f"{sanitize_filename(subject)}---{sanitize_filename(title)}", title
+
+
+def load_manifest(data_dir: str) -> dict:
+    try:
+        with open(os.path.join(data_dir, BATCH_MANIFEST), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+_worker_storage = None
+
+
+def _init_worker(storage_kind: str, data_dir: str):
+    # Mỗi tiến trình con mở backend lưu trữ của riêng nó
+    global _worker_storage
+    _worker_storage = open_storage(storage_kind, data_dir)
+
+
+def convert_source(job: BatchJob) -> BatchResult:
+    """Chạy trong tiến trình con: băm, phân tích và lưu một tệp nguồn."""
+    start = time.perf_counter()
+    try:
+        with open(job.path, 'rb') as f:
+            raw = f.read()
+        source_hash = hashlib.blake2b(raw, digest_size=16).hexdigest()
+        if not job.force and source_hash == job.known_hash and _worker_storage.exists(job.key):
+            return BatchResult(job.path, job.key, 'bỏ qua', 0, len(raw), source_hash, time.perf_counter() - start)
+
+        questions = parse_quiz_from_content(raw.decode('utf-8'))
+        if not questions:
+            return BatchResult(job.path, job.key, 'lỗi', 0, len(raw), None, time.perf_counter() - start,
+                               "không trích xuất được câu hỏi nào")
+        _worker_storage.save_quiz(job.key, job.title, questions)
+        return BatchResult(job.path, job.key, 'đã lưu', len(questions), len(raw), source_hash,
+                           time.perf_counter() - start)
+    except Exception as e:
+        return BatchResult(job.path, job.key, 'lỗi', 0, 0, None, time.perf_counter() - start, str(e))
+
+
+def run_batch(pattern: str, data_dir: str, storage_kind: str, workers: Optional[int], force: bool) -> list:
+    """Chuyển mọi tệp khớp `pattern` vào backend lưu trữ; trả về danh sách BatchResult."""
+    sources = find_sources(pattern)
+    if not sources:
+        print(f"Không tìm thấy tệp .md nào trong: {pattern}")
         return []
-    with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-    blocks = re.split(r'(\n\s*\*\*\d+\.\s*)', content)
-    full_blocks = [blocks[i] + blocks[i+1] for i in range(1, len(blocks)-1, 2)]
-    if blocks[0].strip().startswith('**'):
-        full_blocks.insert(0, blocks[0])
-    parser_regex = re.compile(
-        r"\*\*(\d+)\.\s*(?P<question>.*?)\*\*\s*"
-        r"(?P<options>(?:^[A-D]\..*$\n?)+)"
-        r"đáp án:\s*(?P<answer>[A-D])\s*"
-        r"Giải thích:\s*(?P<explanation>.*)",
-        re.MULTILINE | re.DOTALL | re.IGNORECASE
-    )
-    option_regex = re.compile(r"^(?P<key>[A-D])\.\s*(?P<value>.*)$", re.MULTILINE)
-    quiz_data = []
-    for block in full_blocks:
-        match = parser_regex.search(block)
-        if match:
-            data = match.groupdict()
-            options_dict = {
-                opt_match.group('key'): opt_match.group('value').strip()
-                for opt_match in option_regex.finditer(data['options'])
-            }
-            quiz_data.append({
-                "id": int(match.group(1)),
-                "question": data['question'].strip(),
-                "options": options_dict,
-                "answer": data['answer'].strip().upper(),
-                "explanation": data['explanation'].strip()
-            })
-    return quiz_data
-
-# --- PHẦN 3: HÀM CHÍNH ĐỂ TẠO BÀI KIỂM TRA ---
+
+    os.makedirs(data_dir, exist_ok=True)
+    manifest = load_manifest(data_dir)
+    jobs, keys = [], {}
+    for path in sources:
+        key, title = names_from_path(path)
+        if key in keys:
+            print(f"  Bỏ qua {path}: trùng khóa '{key}' với {keys[key]}")
+            continue
+        keys[key] = path
+        previous = manifest.get(os.path.abspath(path), {})
+        known_hash = previous.get('hash') if previous.get('key') == key else None
+        jobs.append(BatchJob(path, key, title, known_hash, force))
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(storage_kind, data_dir)) as executor:
+        futures = [executor.submit(convert_source, job) for job in jobs]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            detail = f"{result.questions} câu hỏi" if result.status == 'đã lưu' else (result.error or '')
+            print(f"  [{result.status:^7}] {result.path} -> {result.key} "
+                  f"({result.seconds * 1000:.1f} ms) {detail}")
+
+    for result in results:
+        if result.source_hash:
+            manifest[os.path.abspath(result.path)] = {'key': result.key, 'hash': result.source_hash}
+    atomic_write(os.path.join(data_dir, BATCH_MANIFEST), json.dumps(manifest, ensure_ascii=False, indent=4))
+    return results
+
+
+def print_batch_summary(results: list, elapsed: float):
+    counts = {}
+    for result in results:
+        counts[result.status] = counts.get(result.status, 0) + 1
+    converted = [r for r in results if r.status == 'đã lưu']
+    size_mb = sum(r.size for r in converted) / (1024 * 1024)
+    questions = sum(r.questions for r in converted)
+
+    print(f"\nTổng kết: {len(results)} tệp trong {elapsed:.2f} giây — "
+          + ", ".join(f"{count} {status}" for status, count in sorted(counts.items())))
+    if converted:
+        print(f"Thông lượng: {len(converted) / elapsed:.1f} tệp/giây, {questions / elapsed:.0f} câu hỏi/giây, "
+              f"{size_mb / elapsed:.2f} MB/giây ({questions} câu hỏi, {size_mb:.2f} MB)")
+        slowest = sorted(converted, key=lambda r: r.seconds, reverse=True)[:5]
+        print("Chậm nhất: " + ", ".join(f"{os.path.basename(r.path)} {r.seconds * 1000:.0f} ms" for r in slowest))
+
+
+def run_watch(pattern: str, data_dir: str, storage_kind: str, interval: float):
+    """Theo dõi các tệp khớp `pattern` và vá bài đã lưu mỗi khi tệp nguồn thay đổi."""
+    os.makedirs(data_dir, exist_ok=True)
+    storage = open_storage(storage_kind, data_dir)
+    seen_paths, seen_keys = set(), set()
+
+    def discover():
+        for path in find_sources(pattern):
+            if path in seen_paths:
+                continue
+            seen_paths.add(path)
+            key, title = names_from_path(path)
+            if key in seen_keys:
+                print(f"  Bỏ qua {path}: trùng khóa '{key}' với một tệp khác")
+                continue
+            seen_keys.add(key)
+            yield WatchedSource(storage, path, key, title)
+
+    watch(list(discover()), interval, lambda: list(discover()))
+
+
+# --- PHẦN 4: HÀM CHÍNH ĐỂ TẠO BÀI KIỂM TRA ---
 def main():
     # Thiết lập trình phân tích đối số dòng lệnh
     parser = argparse.ArgumentParser(description="Tạo một bài trắc nghiệm HTML từ tệp Markdown.")
-    parser.add_argument("input_file", help="Đường dẫn đến tệp .md nguồn.")
-    parser.add_argument("quiz_name", help="Tên cho bài trắc nghiệm (ví dụ: 'Bài ôn tập chương 1').")
+    parser.add_argument("input_file", nargs='?', help="Đường dẫn đến tệp .md nguồn.")
+    parser.add_argument("quiz_name", nargs='?', help="Tên cho bài trắc nghiệm (ví dụ: 'Bài ôn tập chương 1').")
+    parser.add_argument("--batch", metavar="THƯ_MỤC_HOẶC_GLOB",
+                        help="Chuyển hàng loạt các tệp .md (<môn>/<bài>.md) vào thư mục dữ liệu của máy chủ.")
+    parser.add_argument("--data-dir", default="data", help="Thư mục dữ liệu của máy chủ cho chế độ --batch (mặc định: data).")
+    parser.add_argument("--storage", choices=("file", "packed", "sqlite"), default=os.environ.get('QUIZ_STORAGE', 'file'),
+                        help="Backend lưu trữ cho chế độ --batch (mặc định: file hoặc QUIZ_STORAGE).")
+    parser.add_argument("--workers", type=int, help="Số tiến trình song song (mặc định: số CPU).")
+    parser.add_argument("--force", action="store_true", help="Chuyển lại cả các tệp không thay đổi.")
+    parser.add_argument("--watch", metavar="THƯ_MỤC_HOẶC_GLOB",
+                        help="Theo dõi các tệp .md và chỉ cập nhật những câu hỏi vừa được sửa vào thư mục dữ liệu.")
+    parser.add_argument("--interval", type=float, default=1.0, help="Chu kỳ thăm dò (giây) cho --watch (mặc định: 1).")
     args = parser.parse_args()
 
+    if args.watch:
+        run_watch(args.watch, args.data_dir, args.storage, args.interval)
+        return
+    if args.batch:
+        start = time.perf_counter()
+        results = run_batch(args.batch, args.data_dir, args.storage, args.workers, args.force)
+        if results:
+            print_batch_summary(results, time.perf_counter() - start)
+        return
+    if not args.input_file or not args.quiz_name:
+        parser.error("cần input_file và quiz_name, hoặc dùng --batch")
+
     input_md_path = args.input_file
     quiz_title = args.quiz_name
 
-    # 1. Chuẩn hóa tên tệp
+    # 1. Chuẩn hóa tên tệp (giống khóa bài của trang tạo bài)
     # "Bài ôn tập chương 1" -> "bai_on_tap_chuong_1"
-    sanitized_name = quiz_title.lower()
-    sanitized_name = re.sub(r'\s+', '_', sanitized_name)
-    # Loại bỏ các ký tự không hợp lệ cho tên tệp
-    valid_chars = "-_.() %s%s" % (string.ascii_letters, string.digits)
-    sanitized_name = ''.join(c for c in sanitized_name if c in valid_chars)
-    
+    sanitized_name = sanitize_filename(quiz_title)
+
     if not sanitized_name:
         print("Lỗi: Tên bài trắc nghiệm không hợp lệ.")
         return
@@ -0,0 +1,378 @@
+import argparse
+import hashlib
+import json
+import threading
+import time
+from array import array
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+from catalog import describe_quiz
+from search import tokenize
+from storage import QuizStorage, open_storage
+
+# Phát hiện câu hỏi gần trùng nhau giữa các bài bằng MinHash + LSH, không so sánh từng cặp.
+# Chạy trực tiếp để in báo cáo: python dedup.py --data-dir data
+
+# Số âm tiết liền nhau của một shingle
+SHINGLE_SIZE = 3
+# Số ngăn của chữ ký MinHash một hoán vị (one permutation hashing)
+NUM_BINS = 32
+# Chữ ký được chia thành BANDS dải, mỗi dải ROWS ngăn; hai câu hỏi trùng một dải là ứng viên.
+# Xác suất trở thành ứng viên là 1 - (1 - s^ROWS)^BANDS, bằng 50% khi độ tương đồng s ≈ 0.6.
+BANDS = 8
+ROWS = NUM_BINS // BANDS
+# Độ tương đồng Jaccard ước lượng tối thiểu để coi hai câu hỏi là gần trùng
+DUPLICATE_THRESHOLD = 0.7
+# Loại các câu hỏi đã xóa khỏi các nhóm LSH khi số câu đã xóa vượt quá số câu còn hiệu lực
+COMPACT_RATIO = 1.0
+# Cảnh báo khi tạo bài nếu ít nhất tỷ lệ này số câu hỏi đã có trong một bài khác
+QUIZ_DUPLICATE_RATIO = 0.5
+
+_MASK64 = (1 << 64) - 1
+_BIN_BITS = NUM_BINS.bit_length() - 1
+# Lớn hơn mọi giá trị trong một ngăn, dùng để phân biệt các ngăn rỗng được mượn giá trị
+_EMPTY_BIN_OFFSET = 1 << (64 - _BIN_BITS)
+
+
+class DuplicateMatch(NamedTuple):
+    """Một bài đã có chứa nhiều câu hỏi gần trùng với bài đang được tạo."""
+    key: str
+    # Số câu hỏi của bài mới có bản gần trùng trong bài này
+    matched: int
+    total: int
+    # Vài cặp (ID câu hỏi mới, ID câu hỏi đã có) làm ví dụ
+    examples: tuple
+
+    @property
+    def ratio(self) -> float:
+        return self.matched / self.total if self.total else 0.0
+
+
+@lru_cache(maxsize=1 << 16)
+def _token_hash(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def _mix(h: int) -> int:
+    """Trộn bit cuối kiểu splitmix64 để các ngăn và giá trị trong ngăn độc lập với nhau."""
+    h = ((h ^ (h >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    h = ((h ^ (h >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return h ^ (h >> 31)
+
+
+def question_shingles(question: dict) -> set:
+    """
+    Mã băm các shingle của câu hỏi và các lựa chọn (đã bỏ dấu, chữ thường).
+
+    Các lựa chọn được sắp xếp trước khi ghép nên hai bản chỉ đảo thứ tự A-D vẫn giống hệt nhau;
+    đáp án và giải thích không được tính vì hay được sửa riêng ở từng bài.
+    """
+    options = sorted((question.get('options') or {}).values())
+    shingles = set()
+    for part in (question.get('question', ''), *options):
+        hashes = [_token_hash(token) for token in tokenize(part)]
+        if len(hashes) < SHINGLE_SIZE:
+            if hashes:
+                shingles.add(_mix(sum(hashes) & _MASK64))
+            continue
+        for a, b, c in zip(hashes, hashes[1:], hashes[2:]):
+            shingles.add(_mix((a * 0x9E3779B97F4A7C15 + b * 0xC2B2AE3D27D4EB4F + c) & _MASK64))
+    return shingles
+
+
+def signature(shingles: set) -> Optional[tuple]:
+    """
+    Chữ ký MinHash với một lần băm cho mỗi shingle: ngăn được chọn bằng các bit thấp, giữ giá trị
+    nhỏ nhất của mỗi ngăn. Ngăn rỗng mượn giá trị của ngăn kế tiếp (densification) để xác suất hai
+    ngăn bằng nhau vẫn là độ tương đồng Jaccard. Trả về None nếu câu hỏi không có chữ nào.
+    """
+    if not shingles:
+        return None
+    bins = [None] * NUM_BINS
+    mask = NUM_BINS - 1
+    for h in shingles:
+        index = h & mask
+        value = h >> _BIN_BITS
+        current = bins[index]
+        if current is None or value < current:
+            bins[index] = value
+    if None in bins:
+        filled = bins[:]
+        for index in range(NUM_BINS):
+            if bins[index] is None:
+                distance = 1
+                while bins[(index + distance) % NUM_BINS] is None:
+                    distance += 1
+                filled[index] = bins[(index + distance) % NUM_BINS] + distance * _EMPTY_BIN_OFFSET
+        bins = filled
+    return tuple(bins)
+
+
+def similarity(a: tuple, b: tuple) -> float:
+    """Độ tương đồng Jaccard ước lượng: tỷ lệ ngăn bằng nhau của hai chữ ký."""
+    return sum(1 for x, y in zip(a, b) if x == y) / NUM_BINS
+
+
+def band_keys(sig: tuple) -> list:
+    """Mã băm của từng dải chữ ký (kèm số thứ tự dải để các dải khác nhau không lẫn vào nhau)."""
+    return [hash((band, *sig[band * ROWS:(band + 1) * ROWS])) for band in range(BANDS)]
+
+
+class DuplicateIndex:
+    """
+    Chỉ mục LSH trên chữ ký MinHash của mọi câu hỏi để tìm câu hỏi gần trùng trong thời gian gần tuyến tính.
+
+    Mỗi câu hỏi được đưa vào BANDS nhóm theo mã băm của từng dải chữ ký; chỉ các câu hỏi chung ít
+    nhất một nhóm mới được so sánh chữ ký. Chữ ký nằm liền nhau trong một array('Q') và mỗi nhóm
+    chỉ giữ số hiệu câu hỏi, nên chỉ mục tốn vài trăm byte cho mỗi câu hỏi. Giống SearchIndex, bài
+    bị sửa được đánh dấu đã xóa rồi nối lại vào cuối, và chỉ mục được dựng ở lần dùng đầu tiên
+    (hoặc trên luồng nền), cập nhật ở lần dùng kế tiếp sau mỗi lần ghi và đối chiếu token phiên
+    bản của từng bài.
+    """
+
+    def __init__(self, storage: QuizStorage):
+        self.storage = storage
+        self._lock = threading.RLock()
+        self._built = False
+        self._fingerprint = None
+        # Các bài vừa được ghi trong tiến trình này, lập lại chỉ mục ở lần dùng kế tiếp
+        self._dirty = set()
+        # Chữ ký của câu hỏi số n nằm ở [n * NUM_BINS, (n + 1) * NUM_BINS)
+        self._signatures = array('Q')
+        self._doc_keys = []
+        self._doc_question_ids = []
+        # khóa bài -> (token phiên bản đã lập chỉ mục, danh sách số hiệu câu hỏi)
+        self._quizzes = {}
+        # mã băm dải -> số hiệu câu hỏi, hoặc danh sách số hiệu nếu có nhiều câu chung dải
+        self._buckets = {}
+        self._deleted = set()
+        self._live_docs = 0
+        storage.subscribe(self._on_change)
+
+    @property
+    def size(self) -> int:
+        """Số câu hỏi đang có trong chỉ mục."""
+        return self._live_docs
+
+    def refresh(self):
+        """Dựng chỉ mục nếu chưa có, hoặc lập lại chỉ mục cho các bài vừa được ghi hay bị thay đổi từ bên ngoài."""
+        fingerprint = self.storage.fingerprint()
+        if self._built and fingerprint == self._fingerprint and not self._dirty:
+            return
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            if self._built and fingerprint == self._fingerprint:
+                # Chỉ có các lần ghi của chính tiến trình này: lập lại chỉ mục đúng các bài đó
+                for key in dirty:
+                    self._reindex(key)
+                return
+            keys = [key for key in self.storage.list_quizzes() if describe_quiz(key)]
+            for key in keys:
+                self._reindex(key)
+            for key in set(self._quizzes) - set(keys):
+                self._remove(key)
+            self._fingerprint = fingerprint
+            self._built = True
+
+    def start_background_build(self):
+        """Dựng chỉ mục trên một luồng nền để lần tạo bài đầu tiên không phải chờ."""
+        threading.Thread(target=self.refresh, name='duplicate-index', daemon=True).start()
+
+    def _signature(self, doc: int) -> array:
+        return self._signatures[doc * NUM_BINS:(doc + 1) * NUM_BINS]
+
+    def _members(self, band: int) -> list:
+        members = self._buckets.get(band)
+        if members is None:
+            return []
+        return [members] if type(members) is int else members
+
+    def find(self, question: dict, threshold: float = DUPLICATE_THRESHOLD,
+             exclude_key: Optional[str] = None) -> list:
+        """Các (khóa bài, ID câu hỏi, độ tương đồng) gần trùng với một câu hỏi, giống nhất trước."""
+        sig = signature(question_shingles(question))
+        if sig is None:
+            return []
+        self.refresh()
+        with self._lock:
+            candidates = set()
+            for band in band_keys(sig):
+                candidates.update(self._members(band))
+            matches = []
+            for doc in candidates - self._deleted:
+                key = self._doc_keys[doc]
+                if key == exclude_key:
+                    continue
+                score = similarity(sig, self._signature(doc))
+                if score >= threshold:
+                    matches.append((key, self._doc_question_ids[doc], score))
+        matches.sort(key=lambda match: -match[2])
+        return matches
+
+    def check_quiz(self, questions: list, exclude_key: Optional[str] = None,
+                   threshold: float = DUPLICATE_THRESHOLD, examples: int = 3) -> list:
+        """
+        So sánh một bài sắp được lưu với các bài đã có.
+
+        Returns:
+            Danh sách DuplicateMatch của các bài có câu hỏi gần trùng, nhiều câu trùng nhất trước.
+            `exclude_key` là khóa của chính bài đó (khi ghi đè) để không tự so với mình.
+        """
+        per_quiz = {}
+        for question in questions:
+            seen = set()
+            for key, question_id, _ in self.find(question, threshold, exclude_key):
+                if key in seen:
+                    continue
+                seen.add(key)
+                per_quiz.setdefault(key, []).append((question.get('id'), question_id))
+        total = len(questions)
+        matches = [DuplicateMatch(key, len(pairs), total, tuple(pairs[:examples])) for key, pairs in per_quiz.items()]
+        matches.sort(key=lambda match: (-match.matched, match.key))
+        return matches
+
+    def clusters(self, threshold: float = DUPLICATE_THRESHOLD) -> list:
+        """
+        Gom các câu hỏi gần trùng thành cụm (union-find trên các cặp ứng viên đã kiểm tra).
+
+        Returns:
+            Danh sách các cụm, mỗi cụm là danh sách (khóa bài, ID câu hỏi) đã sắp xếp; cụm lớn trước.
+        """
+        self.refresh()
+        parent = {}
+
+        def find(doc):
+            root = doc
+            while parent.get(root, root) != root:
+                root = parent[root]
+            while doc != root:
+                parent[doc], doc = root, parent[doc]
+            return root
+
+        with self._lock:
+            deleted = self._deleted
+            for members in self._buckets.values():
+                if type(members) is int:
+                    continue
+                members = [doc for doc in members if doc not in deleted]
+                for i, a in enumerate(members):
+                    for b in members[i + 1:]:
+                        root_a, root_b = find(a), find(b)
+                        if root_a == root_b:
+                            continue
+                        if similarity(self._signature(a), self._signature(b)) >= threshold:
+                            parent[root_b] = root_a
+
+            groups = {}
+            for doc in set(parent) | set(parent.values()):
+                groups.setdefault(find(doc), []).append((self._doc_keys[doc], self._doc_question_ids[doc]))
+        result = [sorted(group) for group in groups.values() if len(group) > 1]
+        result.sort(key=lambda group: (-len(group), group[0]))
+        return result
+
+    def _reindex(self, key: str):
+        """Lập lại chỉ mục của một bài nếu token phiên bản của nó đã đổi."""
+        version = self.storage.version(key)
+        if version is None:
+            self._remove(key)
+            return
+        indexed = self._quizzes.get(key)
+        if indexed is not None and indexed[0] == version[0]:
+            return
+        questions = self.storage.load_quiz(key)
+        self._remove(key)
+        if questions is None:
+            return
+        buckets = self._buckets
+        doc_ids = []
+        for question in questions:
+            sig = signature(question_shingles(question))
+            if sig is None:
+                continue
+            doc = len(self._doc_keys)
+            self._signatures.extend(sig)
+            self._doc_keys.append(key)
+            self._doc_question_ids.append(question.get('id'))
+            doc_ids.append(doc)
+            for band in band_keys(sig):
+                members = buckets.get(band)
+                if members is None:
+                    buckets[band] = doc
+                elif type(members) is int:
+                    buckets[band] = [members, doc]
+                else:
+                    members.append(doc)
+        self._quizzes[key] = (version[0], doc_ids)
+        self._live_docs += len(doc_ids)
+
+    def _remove(self, key: str):
+        indexed = self._quizzes.pop(key, None)
+        if indexed is None:
+            return
+        self._deleted.update(indexed[1])
+        self._live_docs -= len(indexed[1])
+        if len(self._deleted) > self._live_docs * COMPACT_RATIO:
+            self._compact()
+
+    def _compact(self):
+        """Loại các câu hỏi đã xóa khỏi mọi nhóm (số hiệu câu hỏi được giữ nguyên)."""
+        deleted = self._deleted
+        for band, members in list(self._buckets.items()):
+            if type(members) is int:
+                if members in deleted:
+                    del self._buckets[band]
+                continue
+            kept = [doc for doc in members if doc not in deleted]
+            if not kept:
+                del self._buckets[band]
+            else:
+                self._buckets[band] = kept[0] if len(kept) == 1 else kept
+        self._deleted = set()
+
+    def _on_change(self, key: str):
+        # Không lập chỉ mục trong request ghi (và không chờ khóa nếu chỉ mục đang được dựng):
+        # chỉ đánh dấu bài, nhiều lần ghi liên tiếp vào một bài được gộp thành một lần lập chỉ mục.
+        if not self._built or not describe_quiz(key):
+            return
+        self._dirty.add(key)
+        # Thay đổi do chính ứng dụng tạo ra đã được ghi nhận, không cần đối chiếu lại mọi bài
+        self._fingerprint = self.storage.fingerprint()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Báo cáo các câu hỏi gần trùng nhau giữa các bài trắc nghiệm.")
+    parser.add_argument("--data-dir", default="data", help="Thư mục dữ liệu (mặc định: data).")
+    parser.add_argument("--storage", choices=("file", "packed", "sqlite"), default="file", help="Backend lưu trữ (mặc định: file).")
+    parser.add_argument("--threshold", type=float, default=DUPLICATE_THRESHOLD,
+                        help=f"Độ tương đồng tối thiểu, từ 0 đến 1 (mặc định: {DUPLICATE_THRESHOLD}).")
+    parser.add_argument("--cross-quiz", action="store_true", help="Chỉ liệt kê các cụm trải trên nhiều bài.")
+    parser.add_argument("--json", action="store_true", help="In kết quả dạng JSON.")
+    args = parser.parse_args()
+
+    storage = open_storage(args.storage, args.data_dir)
+    index = DuplicateIndex(storage)
+    start = time.perf_counter()
+    clusters = index.clusters(args.threshold)
+    if args.cross_quiz:
+        clusters = [group for group in clusters if len({key for key, _ in group}) > 1]
+    elapsed = time.perf_counter() - start
+
+    if args.json:
+        print(json.dumps([[{"quiz": key, "id": question_id} for key, question_id in group] for group in clusters],
+                         ensure_ascii=False, indent=2))
+        return
+
+    print(f"Đã so khớp {index.size} câu hỏi trong {elapsed:.2f} giây: {len(clusters)} cụm gần trùng.")
+    questions = {}
+    for number, group in enumerate(clusters, 1):
+        print(f"\nCụm {number} ({len(group)} câu hỏi):")
+        for key, question_id in group:
+            if key not in questions:
+                questions[key] = {q.get('id'): q for q in storage.load_quiz(key) or []}
+            text = questions[key].get(question_id, {}).get('question', '')
+            print(f"  {key} #{question_id}: {text[:80]}")
+
+
+if __name__ == '__main__':
+    main()
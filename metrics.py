@@ -0,0 +1,293 @@
+import bisect
+import collections
+import math
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from flask import Flask, before_render_template, g, request, template_rendered
+
+# Số đo được giữ trong bộ nhớ của từng tiến trình và xuất ra /metrics theo định dạng văn bản của
+# Prometheus (mỗi worker gunicorn có bộ số đo riêng, Prometheus cộng lại theo nhãn instance).
+
+# Ngưỡng (giây) của các histogram thời gian, từ 1 ms tới 10 giây
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    """Bộ đếm chỉ tăng, theo từng tổ hợp nhãn."""
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for values, total in items:
+            yield f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(total)}"
+
+
+class Histogram:
+    """Histogram tích lũy theo các ngưỡng cố định, giống prometheus_client nhưng không cần thư viện ngoài."""
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # tổ hợp nhãn -> [số lần rơi vào từng ngưỡng (không tích lũy) + một ô cho +Inf, tổng, số lần]
+        self._values = {}
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, (list(entry[0]), entry[1], entry[2])) for key, entry in self._values.items())
+        for values, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, values, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, values)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, values)} {count}"
+
+
+class Gauge:
+    """Giá trị tức thời được đọc lại bằng một hàm mỗi lần xuất số đo."""
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, read):
+        self.name = name
+        self.documentation = documentation
+        self.read = read
+
+    def samples(self):
+        try:
+            value = self.read()
+        except Exception:
+            return
+        yield f"{self.name} {_format_value(value)}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple = (),
+                  buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name: str, documentation: str, read) -> Gauge:
+        return self._register(Gauge(name, documentation, read))
+
+    def render(self) -> str:
+        """Toàn bộ số đo theo định dạng văn bản 0.0.4 của Prometheus."""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+# --- ĐO THỜI GIAN CÁC THAO TÁC LƯU TRỮ ---
+# Các phương thức của backend được bọc; thời gian ghi đã gồm cả các hàm lắng nghe (nhãn "notify")
+STORAGE_OPERATIONS = ('list_quizzes', 'load_quiz', 'save_quiz', 'save_many', 'update_questions',
+                      'edit_quiz', 'delete_quiz', '_notify')
+
+
+def instrument_storage(storage, histogram: Histogram):
+    """Bọc các phương thức đọc/ghi của một backend lưu trữ để ghi thời gian vào histogram."""
+    backend = type(storage).__name__
+
+    def wrap(operation, method):
+        label = operation.lstrip('_')
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start, backend=backend, operation=label)
+        timed.__name__ = method.__name__
+        timed.__doc__ = method.__doc__
+        return timed
+
+    for operation in STORAGE_OPERATIONS:
+        setattr(storage, operation, wrap(operation, getattr(storage, operation)))
+
+
+# --- BỘ LẤY MẪU NGĂN XẾP CHO REQUEST CHẬM ---
+class SlowRequestProfiler:
+    """
+    Lấy mẫu ngăn xếp của các luồng đang xử lý request sau mỗi `interval` giây.
+
+    Khi một request chạy lâu hơn `threshold` giây, các mẫu của nó được ghi ra `output_dir` theo định
+    dạng "folded" (mỗi dòng "khung;khung;khung số_mẫu") mà flamegraph.pl, speedscope hay inferno
+    đọc trực tiếp. Request nhanh chỉ tốn chi phí đăng ký và hủy đăng ký luồng.
+    """
+
+    def __init__(self, threshold: float, output_dir: str, interval: float = 0.005):
+        self.threshold = threshold
+        self.output_dir = output_dir
+        self.interval = interval
+        self._lock = threading.Lock()
+        # id luồng -> Counter các ngăn xếp đã lấy mẫu
+        self._active = {}
+        self._thread = None
+
+    def start(self):
+        ident = threading.get_ident()
+        with self._lock:
+            self._active[ident] = collections.Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='slow-request-profiler', daemon=True)
+                self._thread.start()
+
+    def stop(self, duration: float, label: str) -> Optional[str]:
+        """Kết thúc lấy mẫu cho luồng hiện tại; trả về đường dẫn tệp nếu request đủ chậm để ghi lại."""
+        with self._lock:
+            samples = self._active.pop(threading.get_ident(), None)
+        if not samples or duration < self.threshold:
+            return None
+        os.makedirs(self.output_dir, exist_ok=True)
+        safe_label = ''.join(c if c.isalnum() else '_' for c in label).strip('_') or 'request'
+        path = os.path.join(self.output_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{safe_label}-{int(duration * 1000)}ms.folded")
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in samples.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+    @staticmethod
+    def _fold(frame) -> str:
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(';', ':'))
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    continue
+                frames = sys._current_frames()
+                for ident, samples in self._active.items():
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        samples[self._fold(frame)] += 1
+
+
+# --- GẮN VÀO ỨNG DỤNG FLASK ---
+def instrument_app(app: Flask, request_seconds: Histogram, requests_total: Counter,
+                   template_seconds: Histogram, profiler: Optional[SlowRequestProfiler] = None):
+    """Đo thời gian mọi request theo route (mẫu URL, không phải URL thật) và thời gian render template."""
+    local = threading.local()
+
+    def route_label() -> str:
+        return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+    @app.before_request
+    def start_timer():
+        g.metrics_start = time.perf_counter()
+        if profiler is not None:
+            profiler.start()
+
+    @app.after_request
+    def observe_request(response):
+        start = g.pop('metrics_start', None)
+        if start is not None:
+            duration = time.perf_counter() - start
+            route = route_label()
+            request_seconds.observe(duration, route=route, method=request.method)
+            requests_total.inc(route=route, method=request.method, status=str(response.status_code))
+            if profiler is not None:
+                path = profiler.stop(duration, f"{request.method} {route}")
+                if path:
+                    print(f"Request chậm {request.method} {request.path} ({duration * 1000:.0f} ms): {path}")
+        return response
+
+    @app.teardown_request
+    def observe_error(error):
+        # Request bị lỗi không đi qua after_request
+        start = g.pop('metrics_start', None)
+        if start is not None:
+            duration = time.perf_counter() - start
+            request_seconds.observe(duration, route=route_label(), method=request.method)
+            requests_total.inc(route=route_label(), method=request.method, status='500')
+            if profiler is not None:
+                profiler.stop(duration, f"{request.method} {route_label()}")
+
+    def template_started(sender, template, context, **extra):
+        stack = getattr(local, 'templates', None)
+        if stack is None:
+            stack = local.templates = []
+        stack.append(time.perf_counter())
+
+    def template_finished(sender, template, context, **extra):
+        stack = getattr(local, 'templates', None)
+        if stack:
+            template_seconds.observe(time.perf_counter() - stack.pop(), template=template.name or '')
+
+    before_render_template.connect(template_started, app, weak=False)
+    template_rendered.connect(template_finished, app, weak=False)
@@ -0,0 +1,62 @@
+import argparse
+import html
+import os
+import re
+import time
+
+from storage import SQLITE_FILENAME, FileStorage, SQLiteStorage
+
+# Chuyển toàn bộ các tệp data/*.json sang CSDL SQLite, chạy một lần trước khi
+# khởi động máy chủ với QUIZ_STORAGE=sqlite.
+
+
+TITLE_RE = re.compile(r"<title>(.*?)</title>", re.DOTALL)
+
+
+def legacy_title(data_dir: str, key: str):
+    """Đọc tên bài từ thẻ <title> của trang .html tĩnh được tạo bởi các phiên bản cũ."""
+    try:
+        with open(os.path.join(data_dir, f"{key}.html"), 'r', encoding='utf-8') as f:
+            match = TITLE_RE.search(f.read())
+    except OSError:
+        return None
+    return html.unescape(match.group(1).strip()) if match else None
+
+
+def iter_json_quizzes(data_dir: str):
+    """Đọc lần lượt các bài trong data_dir, sinh ra các bộ (khóa, tên, câu hỏi)."""
+    files = FileStorage(data_dir)
+    for key in sorted(files.list_quizzes()):
+        try:
+            questions = files.load_quiz(key)
+        except (OSError, ValueError) as e:
+            print(f"  Bỏ qua {key}.json: {e}")
+            continue
+        print(f"  {key}.json: {len(questions)} câu hỏi")
+        # Ưu tiên tên gốc đã lưu, sau đó đến trang .html cũ, cuối cùng là tên suy ra từ khóa
+        title = (files.get_title(key) or legacy_title(data_dir, key)
+                 or key.split('---')[-1].replace('_', ' ').title())
+        yield key, title, questions
+
+
+def migrate(data_dir: str, db_path: str) -> int:
+    """Nhập mọi tệp .json trong data_dir vào db_path trong một giao dịch. Trả về số bài đã nhập."""
+    return SQLiteStorage(db_path).save_many(iter_json_quizzes(data_dir))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nhập các tệp JSON trong thư mục dữ liệu vào CSDL SQLite.")
+    parser.add_argument("--data-dir", default="data", help="Thư mục chứa các tệp .json (mặc định: data).")
+    parser.add_argument("--db", help=f"Đường dẫn CSDL đích (mặc định: <data-dir>/{SQLITE_FILENAME}).")
+    args = parser.parse_args()
+
+    db_path = args.db or os.path.join(args.data_dir, SQLITE_FILENAME)
+    print(f"Đang nhập dữ liệu từ {args.data_dir} vào {db_path}...")
+    start = time.perf_counter()
+    imported = migrate(args.data_dir, db_path)
+    print(f"Đã nhập {imported} bài trắc nghiệm trong {time.perf_counter() - start:.2f} giây.")
+    print("Khởi động máy chủ với QUIZ_STORAGE=sqlite để sử dụng CSDL này.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+import functools
+import gzip
+import hashlib
+import json
+import random
+import threading
+from typing import NamedTuple, Optional
+
+try:
+    import brotli
+except ImportError:  # brotli là phụ thuộc tùy chọn; khi thiếu chỉ có bản gzip
+    brotli = None
+
+from storage import QuizStorage
+
+# Thứ tự ưu tiên khi trình duyệt chấp nhận nhiều kiểu nén
+PREFERRED_ENCODINGS = ('br', 'gzip')
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 9
+
+
+class CompressedBody(NamedTuple):
+    """Một nội dung cùng các bản nén sẵn của nó, tính một lần và dùng lại cho mọi request."""
+    # kiểu nén ('identity', 'gzip', 'br') -> bytes
+    variants: dict
+    etag: str
+
+    @property
+    def body(self) -> bytes:
+        return self.variants['identity']
+
+    def negotiate(self, accept_encodings) -> str:
+        """Chọn bản nén tốt nhất mà trình duyệt chấp nhận (theo header Accept-Encoding)."""
+        for encoding in PREFERRED_ENCODINGS:
+            if encoding in self.variants and accept_encodings.quality(encoding) > 0:
+                return encoding
+        return 'identity'
+
+    def variant_etag(self, encoding: str) -> str:
+        # Mỗi bản nén là một biểu diễn khác nhau nên cần ETag mạnh riêng
+        return self.etag if encoding == 'identity' else f"{self.etag}-{encoding}"
+
+
+def compress_body(body: bytes) -> CompressedBody:
+    """Tạo các bản gzip (và brotli nếu có) của nội dung; bỏ qua bản nén không nhỏ hơn bản gốc."""
+    variants = {'identity': body}
+    candidates = {'gzip': gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)}
+    if brotli is not None:
+        candidates['br'] = brotli.compress(body, quality=BROTLI_QUALITY)
+    for encoding, data in candidates.items():
+        if len(data) < len(body):
+            variants[encoding] = data
+    return CompressedBody(variants=variants, etag=hashlib.blake2b(body, digest_size=16).hexdigest())
+
+
+@functools.lru_cache(maxsize=256)
+def shuffled_order(count: int, seed: int) -> tuple:
+    """Hoán vị Fisher-Yates của range(count), tái lập được từ seed và không phụ thuộc nội dung bài."""
+    order = list(range(count))
+    random.Random(seed).shuffle(order)
+    return tuple(order)
+
+
+class QuizAsset(NamedTuple):
+    """Nội dung JSON đã tuần tự hóa của một bài cùng các thông tin phục vụ bộ nhớ đệm HTTP."""
+    json: CompressedBody
+    version: str
+    last_modified: float
+    # Kích thước JSON định dạng indent=4 như trước đây được gửi đi, dùng để báo cáo số byte tiết kiệm
+    original_size: int
+    # JSON rút gọn của từng câu hỏi, theo thứ tự trong bài, để ghép thành trang mà không tuần tự hóa lại
+    question_bodies: tuple
+    ids: tuple
+    # id câu hỏi -> vị trí đầu tiên có id đó
+    positions: dict
+    # Đáp án đúng theo vị trí, dùng để chấm bài phía máy chủ
+    answers: tuple
+
+    @property
+    def etag(self) -> str:
+        return self.json.etag
+
+    def order(self, seed: Optional[int]) -> tuple:
+        """Vị trí các câu hỏi theo thứ tự xáo trộn bởi seed, hoặc theo thứ tự gốc nếu seed là None."""
+        if seed is None:
+            return tuple(range(len(self.ids)))
+        return shuffled_order(len(self.ids), seed)
+
+    def questions_json(self, positions) -> bytes:
+        """Mảng JSON gồm các câu hỏi ở những vị trí đã cho."""
+        return b'[' + b','.join(self.question_bodies[p] for p in positions) + b']'
+
+    def question_json(self, question_id: int) -> Optional[bytes]:
+        position = self.positions.get(question_id)
+        return self.question_bodies[position] if position is not None else None
+
+    def answer(self, question_id: int) -> Optional[str]:
+        position = self.positions.get(question_id)
+        return self.answers[position] if position is not None else None
+
+    def size_report(self) -> dict:
+        """Kích thước (byte) của từng biểu diễn so với bản JSON gốc."""
+        sizes = {'original': self.original_size}
+        sizes.update((encoding, len(data)) for encoding, data in self.json.variants.items())
+        smallest = min(len(data) for data in self.json.variants.values())
+        sizes['saved'] = self.original_size - smallest
+        sizes['saved_percent'] = round(100 * sizes['saved'] / self.original_size) if self.original_size else 0
+        return sizes
+
+
+class QuizAssetCache:
+    """
+    Bộ nhớ đệm nội dung JSON và ETag của từng bài trắc nghiệm.
+
+    ETag là mã băm nội dung, được tính một lần sau mỗi lần ghi (qua thông báo của backend
+    lưu trữ) thay vì mỗi request. Khi đọc, chỉ cần so sánh token phiên bản rẻ của backend
+    (một lệnh stat hoặc một truy vấn theo khóa chính) để phát hiện thay đổi từ tiến trình khác.
+    JSON được rút gọn và nén sẵn (gzip, brotli) cùng lúc nên request không phải nén lại.
+    """
+
+    def __init__(self, storage: QuizStorage):
+        self.storage = storage
+        self._lock = threading.Lock()
+        # khóa bài -> (token phiên bản, QuizAsset)
+        self._entries = {}
+        storage.subscribe(self._on_change)
+
+    def get(self, key: str) -> Optional[QuizAsset]:
+        """Trả về QuizAsset hiện tại của bài, hoặc None nếu bài không tồn tại."""
+        version = self.storage.version(key)
+        if version is None:
+            self._entries.pop(key, None)
+            return None
+        token, last_modified = version
+
+        cached = self._entries.get(key)
+        if cached is not None and cached[0] == token:
+            return cached[1]
+
+        questions = self.storage.load_quiz(key)
+        if questions is None:
+            return None
+        asset = self._build(questions, last_modified)
+        with self._lock:
+            self._entries[key] = (token, asset)
+        return asset
+
+    def current(self, key: str) -> Optional[QuizAsset]:
+        """QuizAsset trong bộ nhớ nếu vẫn khớp token phiên bản của backend; None nếu cần nạp lại (không nạp)."""
+        cached = self._entries.get(key)
+        if cached is None:
+            return None
+        version = self.storage.version(key)
+        if version is None or version[0] != cached[0]:
+            return None
+        return cached[1]
+
+    def peek(self, key: str) -> Optional[QuizAsset]:
+        """Trả về QuizAsset đang có trong bộ nhớ (có thể đã cũ) mà không truy cập backend."""
+        cached = self._entries.get(key)
+        return cached[1] if cached is not None else None
+
+    def _build(self, questions: list, last_modified: float) -> QuizAsset:
+        question_bodies = tuple(json.dumps(q, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+                                for q in questions)
+        # Giống hệt json.dumps(questions, separators=(',', ':')) nhưng dùng lại JSON của từng câu
+        body = b'[' + b','.join(question_bodies) + b']'
+        original_size = len(json.dumps(questions, ensure_ascii=False, indent=4).encode('utf-8'))
+        ids = tuple(q.get('id') for q in questions)
+        positions = {}
+        for position, question_id in enumerate(ids):
+            positions.setdefault(question_id, position)
+        compressed = compress_body(body)
+        return QuizAsset(json=compressed, version=compressed.etag[:16],
+                         last_modified=last_modified, original_size=original_size,
+                         question_bodies=question_bodies, ids=ids, positions=positions,
+                         answers=tuple(q.get('answer') for q in questions))
+
+    def _on_change(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+        # Tính lại (và nén lại) ngay sau khi ghi để request đọc tiếp theo không phải chờ
+        self.get(key)
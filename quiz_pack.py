@@ -0,0 +1,281 @@
+"""
+Định dạng nhị phân gọn cho các ngân hàng câu hỏi lớn (tệp .qpk), đọc bằng mmap.
+
+Bố cục (little-endian):
+    tiêu đề   HEADER: magic 'QZPK', phiên bản, số cột, số câu hỏi, vị trí vùng chuỗi
+    bảng bản ghi  mỗi câu hỏi một bản ghi cố định RECORD: ID rồi (vị trí, độ dài) của từng cột
+    bảng ID   các cặp (ID, vị trí bản ghi) sắp xếp theo ID để tìm nhị phân
+    vùng chuỗi    nội dung UTF-8 của các cột, nối liền nhau
+
+Các cột là câu hỏi, lựa chọn (JSON), đáp án, giải thích và các trường khác (JSON, rỗng nếu không
+có). Đọc một câu hỏi theo ID chỉ cần tìm nhị phân trong bảng ID và giải mã đúng các chuỗi của câu
+đó; sửa vài câu hỏi chỉ sao chép nguyên các byte của những cột không đổi thay vì phân tích và tuần
+tự hóa lại cả bài như với JSON.
+
+    python quiz_pack.py to-packed data/mon---bai.json
+    python quiz_pack.py to-json data/mon---bai.qpk
+    python quiz_pack.py convert --data-dir data --to packed
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+from typing import Optional
+
+MAGIC = b'QZPK'
+FORMAT_VERSION = 1
+PACKED_SUFFIX = '.qpk'
+COLUMNS = ('question', 'options', 'answer', 'explanation', 'extra')
+# magic, phiên bản, số cột, số câu hỏi, vị trí vùng chuỗi
+HEADER = struct.Struct('<4sHHIQ')
+RECORD = struct.Struct('<q' + 'II' * len(COLUMNS))
+INDEX_ENTRY = struct.Struct('<qI')
+KNOWN_FIELDS = frozenset(('id',) + COLUMNS[:-1])
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+def _columns(question: dict) -> list:
+    """Các cột (bytes UTF-8) của một câu hỏi."""
+    extra = {name: value for name, value in question.items() if name not in KNOWN_FIELDS}
+    return [
+        str(question['question']).encode('utf-8'),
+        _dumps(question['options']).encode('utf-8'),
+        str(question['answer']).encode('utf-8'),
+        str(question['explanation']).encode('utf-8'),
+        _dumps(extra).encode('utf-8') if extra else b'',
+    ]
+
+
+def _pack_rows(rows: list) -> bytes:
+    """Ghép các bộ (ID, [cột bytes]) thành nội dung tệp .qpk."""
+    count = len(rows)
+    index_offset = HEADER.size + count * RECORD.size
+    blob_offset = index_offset + count * INDEX_ENTRY.size
+    records, blobs = [], []
+    position = 0
+    for question_id, columns in rows:
+        spans = []
+        for data in columns:
+            spans += (position, len(data))
+            blobs.append(data)
+            position += len(data)
+        records.append(RECORD.pack(question_id, *spans))
+    index = sorted((question_id, i) for i, (question_id, _) in enumerate(rows))
+    return b''.join([
+        HEADER.pack(MAGIC, FORMAT_VERSION, len(COLUMNS), count, blob_offset),
+        *records,
+        *(INDEX_ENTRY.pack(question_id, i) for question_id, i in index),
+        *blobs,
+    ])
+
+
+def encode(questions: list) -> bytes:
+    """Chuyển danh sách câu hỏi (như trong tệp JSON) sang định dạng .qpk; ID phải là số nguyên."""
+    rows = []
+    for number, question in enumerate(questions, 1):
+        question_id = question.get('id')
+        if not isinstance(question_id, int) or isinstance(question_id, bool):
+            raise ValueError(f"Câu hỏi thứ {number} có ID không phải số nguyên: {question_id!r}")
+        rows.append((question_id, _columns(question)))
+    return _pack_rows(rows)
+
+
+class PackedQuiz:
+    """
+    Đọc một bài dạng .qpk từ bytes hoặc mmap mà không giải mã toàn bộ.
+
+    Dùng PackedQuiz.open(path) trong khối with để tệp được ánh xạ vào bộ nhớ và đóng lại sau đó.
+    """
+
+    def __init__(self, buffer, closer=None):
+        self._buffer = buffer
+        self._closer = closer
+        magic, version, columns, count, blob_offset = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or version != FORMAT_VERSION or columns != len(COLUMNS):
+            raise ValueError("Không phải tệp .qpk được hỗ trợ")
+        self._count = count
+        self._index_offset = HEADER.size + count * RECORD.size
+        self._blob_offset = blob_offset
+
+    @classmethod
+    def open(cls, path: str) -> 'PackedQuiz':
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                raise ValueError(f"Tệp rỗng: {path}")
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(mapped, mapped.close)
+
+    def close(self):
+        if self._closer is not None:
+            self._closer()
+            self._closer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _record(self, position: int) -> tuple:
+        return RECORD.unpack_from(self._buffer, HEADER.size + position * RECORD.size)
+
+    def _raw(self, record: tuple, column: int) -> bytes:
+        offset, length = record[1 + 2 * column], record[2 + 2 * column]
+        start = self._blob_offset + offset
+        return self._buffer[start:start + length]
+
+    def position(self, question_id: int) -> Optional[int]:
+        """Vị trí bản ghi đầu tiên có ID này (tìm nhị phân trong bảng ID), None nếu không có."""
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if INDEX_ENTRY.unpack_from(self._buffer, self._index_offset + middle * INDEX_ENTRY.size)[0] < question_id:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self._count:
+            found_id, position = INDEX_ENTRY.unpack_from(self._buffer, self._index_offset + low * INDEX_ENTRY.size)
+            if found_id == question_id:
+                return position
+        return None
+
+    def question(self, position: int) -> dict:
+        """Giải mã câu hỏi ở một vị trí, với thứ tự trường giống tệp JSON."""
+        record = self._record(position)
+        question_text, options, answer, explanation, extra = (self._raw(record, c) for c in range(len(COLUMNS)))
+        question = {
+            "id": record[0],
+            "question": question_text.decode('utf-8'),
+            "options": json.loads(options),
+            "answer": answer.decode('utf-8'),
+            "explanation": explanation.decode('utf-8'),
+        }
+        if extra:
+            question.update(json.loads(extra))
+        return question
+
+    def find(self, question_id: int) -> Optional[dict]:
+        position = self.position(question_id)
+        return self.question(position) if position is not None else None
+
+    def questions(self) -> list:
+        """Giải mã cả bài; các cột JSON của mọi câu được phân tích bằng một lần json.loads."""
+        blob = self._buffer[self._blob_offset:]
+        records = list(RECORD.iter_unpack(self._buffer[HEADER.size:self._index_offset]))
+        options = json.loads(b'[' + b','.join(blob[r[3]:r[3] + r[4]] for r in records) + b']')
+        questions = []
+        for record, question_options in zip(records, options):
+            question = {
+                "id": record[0],
+                "question": blob[record[1]:record[1] + record[2]].decode('utf-8'),
+                "options": question_options,
+                "answer": blob[record[5]:record[5] + record[6]].decode('utf-8'),
+                "explanation": blob[record[7]:record[7] + record[8]].decode('utf-8'),
+            }
+            if record[10]:
+                question.update(json.loads(blob[record[9]:record[9] + record[10]]))
+            questions.append(question)
+        return questions
+
+    def with_updates(self, updates: dict) -> tuple:
+        """
+        Nội dung .qpk mới sau khi áp dụng {ID: các trường mới} (câu đầu tiên nếu trùng ID) và danh sách ID không tìm thấy.
+
+        Các câu hỏi không đổi được sao chép nguyên các byte, không giải mã.
+        """
+        targets, missing = {}, []
+        for question_id, fields in updates.items():
+            position = self.position(question_id) if isinstance(question_id, int) else None
+            if position is None:
+                missing.append(question_id)
+            else:
+                targets[position] = fields
+        if not targets:
+            return None, missing
+        rows = []
+        for position in range(self._count):
+            fields = targets.get(position)
+            if fields is None:
+                record = self._record(position)
+                rows.append((record[0], [self._raw(record, c) for c in range(len(COLUMNS))]))
+            else:
+                question = self.question(position)
+                question.update(fields)
+                # ID được giữ nguyên để bảng ID không phải sắp xếp lại theo nội dung mới
+                rows.append((self._record(position)[0], _columns(question)))
+        return _pack_rows(rows), missing
+
+
+def decode(data: bytes) -> list:
+    """Chuyển nội dung .qpk về danh sách câu hỏi như trong tệp JSON."""
+    return PackedQuiz(data).questions()
+
+
+# --- DÒNG LỆNH: CHUYỂN ĐỔI QUA LẠI VỚI JSON ---
+def convert_file(source: str, target: str):
+    if source.endswith(PACKED_SUFFIX):
+        with PackedQuiz.open(source) as quiz:
+            data = json.dumps(quiz.questions(), ensure_ascii=False, indent=4).encode('utf-8')
+    else:
+        with open(source, 'r', encoding='utf-8') as f:
+            data = encode(json.load(f))
+    # storage.py nhập module này cho PackedStorage nên chỉ nhập ngược lại khi chạy chuyển đổi
+    from storage import atomic_write
+    atomic_write(target, data)
+
+
+def convert_data_dir(data_dir: str, to: str, keep: bool) -> int:
+    """Chuyển mọi bài trong data_dir sang định dạng `to` ('packed' hoặc 'json'); trả về số bài đã chuyển."""
+    source_suffix, target_suffix = ('.json', PACKED_SUFFIX) if to == 'packed' else (PACKED_SUFFIX, '.json')
+    converted = 0
+    for name in sorted(os.listdir(data_dir)):
+        if not name.endswith(source_suffix) or name.startswith('.'):
+            continue
+        source = os.path.join(data_dir, name)
+        try:
+            convert_file(source, source[:-len(source_suffix)] + target_suffix)
+        except (OSError, ValueError) as e:
+            print(f"  Bỏ qua {name}: {e}")
+            continue
+        if not keep:
+            os.remove(source)
+        converted += 1
+    return converted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chuyển bài trắc nghiệm giữa JSON và định dạng nhị phân .qpk.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (("to-packed", "Chuyển một tệp .json sang .qpk."), ("to-json", "Chuyển một tệp .qpk sang .json.")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("source")
+        command.add_argument("-o", "--output", help="Tệp đích (mặc định: cùng tên, đổi phần mở rộng).")
+    convert = commands.add_parser("convert", help="Chuyển mọi bài trong thư mục dữ liệu.")
+    convert.add_argument("--data-dir", default=os.environ.get('QUIZ_DATA_DIR', 'data'), help="Thư mục dữ liệu.")
+    convert.add_argument("--to", choices=("packed", "json"), required=True, help="Định dạng đích.")
+    convert.add_argument("--keep", action="store_true", help="Giữ lại tệp gốc sau khi chuyển.")
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        count = convert_data_dir(args.data_dir, args.to, args.keep)
+        print(f"Đã chuyển {count} bài. Chạy máy chủ với QUIZ_STORAGE={'packed' if args.to == 'packed' else 'file'}.")
+        return
+    suffix = PACKED_SUFFIX if args.command == 'to-packed' else '.json'
+    output = args.output or os.path.splitext(args.source)[0] + suffix
+    try:
+        convert_file(args.source, output)
+    except (OSError, ValueError) as e:
+        sys.exit(f"Lỗi: {e}")
+    print(f"Đã ghi {output} ({os.path.getsize(output)} byte, tệp gốc {os.path.getsize(args.source)} byte).")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,274 @@
+import io
+import itertools
+import re
+import os
+from typing import Callable, Iterable, Iterator, Optional, Union
+
+# --- PHẦN 1: CÁC MẪU NHẬN DẠNG THEO DÒNG ---
+# Bộ phân tích đọc từng dòng đúng một lần và chỉ giữ lại các dòng của câu hỏi
+# đang xử lý, thay vì re.split cả tài liệu rồi chạy regex DOTALL trên từng khối.
+HEADER_RE = re.compile(r"\s*\*\*(\d+)\.\s*")
+OPTION_START_RE = re.compile(r"[A-Da-d]\.")
+# Chữ cái đáp án có thể nằm ở dòng sau `đáp án:`, nên nhóm chữ cái là tùy chọn
+ANSWER_RE = re.compile(r"đáp án:\s*(?:([A-D])\s*)?", re.IGNORECASE)
+LETTER_RE = re.compile(r"\s*([A-D])\s*", re.IGNORECASE)
+EXPLANATION_RE = re.compile(r"\s*Giải thích:\s*", re.IGNORECASE)
+
+# Trạng thái trong một khối: bỏ qua phần mở đầu, đang đọc câu hỏi, đang đọc phần thân
+_SKIP, _QUESTION, _BODY = range(3)
+# Dòng `đáp án:` đang chờ chữ cái đáp án hoặc dòng `Giải thích:` ở các dòng không trống phía sau
+_LETTER, _EXPLANATION = range(2)
+
+Source = Union[str, Iterable[str]]
+# on_error(số câu, số dòng tiêu đề, lý do) cho một khối `**N.` không tạo được câu hỏi
+ErrorCallback = Callable[[int, int, str], None]
+
+MISSING_OPTIONS = "Không tìm thấy lựa chọn A.–D. sau câu hỏi (câu hỏi phải kết thúc bằng **)"
+MISSING_ANSWER = "Thiếu dòng \"đáp án: X\" kèm \"Giải thích:\""
+
+
+# --- PHẦN 2: HÀM TIỆN ÍCH ---
+def iter_lines(content: str, chunk_size: int = 1 << 20) -> Iterator[str]:
+    """Duyệt một chuỗi theo từng dòng (giữ ký tự xuống dòng), mỗi lần chỉ sao chép một đoạn nhỏ."""
+    start = 0
+    length = len(content)
+    while start < length:
+        end = content.find('\n', start + chunk_size)
+        end = length if end == -1 else end + 1
+        # newline='\n' để chỉ tách theo '\n' giống như regex cũ, giữ nguyên '\r' nếu có
+        yield from io.StringIO(content[start:end], newline='\n')
+        start = end
+
+
+def _build_question(question_id: int, question_lines: list, body_lines: list,
+                    answer: str, answer_line: int, explanation_start: tuple) -> dict:
+    """Ghép các dòng đã gom của một khối thành dictionary câu hỏi."""
+    # Lựa chọn là các dòng `X.` nằm giữa câu hỏi và dòng đáp án được chấp nhận
+    options = {}
+    option_lines = iter(body_lines[:answer_line])
+    for line in option_lines:
+        first = line[:1]
+        if first and first in 'ABCD' and line[1:2] == '.':
+            value = line[2:]
+            # Như `\s*` của regex cũ: lựa chọn trống lấy dòng không trống kế tiếp làm nội dung
+            while value.isspace():
+                value = next(option_lines, '')
+            options[first] = value.strip()
+
+    line_index, offset = explanation_start
+    explanation = body_lines[line_index][offset:] + ''.join(body_lines[line_index + 1:])
+    return {
+        "id": question_id,
+        "question": ''.join(question_lines).rstrip()[:-2].strip(),
+        "options": options,
+        "answer": answer,
+        "explanation": explanation.strip()
+    }
+
+
+def _find_first_header(numbered: Iterator[tuple]) -> Optional[tuple]:
+    """
+    Bỏ qua phần mở đầu; trả về (số dòng, dòng bắt đầu từ tiêu đề, tiêu đề có nằm giữa dòng không) của
+    tiêu đề đầu tiên, hoặc None nếu không có.
+
+    Giống re.split cũ: nếu tài liệu (bỏ khoảng trắng) bắt đầu bằng '**' thì phần mở đầu cũng là một khối
+    và regex cũ tìm `**N.` ở bất kỳ đâu trong đó, kể cả giữa dòng.
+    """
+    searchable = None
+    for line_number, line in numbered:
+        if '**' in line:
+            header = HEADER_RE.match(line)
+            if header:
+                return line_number, line, False
+            if searchable is None:
+                searchable = line.lstrip().startswith('**')
+            if searchable:
+                header = HEADER_RE.search(line)
+                if header:
+                    return line_number, line[header.start():], True
+        elif searchable is None and not line.isspace():
+            searchable = False
+    return None
+
+
+# --- PHẦN 3: BỘ PHÂN TÍCH MỘT LƯỢT ---
+def iter_questions(source: Source, on_error: Optional[ErrorCallback] = None) -> Iterator[dict]:
+    """
+    Phân tích nội dung markdown theo từng dòng và trả về từng câu hỏi ngay khi đọc xong.
+
+    Kết quả giống hệt cách cũ dùng re.split + regex DOTALL: nếu một khối có nhiều dòng
+    `đáp án:` hợp lệ thì dòng cuối cùng được chọn, như nhánh tham lam của regex cũ. Kiểm tra
+    lại bằng `python -m benchmarks.bench_parser --check 200000` sau mỗi lần sửa bộ phân tích.
+
+    Args:
+        source: Một chuỗi, một đối tượng tệp đang mở hoặc bất kỳ iterator nào sinh ra các dòng.
+        on_error: Nếu có, được gọi cho mỗi khối bị bỏ qua với số câu, số dòng (từ 1) và lý do.
+
+    Yields:
+        Dictionary của từng câu hỏi với các khóa id, question, options, answer, explanation.
+    """
+    lines = iter_lines(source) if isinstance(source, str) else source
+    numbered = enumerate(lines, 1)
+    first = _find_first_header(numbered)
+    if first is None:
+        return
+    # Tiêu đề ở dòng 1 hoặc nằm giữa dòng không có ký tự xuống dòng đứng trước như dấu tách cũ
+    first_line = first[0] if first[2] else 1
+
+    state = _SKIP
+    question_id = 0
+    header_line = 0
+    question_lines = []
+    question_closed = False
+    body_lines = []
+    # Đáp án được chấp nhận gần nhất: chữ cái, chỉ số dòng đáp án, (dòng, vị trí) bắt đầu giải thích
+    answer: Optional[str] = None
+    answer_line = 0
+    explanation_start = (0, 0)
+    # Dòng `đáp án:` đang chờ: (_LETTER hoặc _EXPLANATION, chỉ số dòng đáp án, chữ cái đã đọc)
+    pending: Optional[tuple] = None
+
+    match_header = HEADER_RE.match
+    match_option_start = OPTION_START_RE.match
+    match_answer = ANSWER_RE.match
+    match_letter = LETTER_RE.match
+    match_explanation = EXPLANATION_RE.match
+
+    for line_number, line in itertools.chain((first[:2],), numbered):
+        # Kiểm tra '**' bằng phép so khớp chuỗi trước để tránh gọi regex trên mọi dòng
+        header = match_header(line) if '**' in line else None
+        if header:
+            if answer is not None:
+                yield _build_question(question_id, question_lines, body_lines,
+                                      answer, answer_line, explanation_start)
+            elif on_error is not None and state != _SKIP:
+                on_error(question_id, header_line, MISSING_OPTIONS if state == _QUESTION else MISSING_ANSWER)
+            state = _QUESTION
+            question_id = int(header.group(1))
+            header_line = line_number
+            rest = line[header.end():]
+            question_lines = [rest]
+            question_closed = rest.rstrip().endswith('**')
+            body_lines = []
+            answer = None
+            pending = None
+            if not rest and line_number > first_line:
+                # Tiêu đề chỉ có `**N.`: `\s*` của dấu tách cũ nuốt cả ký tự xuống dòng, nên dòng không
+                # trống kế tiếp luôn thuộc về câu hỏi, kể cả khi nó trông như một tiêu đề
+                for line_number, line in numbered:
+                    question_lines.append(line)
+                    if not line.isspace():
+                        question_closed = line.rstrip().endswith('**')
+                        break
+            continue
+
+        if state == _BODY:
+            body_lines.append(line)
+            # Phần lớn các dòng (lựa chọn, giải thích) không phải dòng đáp án và không có đáp án đang chờ
+            if pending is None and line[:1] not in 'đĐ':
+                continue
+            index = len(body_lines) - 1
+            # Như `\s*` của regex cũ, chữ cái đáp án và `Giải thích:` có thể nằm ở các dòng không trống sau đó
+            letter = None
+            matched = match_answer(line) if line[:1] in 'đĐ' else None
+            if matched:
+                pending = None
+                pending_line = index
+                letter = matched.group(1)
+                if letter is None and matched.end() == len(line):
+                    pending = (_LETTER, index, None)
+            elif pending is not None and not line.isspace():
+                stage, pending_line, letter = pending
+                pending = None
+                if stage == _LETTER:
+                    matched = match_letter(line)
+                    letter = matched.group(1) if matched else None
+                else:
+                    explanation = match_explanation(line)
+                    if explanation:
+                        answer, answer_line, explanation_start = letter, pending_line, (index, explanation.end())
+                    letter = None
+            if letter is not None:
+                letter = letter.upper()
+                if matched.end() == len(line):
+                    pending = (_EXPLANATION, pending_line, letter)
+                else:
+                    explanation = match_explanation(line, matched.end())
+                    if explanation:
+                        answer, answer_line, explanation_start = letter, pending_line, (index, explanation.end())
+            continue
+
+        if state == _QUESTION:
+            if question_closed and match_option_start(line):
+                state = _BODY
+                body_lines.append(line)
+            else:
+                question_lines.append(line)
+                if not line.isspace():
+                    question_closed = line.rstrip().endswith('**')
+
+    if answer is not None:
+        yield _build_question(question_id, question_lines, body_lines,
+                              answer, answer_line, explanation_start)
+    elif on_error is not None and state != _SKIP:
+        on_error(question_id, header_line, MISSING_OPTIONS if state == _QUESTION else MISSING_ANSWER)
+
+
+def iter_blocks(source: Source) -> Iterator[str]:
+    """
+    Tách nội dung thành các khối văn bản, mỗi khối bắt đầu bằng một tiêu đề `**N.` (bỏ phần mở đầu).
+
+    Khối giữ lại ký tự xuống dòng đứng trước tiêu đề (như dấu tách cũ), nên phân tích riêng từng khối
+    bằng iter_questions cho đúng câu hỏi như khi phân tích cả tài liệu.
+    """
+    lines = iter_lines(source) if isinstance(source, str) else source
+    numbered = enumerate(lines, 1)
+    first = _find_first_header(numbered)
+    if first is None:
+        return
+    first_line = first[0] if first[2] else 1
+    block = None
+    match_header = HEADER_RE.match
+    for line_number, line in itertools.chain((first[:2],), numbered):
+        header = match_header(line) if '**' in line else None
+        if header is None:
+            block.append(line)
+            continue
+        if block is not None:
+            yield ''.join(block)
+        if line_number > first_line:
+            block = ['\n', line]
+            if header.end() == len(line):
+                # Dòng không trống kế tiếp thuộc về khối này, như trong iter_questions
+                for line_number, line in numbered:
+                    block.append(line)
+                    if not line.isspace():
+                        break
+        else:
+            block = [line]
+    if block is not None:
+        yield ''.join(block)
+
+
+def parse_quiz_from_content(content: str) -> list:
+    """Phân tích nội dung markdown từ một chuỗi thay vì một tệp."""
+    return list(iter_questions(content))
+
+
+def parse_quiz_md(file_path: str) -> list:
+    """
+    Phân tích tệp markdown chứa các câu hỏi trắc nghiệm và trích xuất chúng.
+
+    Args:
+        file_path: Đường dẫn đến tệp .md.
+
+    Returns:
+        Một danh sách các dictionary, mỗi dictionary chứa thông tin một câu hỏi.
+        Trả về danh sách rỗng nếu không tìm thấy câu hỏi nào.
+    """
+    if not os.path.exists(file_path):
+        print(f"Lỗi: Không tìm thấy tệp tại đường dẫn '{file_path}'")
+        return []
+
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return list(iter_questions(f))
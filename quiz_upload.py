@@ -0,0 +1,88 @@
+"""
+Tải lên một tệp markdown lớn cho trang tạo bài mà không giữ cả tệp trong bộ nhớ.
+
+Thân request được đọc dần qua một TextIOWrapper, phân tích từng dòng bằng quiz_parser.iter_questions
+và mỗi câu hỏi được chuyển ngay cho QuizWriter của backend. Trong lúc đó iter_upload sinh ra các sự
+kiện (tiến độ, lỗi của từng khối kèm số dòng, kết quả cuối) để route trả về dạng NDJSON.
+"""
+import io
+from typing import Iterator, Optional
+
+from quiz_parser import iter_questions
+from storage import QuizWriter
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Gửi một sự kiện tiến độ sau mỗi lượng byte đã đọc này
+PROGRESS_BYTES = 256 * 1024
+# Số lỗi được báo chi tiết; các lỗi sau đó chỉ được đếm
+MAX_REPORTED_ERRORS = 200
+
+
+class CountingReader(io.RawIOBase):
+    """Luồng đọc đếm số byte đã đọc và báo lỗi khi vượt quá max_bytes."""
+
+    def __init__(self, stream, max_bytes: int):
+        self.stream = stream
+        self.max_bytes = max_bytes
+        self.count = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self.stream.read(len(buffer))
+        size = len(data)
+        self.count += size
+        if self.count > self.max_bytes:
+            raise ValueError(f"Tệp vượt quá {self.max_bytes // (1024 * 1024)} MB")
+        buffer[:size] = data
+        return size
+
+
+def iter_upload(stream, writer: QuizWriter, total: Optional[int], max_bytes: int = DEFAULT_MAX_BYTES,
+                progress_bytes: int = PROGRESS_BYTES) -> Iterator[dict]:
+    """
+    Phân tích thân request và ghi dần vào writer; sinh ra các sự kiện cho trang tạo bài.
+
+    Sự kiện cuối cùng là {"event": "done", ...} nếu bài đã được lưu (writer.commit()), hoặc
+    {"event": "failed", "message": ...} nếu không có câu hỏi nào hoặc việc đọc bị lỗi.
+    """
+    reader = CountingReader(stream, max_bytes)
+    # newline='\n' để tách dòng giống parse_quiz_from_content; utf-8-sig bỏ BOM của tệp từ Windows
+    lines = io.TextIOWrapper(io.BufferedReader(reader), encoding='utf-8-sig', errors='replace', newline='\n')
+    errors = []
+    error_count = 0
+
+    def on_error(question_id, line, message):
+        nonlocal error_count
+        error_count += 1
+        if error_count <= MAX_REPORTED_ERRORS:
+            errors.append({"event": "error", "question": question_id, "line": line, "message": message})
+
+    def progress():
+        return {"event": "progress", "bytes": reader.count, "total": total,
+                "questions": writer.count, "errors": error_count}
+
+    reported = 0
+    try:
+        for question in iter_questions(lines, on_error):
+            writer.add(question)
+            if errors:
+                yield from errors
+                errors.clear()
+            if reader.count - reported >= progress_bytes:
+                reported = reader.count
+                yield progress()
+    except (OSError, ValueError) as e:
+        yield from errors
+        yield {"event": "failed", "message": str(e), "bytes": reader.count}
+        return
+    yield from errors
+    yield progress()
+    if not writer.count:
+        yield {"event": "failed", "message": "Không trích xuất được câu hỏi nào. Vui lòng kiểm tra lại định dạng.",
+               "bytes": reader.count}
+        return
+    writer.commit()
+    yield {"event": "done", "key": writer.key, "questions": writer.count, "errors": error_count,
+           "bytes": reader.count}
@@ -0,0 +1,172 @@
+import hashlib
+import os
+import time
+from typing import Optional
+
+from quiz_parser import iter_blocks, iter_questions
+from storage import QuizStorage
+
+# Các trường của câu hỏi được so sánh khi một khối thay đổi
+QUESTION_FIELDS = ('question', 'options', 'answer', 'explanation')
+
+
+def block_hash(block: str) -> str:
+    return hashlib.blake2b(block.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def changed_fields(old: dict, new: dict) -> dict:
+    """Các trường mà tác giả đã sửa trong tệp nguồn giữa hai lần phân tích."""
+    return {field: new[field] for field in QUESTION_FIELDS if old.get(field) != new[field]}
+
+
+class WatchedSource:
+    """
+    Một tệp markdown được theo dõi và bài trắc nghiệm tương ứng trong backend lưu trữ.
+
+    Mỗi khối `**N.` được băm; khi tệp đổi, chỉ các khối có mã băm mới được phân tích lại.
+    Bài đã lưu được vá tại chỗ: câu hỏi giữ nguyên ID, và chỉ những trường tác giả thực sự sửa
+    trong tệp nguồn mới bị ghi đè, nên các đáp án đã sửa qua /suggest-update vẫn được giữ.
+    """
+
+    def __init__(self, storage: QuizStorage, path: str, key: str, title: str):
+        self.storage = storage
+        self.path = path
+        self.key = key
+        self.title = title
+        self._stat = None
+        # mã băm khối -> câu hỏi phân tích được (None nếu khối không có câu hỏi hợp lệ)
+        self._blocks = {}
+        # Các câu hỏi theo nội dung tệp nguồn ở lần đồng bộ trước
+        self._questions = None
+
+    def changed(self) -> bool:
+        """So sánh (mtime, kích thước) của tệp với lần kiểm tra trước; rẻ, chỉ một lệnh stat."""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return False
+        stat = (st.st_mtime_ns, st.st_size)
+        if stat == self._stat:
+            return False
+        self._stat = stat
+        return True
+
+    def sync(self) -> Optional[str]:
+        """Đồng bộ nội dung tệp vào bài đã lưu; trả về mô tả thay đổi, hoặc None nếu không có gì đổi."""
+        start = time.perf_counter()
+        with open(self.path, 'r', encoding='utf-8') as f:
+            content = f.read()
+
+        blocks = {}
+        questions = []
+        reparsed = 0
+        for block in iter_blocks(content):
+            digest = block_hash(block)
+            if digest in blocks:
+                question = blocks[digest]
+            elif digest in self._blocks:
+                question = self._blocks[digest]
+            else:
+                question = next(iter_questions(block), None)
+                reparsed += 1
+            blocks[digest] = question
+            if question is not None:
+                questions.append(question)
+        self._blocks = blocks
+
+        if not questions:
+            return f"{self.path}: không có câu hỏi hợp lệ, bỏ qua"
+
+        if self._questions is None:
+            summary = self._first_sync(questions)
+        else:
+            summary = self._patch(self._questions, questions)
+        self._questions = questions
+        if summary is None:
+            return None
+        return (f"{self.path} -> {self.key}: {summary} "
+                f"({len(blocks)} khối, phân tích lại {reparsed}, {(time.perf_counter() - start) * 1000:.1f} ms)")
+
+    def _first_sync(self, questions: list) -> Optional[str]:
+        stored = self.storage.load_quiz(self.key)
+        if stored is None:
+            self.storage.save_quiz(self.key, self.title, questions)
+            return f"đã tạo với {len(questions)} câu hỏi"
+        # Chưa biết nội dung tệp nguồn trước khi bắt đầu theo dõi: coi đáp án và giải thích đang lưu
+        # là bản đúng (có thể đã được sửa qua /suggest-update), chỉ đồng bộ câu hỏi và các lựa chọn.
+        new_by_id = {q['id']: q for q in questions}
+        baseline = [
+            {**q, 'answer': new_by_id[q['id']]['answer'], 'explanation': new_by_id[q['id']]['explanation']}
+            if q.get('id') in new_by_id else q
+            for q in stored
+        ]
+        return self._patch(baseline, questions)
+
+    def _patch(self, old: list, new: list) -> Optional[str]:
+        old_by_id = {}
+        for question in old:
+            old_by_id.setdefault(question.get('id'), question)
+
+        if [q.get('id') for q in old] == [q['id'] for q in new]:
+            # Cùng danh sách ID: chỉ sửa đúng các câu hỏi (và các trường) bị thay đổi
+            updates = {}
+            for question in new:
+                fields = changed_fields(old_by_id[question['id']], question)
+                if fields:
+                    updates.setdefault(question['id'], fields)
+            if not updates:
+                return None
+            self.storage.update_questions(self.key, updates)
+            return f"sửa {len(updates)} câu hỏi"
+
+        def merge(stored: list) -> list:
+            stored_by_id = {}
+            for question in stored:
+                stored_by_id.setdefault(question.get('id'), question)
+            merged = []
+            for question in new:
+                previous = old_by_id.get(question['id'])
+                current = stored_by_id.get(question['id'])
+                if previous is None or current is None:
+                    merged.append(question)
+                else:
+                    merged.append({**current, **changed_fields(previous, question)})
+            return merged
+
+        added = sum(1 for q in new if q['id'] not in old_by_id)
+        new_ids = {q['id'] for q in new}
+        removed = sum(1 for q in old if q.get('id') not in new_ids)
+        self.storage.edit_quiz(self.key, merge)
+        return f"thêm {added}, xóa {removed} câu hỏi, còn {len(new)} câu"
+
+
+def watch(sources, interval: float = 1.0, discover=None):
+    """
+    Thăm dò các tệp nguồn sau mỗi `interval` giây và đồng bộ những tệp vừa thay đổi.
+
+    Args:
+        sources: Danh sách WatchedSource ban đầu.
+        discover: Hàm tùy chọn trả về các WatchedSource mới xuất hiện (gọi ở mỗi vòng thăm dò).
+    """
+    watched = {source.path: source for source in sources}
+    print(f"Đang theo dõi {len(watched)} tệp (thăm dò mỗi {interval:g} giây, Ctrl+C để dừng)...")
+    try:
+        while True:
+            if discover is not None:
+                for source in discover():
+                    if source.path not in watched:
+                        watched[source.path] = source
+                        print(f"Theo dõi thêm tệp mới: {source.path}")
+            for source in list(watched.values()):
+                if not os.path.exists(source.path):
+                    continue
+                if source.changed():
+                    try:
+                        summary = source.sync()
+                    except (OSError, UnicodeDecodeError, KeyError) as e:
+                        summary = f"{source.path}: lỗi khi đồng bộ: {e}"
+                    if summary:
+                        print(summary)
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("\nĐã dừng theo dõi.")
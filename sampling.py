@@ -0,0 +1,132 @@
+import bisect
+import random
+import threading
+from typing import NamedTuple, Optional
+
+from catalog import QuizCatalog, describe_quiz
+from quiz_assets import QuizAssetCache
+
+# Số lần dựng lại chỉ mục và lấy mẫu lại khi dữ liệu thay đổi trong lúc lấy mẫu
+SAMPLE_ATTEMPTS = 3
+
+
+class SubjectQuestions(NamedTuple):
+    """Chỉ mục câu hỏi của một môn: các bài theo thứ tự khóa và tổng tích lũy số câu hỏi."""
+    keys: tuple
+    # ends[i] = tổng số câu hỏi của keys[0..i]
+    ends: tuple
+    # khóa bài -> phiên bản JSON tại thời điểm dựng chỉ mục
+    versions: dict
+    # khóa bài (mọi bài của môn, theo thứ tự) -> token phiên bản của backend lúc dựng, None nếu bài không có
+    tokens: dict
+
+    @property
+    def total(self) -> int:
+        return self.ends[-1] if self.ends else 0
+
+    def locate(self, index: int) -> tuple:
+        """Đổi chỉ số câu hỏi trong toàn môn thành (khóa bài, vị trí trong bài) bằng tìm kiếm nhị phân."""
+        i = bisect.bisect_right(self.ends, index)
+        start = self.ends[i - 1] if i else 0
+        return self.keys[i], index - start
+
+
+class SubjectIndex:
+    """
+    Chỉ mục câu hỏi theo môn học để lấy mẫu N câu ngẫu nhiên từ mọi bài của một môn.
+
+    Mỗi môn chỉ lưu danh sách bài và tổng tích lũy số câu hỏi, được dựng lười ở lần lấy mẫu đầu
+    tiên và dựng lại khi một bài của môn thay đổi: ngay khi backend báo bài bị ghi hoặc xóa trong
+    tiến trình này, hoặc khi token phiên bản của một bài khác với lúc dựng (bài bị sửa từ tiến trình
+    khác), hoặc khi danh sách bài của môn trong danh mục thay đổi; các môn khác không bị ảnh hưởng. Một lần lấy mẫu chọn N chỉ số bằng
+    random.sample trên range (O(N), không sao chép quần thể) rồi tra từng chỉ số bằng bisect,
+    nên chi phí không phụ thuộc tổng số câu hỏi của môn. Cùng seed và cùng dữ liệu luôn cho
+    cùng một đề.
+    """
+
+    def __init__(self, catalog: QuizCatalog, assets: QuizAssetCache):
+        self.catalog = catalog
+        self.assets = assets
+        self._lock = threading.Lock()
+        # tên môn -> SubjectQuestions
+        self._subjects = {}
+        assets.storage.subscribe(self._on_change)
+
+    def get(self, subject: str) -> Optional[SubjectQuestions]:
+        """Trả về chỉ mục của môn (dựng nếu cần), hoặc None nếu môn không có bài nào."""
+        self.catalog.refresh_if_stale()
+        entries = self.catalog.by_subject().get(subject)
+        if not entries:
+            return None
+        members = tuple(sorted(entry['key'] for entry in entries))
+        with self._lock:
+            cached = self._subjects.get(subject)
+        if cached is not None and tuple(cached.tokens) == members and self._is_current(cached):
+            return cached
+
+        keys, ends, versions, tokens = [], [], {}, {}
+        total = 0
+        for key in members:
+            # Đọc token trước khi nạp bài: nếu bài đổi ngay sau đó, lần kiểm tra sau sẽ thấy token khác
+            version = self.assets.storage.version(key)
+            tokens[key] = version[0] if version is not None else None
+            asset = self.assets.get(key)
+            if asset is None or not asset.ids:
+                continue
+            total += len(asset.ids)
+            keys.append(key)
+            ends.append(total)
+            versions[key] = asset.version
+        index = SubjectQuestions(keys=tuple(keys), ends=tuple(ends), versions=versions, tokens=tokens)
+        with self._lock:
+            self._subjects[subject] = index
+        return index
+
+    def _is_current(self, index: SubjectQuestions) -> bool:
+        """Mọi bài của môn vẫn có đúng token phiên bản của backend như lúc dựng chỉ mục."""
+        for key, token in index.tokens.items():
+            version = self.assets.storage.version(key)
+            if (version[0] if version is not None else None) != token:
+                return False
+        return True
+
+    def sample(self, subject: str, count: int, seed: int) -> Optional[tuple]:
+        """
+        Chọn `count` câu hỏi khác nhau của môn theo seed. Trả về (chỉ mục của môn, danh sách các cặp
+        (khóa bài, JSON câu hỏi)), hoặc None nếu môn không tồn tại. Nếu môn có ít câu hơn `count`
+        thì trả về tất cả, đã xáo trộn.
+        """
+        for _ in range(SAMPLE_ATTEMPTS):
+            index = self.get(subject)
+            if index is None:
+                return None
+            questions = self._pick(index, count, seed)
+            if questions is not None:
+                return index, questions
+            # Một bài vừa bị sửa giữa lúc dựng chỉ mục và lúc lấy mẫu: dựng lại và lấy mẫu lại
+            self._invalidate(subject)
+        raise RuntimeError(f"Dữ liệu của môn '{subject}' thay đổi liên tục, không lấy mẫu được.")
+
+    def _pick(self, index: SubjectQuestions, count: int, seed: int) -> Optional[list]:
+        picks = random.Random(seed).sample(range(index.total), min(count, index.total))
+        questions = []
+        assets = {}
+        for pick in picks:
+            key, position = index.locate(pick)
+            if key not in assets:
+                assets[key] = self.assets.get(key)
+            asset = assets[key]
+            if asset is None or asset.version != index.versions[key]:
+                return None
+            questions.append((key, asset.question_bodies[position]))
+        return questions
+
+    def _invalidate(self, subject: str):
+        with self._lock:
+            self._subjects.pop(subject, None)
+
+    def _on_change(self, key: str):
+        entry = describe_quiz(key)
+        with self._lock:
+            if entry is not None:
+                self._subjects.pop(entry['subject'], None)
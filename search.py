@@ -0,0 +1,243 @@
+import bisect
+import heapq
+import math
+import re
+import threading
+from array import array
+from collections import Counter, OrderedDict
+from typing import Optional
+
+from catalog import describe_quiz
+from storage import QuizStorage
+from text_normalize import fold_diacritics
+
+TOKEN_RE = re.compile(r"\w+")
+
+# Tham số xếp hạng BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Từ xuất hiện trong hơn tỷ lệ này số câu hỏi chỉ cộng điểm cho các câu đã khớp từ hiếm hơn
+COMMON_TERM_RATIO = 0.1
+# Nén lại danh sách postings khi số câu hỏi đã xóa vượt quá số câu còn hiệu lực
+COMPACT_RATIO = 1.0
+# Số bit thấp dùng để lưu số lần xuất hiện của một từ trong một câu hỏi
+TF_BITS = 16
+TF_MASK = (1 << TF_BITS) - 1
+# Số kết quả truy vấn gần nhất được giữ lại cho tới lần thay đổi chỉ mục kế tiếp
+RESULT_CACHE_SIZE = 256
+
+
+def tokenize(text: str) -> list:
+    """Tách văn bản thành các âm tiết đã bỏ dấu, giống cách sanitize_filename bỏ dấu tên tệp."""
+    return TOKEN_RE.findall(fold_diacritics(text))
+
+
+def terms(tokens: list) -> list:
+    """
+    Các từ cần lập chỉ mục: từng âm tiết và từng cặp âm tiết liền nhau.
+
+    Phần lớn từ tiếng Việt gồm hai âm tiết và sau khi bỏ dấu chỉ còn vài nghìn âm tiết khác nhau,
+    nên một âm tiết đơn lẻ xuất hiện trong rất nhiều câu hỏi; cặp âm tiết ("dap an") chọn lọc hơn nhiều.
+    """
+    return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+
+def question_terms(question: dict) -> tuple:
+    """Trả về (số lần xuất hiện của từng từ, số âm tiết) của một câu hỏi; không ghép âm tiết giữa các phần."""
+    options = question.get('options') or {}
+    parts = (question.get('question', ''), *options.values(), question.get('explanation', ''))
+    counts = Counter()
+    length = 0
+    # Bỏ dấu cả câu hỏi trong một lần rồi mới tách lại theo từng phần
+    for part in fold_diacritics('\0'.join(parts)).split('\0'):
+        tokens = TOKEN_RE.findall(part)
+        length += len(tokens)
+        counts.update(terms(tokens))
+    return counts, length
+
+
+class SearchIndex:
+    """
+    Chỉ mục đảo ngược trên nội dung câu hỏi, các lựa chọn và giải thích của mọi bài trắc nghiệm.
+
+    Mỗi từ (đã bỏ dấu) ứng với một mảng số nguyên tăng dần, mỗi phần tử gói số hiệu câu hỏi và
+    số lần xuất hiện (số hiệu << 16 | số lần), nên chỉ tốn 8 byte cho mỗi cặp từ-câu hỏi. Khi một
+    bài thay đổi, các câu hỏi cũ của bài được đánh dấu đã xóa và câu hỏi mới được nối vào cuối;
+    danh sách được nén lại khi số câu đã xóa quá nhiều. Chỉ mục được dựng ở lần tìm kiếm đầu tiên
+    (hoặc trước đó trên luồng nền), cập nhật ở lần tìm kiếm kế tiếp sau mỗi lần ghi và đối chiếu
+    token phiên bản của từng bài để bắt thay đổi từ bên ngoài.
+    """
+
+    def __init__(self, storage: QuizStorage):
+        self.storage = storage
+        self._lock = threading.RLock()
+        self._built = False
+        self._fingerprint = None
+        # Các bài vừa được ghi trong tiến trình này, lập lại chỉ mục ở lần dùng kế tiếp
+        self._dirty = set()
+        # từ -> array('Q') các giá trị (số hiệu câu hỏi << TF_BITS) | số lần xuất hiện
+        self._postings = {}
+        # Thông tin theo số hiệu câu hỏi
+        self._doc_keys = []
+        self._doc_question_ids = []
+        self._doc_lengths = array('I')
+        # khóa bài -> (token phiên bản đã lập chỉ mục, danh sách số hiệu câu hỏi)
+        self._quizzes = {}
+        self._deleted = set()
+        self._live_docs = 0
+        self._total_length = 0
+        # Tăng mỗi khi chỉ mục thay đổi; kết quả đã lưu của thế hệ cũ bị bỏ
+        self._generation = 0
+        self._results = OrderedDict()
+        storage.subscribe(self._on_change)
+
+    @property
+    def size(self) -> int:
+        """Số câu hỏi đang có trong chỉ mục."""
+        return self._live_docs
+
+    def refresh(self):
+        """Dựng chỉ mục nếu chưa có, hoặc lập lại chỉ mục cho các bài vừa được ghi hay bị thay đổi từ bên ngoài."""
+        fingerprint = self.storage.fingerprint()
+        if self._built and fingerprint == self._fingerprint and not self._dirty:
+            return
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            if self._built and fingerprint == self._fingerprint:
+                # Chỉ có các lần ghi của chính tiến trình này: lập lại chỉ mục đúng các bài đó
+                for key in dirty:
+                    self._reindex(key)
+                return
+            keys = [key for key in self.storage.list_quizzes() if describe_quiz(key)]
+            for key in keys:
+                self._reindex(key)
+            for key in set(self._quizzes) - set(keys):
+                self._remove(key)
+            self._fingerprint = fingerprint
+            self._built = True
+
+    def start_background_build(self):
+        """Dựng chỉ mục trên một luồng nền để lần tìm kiếm đầu tiên không phải chờ."""
+        threading.Thread(target=self.refresh, name='search-index', daemon=True).start()
+
+    def search(self, query: str, limit: int = 20, key_prefix: Optional[str] = None) -> tuple:
+        """
+        Tìm các câu hỏi khớp với truy vấn, xếp hạng theo BM25.
+
+        Returns:
+            (tổng số câu hỏi khớp, danh sách tối đa `limit` bộ (khóa bài, ID câu hỏi, điểm)).
+        """
+        self.refresh()
+        query_terms = list(dict.fromkeys(terms(tokenize(query))))
+        cache_key = (tuple(query_terms), limit, key_prefix)
+        with self._lock:
+            cached = self._results.get(cache_key)
+            if cached is not None and cached[0] == self._generation:
+                self._results.move_to_end(cache_key)
+                return cached[1]
+            result = self._search(query_terms, limit, key_prefix)
+            self._results[cache_key] = (self._generation, result)
+            if len(self._results) > RESULT_CACHE_SIZE:
+                self._results.popitem(last=False)
+            return result
+
+    def _search(self, query_terms: list, limit: int, key_prefix: Optional[str]) -> tuple:
+        if not query_terms or not self._live_docs:
+            return 0, []
+        total_docs = self._live_docs
+        average_length = self._total_length / total_docs
+        lengths = self._doc_lengths
+        deleted = self._deleted
+
+        # Xét từ hiếm trước để các từ phổ biến chỉ cần cộng điểm cho tập ứng viên nhỏ
+        postings = sorted((self._postings[t] for t in query_terms if t in self._postings), key=len)
+        scores = {}
+        for entries in postings:
+            df = len(entries)
+            idf = math.log(1 + (total_docs - df + 0.5) / (df + 0.5))
+            if scores and df > total_docs * COMMON_TERM_RATIO:
+                matched = []
+                for doc in scores:
+                    i = bisect.bisect_left(entries, doc << TF_BITS)
+                    if i < df and entries[i] >> TF_BITS == doc:
+                        matched.append(entries[i])
+                entries = matched
+            for entry in entries:
+                doc = entry >> TF_BITS
+                if doc in deleted:
+                    continue
+                tf = entry & TF_MASK
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[doc] / average_length)
+                scores[doc] = scores.get(doc, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        if key_prefix:
+            scores = {doc: score for doc, score in scores.items()
+                      if self._doc_keys[doc].startswith(key_prefix)}
+        top = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return len(scores), [(self._doc_keys[doc], self._doc_question_ids[doc], score) for doc, score in top]
+
+    def _reindex(self, key: str):
+        """Lập lại chỉ mục của một bài nếu token phiên bản của nó đã đổi."""
+        version = self.storage.version(key)
+        if version is None:
+            self._remove(key)
+            return
+        indexed = self._quizzes.get(key)
+        if indexed is not None and indexed[0] == version[0]:
+            return
+        questions = self.storage.load_quiz(key)
+        if questions is None:
+            self._remove(key)
+            return
+        self._remove(key)
+        postings = self._postings
+        doc_ids = []
+        for question in questions:
+            doc = len(self._doc_keys)
+            base = doc << TF_BITS
+            counts, length = question_terms(question)
+            for term, tf in counts.items():
+                entries = postings.get(term)
+                if entries is None:
+                    entries = postings[term] = array('Q')
+                entries.append(base | (tf if tf < TF_MASK else TF_MASK))
+            self._doc_keys.append(key)
+            self._doc_question_ids.append(question.get('id'))
+            self._doc_lengths.append(length)
+            self._total_length += length
+            doc_ids.append(doc)
+        self._quizzes[key] = (version[0], doc_ids)
+        self._live_docs += len(doc_ids)
+        self._generation += 1
+
+    def _remove(self, key: str):
+        indexed = self._quizzes.pop(key, None)
+        if indexed is None:
+            return
+        for doc in indexed[1]:
+            self._deleted.add(doc)
+            self._total_length -= self._doc_lengths[doc]
+        self._live_docs -= len(indexed[1])
+        self._generation += 1
+        if len(self._deleted) > self._live_docs * COMPACT_RATIO:
+            self._compact()
+
+    def _compact(self):
+        """Loại các câu hỏi đã xóa khỏi mọi danh sách postings (số hiệu câu hỏi được giữ nguyên)."""
+        deleted = self._deleted
+        for term, entries in list(self._postings.items()):
+            kept = array('Q', (entry for entry in entries if entry >> TF_BITS not in deleted))
+            if not kept:
+                del self._postings[term]
+            elif len(kept) < len(entries):
+                self._postings[term] = kept
+        self._deleted = set()
+
+    def _on_change(self, key: str):
+        # Không lập chỉ mục trong request ghi (và không chờ khóa nếu chỉ mục đang được dựng):
+        # chỉ đánh dấu bài, nhiều lần ghi liên tiếp vào một bài được gộp thành một lần lập chỉ mục.
+        if not self._built or not describe_quiz(key):
+            return
+        self._dirty.add(key)
+        # Thay đổi do chính ứng dụng tạo ra đã được ghi nhận, không cần đối chiếu lại mọi bài
+        self._fingerprint = self.storage.fingerprint()
@@ -0,0 +1,145 @@
+"""
+Chạy máy chủ ở chế độ thật với nhiều worker, thay cho app.run(debug=True) của app.py.
+
+    python serve.py --workers 4 --data-dir /srv/quiz/data
+    python serve.py --asgi --workers 4 --port 8000
+
+Mặc định dùng gunicorn (worker gthread: mỗi tiến trình nhiều luồng) chạy ứng dụng WSGI của Flask.
+Với --asgi, mỗi worker chạy asgi.application bằng gunicorn với worker của uvicorn (hoặc uvicorn
+nếu không có gunicorn): trang làm bài và JSON của bài được phục vụ từ bộ nhớ đệm ngay trên vòng
+lặp sự kiện, các route còn lại chạy trong nhóm luồng. gunicorn và uvicorn là phụ thuộc tùy chọn;
+khi thiếu cả hai, máy chủ của Werkzeug được dùng với một tiến trình nhiều luồng.
+
+Mỗi worker là một tiến trình riêng với bộ nhớ đệm, hàng đợi ghi và chỉ mục riêng, được dựng sau
+khi fork (không preload) để các luồng nền của app.py chạy trong từng worker. Các worker dùng chung
+thư mục dữ liệu: việc ghi đi qua khóa tệp của backend, và bộ nhớ đệm của mỗi worker phát hiện bài
+bị worker khác sửa qua token phiên bản. /metrics chỉ trả về số đo của worker nhận request.
+
+So sánh thông lượng (req/s) đo bằng `python -m benchmarks.bench_server --modes debug werkzeug
+gunicorn asgi uvicorn --workers 2 --requests 3000`: 8 luồng gửi request keep-alive, bài 500 câu,
+máy ảo 1 nhân (nên nhiều worker gần như không lợi thêm; trên máy nhiều nhân các route đọc tăng
+gần tuyến tính theo số worker vì mỗi worker có GIL riêng):
+
+    máy chủ                                       /data/<bài>.json   /data/<bài>.html      /
+    python app.py (debug=True, như trước)                      675                716    689
+    serve.py --server werkzeug (1 tiến trình)                  712                661    598
+    serve.py (gunicorn gthread, 2 worker x 8 luồng)            759                848    773
+    serve.py --asgi (gunicorn + uvicorn, 2 worker)            1250               2017    982
+    serve.py --asgi --server uvicorn (2 worker)                182                181    174
+
+Đo trong tiến trình (`--in-process`), một request JSON tốn khoảng 590 µs qua Flask và 42 µs qua
+đường nhanh của asgi.py (trang HTML: 546 µs và 28 µs). Bộ quản lý nhiều tiến trình của chính
+uvicorn chậm bất thường trong phép đo trên nên mặc định dùng gunicorn để quản lý worker ASGI.
+"""
+import argparse
+import importlib.util
+import os
+import sys
+
+
+def installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def choose_server(requested: str, asgi: bool) -> str:
+    if requested != 'auto':
+        return requested
+    if asgi:
+        if not installed('uvicorn'):
+            return 'werkzeug'
+        # Bộ quản lý nhiều tiến trình của chính uvicorn chậm hơn hẳn gunicorn với worker của uvicorn
+        return 'gunicorn' if installed('gunicorn') else 'uvicorn'
+    return 'gunicorn' if installed('gunicorn') else 'werkzeug'
+
+
+def uvicorn_worker_class() -> str:
+    # uvicorn.workers đã được tách thành gói uvicorn-worker; dùng gói mới nếu có
+    return 'uvicorn_worker.UvicornWorker' if installed('uvicorn_worker') else 'uvicorn.workers.UvicornWorker'
+
+
+def run_gunicorn(args):
+    from gunicorn.app.base import BaseApplication
+
+    class QuizApplication(BaseApplication):
+        def load_config(self):
+            options = {
+                'bind': f"{args.host}:{args.port}",
+                'workers': args.workers,
+                'threads': args.threads,
+                'worker_class': uvicorn_worker_class() if args.asgi else 'gthread',
+                'timeout': args.timeout,
+                'graceful_timeout': args.timeout,
+                'preload_app': False,
+            }
+            for name, value in options.items():
+                self.cfg.set(name, value)
+
+        def load(self):
+            if args.asgi:
+                from asgi import application
+                return application
+            from app import app
+            return app
+
+    QuizApplication().run()
+
+
+def run_uvicorn(args):
+    import uvicorn
+    uvicorn.run('asgi:application', host=args.host, port=args.port, workers=args.workers,
+                timeout_graceful_shutdown=args.timeout, log_level='info')
+
+
+def run_werkzeug(args):
+    from werkzeug.serving import run_simple
+
+    if args.workers > 1:
+        # Máy chủ của Werkzeug chỉ fork một tiến trình cho mỗi request, không có worker thường trực
+        print("Cảnh báo: cần cài gunicorn hoặc uvicorn để chạy nhiều worker; dùng một tiến trình nhiều luồng.")
+    if args.asgi:
+        print("Cảnh báo: cần cài uvicorn để chạy ASGI; dùng ứng dụng WSGI.")
+    from app import app
+    run_simple(args.host, args.port, app, threaded=True, use_reloader=False, use_debugger=False)
+
+
+SERVERS = {
+    'gunicorn': run_gunicorn,
+    'uvicorn': run_uvicorn,
+    'werkzeug': run_werkzeug,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chạy máy chủ bài trắc nghiệm với nhiều worker.")
+    parser.add_argument("--host", default=os.environ.get('QUIZ_HOST', '127.0.0.1'), help="Địa chỉ lắng nghe.")
+    parser.add_argument("--port", type=int, default=int(os.environ.get('QUIZ_PORT', '8000')), help="Cổng lắng nghe.")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get('QUIZ_WORKERS', str(os.cpu_count() or 1))),
+                        help="Số tiến trình worker (mặc định: số nhân CPU).")
+    parser.add_argument("--threads", type=int, default=int(os.environ.get('QUIZ_THREADS', '8')),
+                        help="Số luồng mỗi worker (gunicorn gthread).")
+    parser.add_argument("--data-dir", default=os.environ.get('QUIZ_DATA_DIR', 'data'),
+                        help="Thư mục dữ liệu (mặc định: QUIZ_DATA_DIR hoặc ./data).")
+    parser.add_argument("--storage", choices=("file", "packed", "sqlite"), default=os.environ.get('QUIZ_STORAGE', 'file'),
+                        help="Backend lưu trữ.")
+    parser.add_argument("--asgi", action="store_true", help="Chạy asgi.application thay cho ứng dụng WSGI.")
+    parser.add_argument("--server", choices=("auto",) + tuple(SERVERS), default="auto",
+                        help="Máy chủ dùng để chạy (mặc định: gunicorn nếu đã cài, nếu không thì uvicorn với --asgi hoặc werkzeug).")
+    parser.add_argument("--timeout", type=int, default=30, help="Thời gian tối đa (giây) cho một request và khi dừng.")
+    args = parser.parse_args()
+
+    # app.py đọc cấu hình từ biến môi trường khi được nạp trong từng worker
+    os.environ['QUIZ_DATA_DIR'] = os.path.abspath(args.data_dir)
+    os.environ['QUIZ_STORAGE'] = args.storage
+    server = choose_server(args.server, args.asgi)
+    if server != 'werkzeug' and not installed(server):
+        sys.exit(f"Lỗi: chưa cài {server} (pip install {server}).")
+    if args.asgi and server == 'gunicorn' and not installed('uvicorn'):
+        sys.exit("Lỗi: chạy ASGI bằng gunicorn cần cài uvicorn (pip install uvicorn).")
+
+    print(f"Máy chủ {server} ({'ASGI' if args.asgi else 'WSGI'}, {args.workers} worker) tại "
+          f"http://{args.host}:{args.port}, dữ liệu: {os.environ['QUIZ_DATA_DIR']}")
+    SERVERS[server](args)
+
+
+if __name__ == '__main__':
+    main()
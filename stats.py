@@ -0,0 +1,204 @@
+import heapq
+import json
+import os
+import threading
+from typing import NamedTuple, Optional
+
+from catalog import describe_quiz
+from storage import atomic_write
+
+# Bộ đếm đã tổng hợp được lưu cạnh nhật ký để khởi động lại không phải đọc lại toàn bộ nhật ký
+STATS_SNAPSHOT_FILENAME = '.attempt_stats.json'
+# Lưu lại bộ đếm sau mỗi ngần này sự kiện mới
+SNAPSHOT_EVERY = 10000
+# Mỗi lần đọc phần mới của nhật ký tối đa ngần này byte
+READ_CHUNK_SIZE = 1 << 20
+# Các lựa chọn được đếm riêng; câu trả lời khác (bỏ trống, sai định dạng) được gom vào '?'
+OPTION_KEYS = ('A', 'B', 'C', 'D')
+
+
+class QuestionStats(NamedTuple):
+    key: str
+    question_id: int
+    attempts: int
+    correct: int
+    # lựa chọn -> số lần được chọn
+    options: dict
+
+    @property
+    def correct_rate(self) -> float:
+        return self.correct / self.attempts if self.attempts else 0.0
+
+
+class AttemptStats:
+    """
+    Bộ đếm chạy cho từng câu hỏi và từng bài, tổng hợp từ nhật ký lượt làm bài (attempts.py).
+
+    Mỗi câu trả lời chỉ cộng vào vài bộ đếm (O(1)); refresh() chỉ đọc phần nhật ký được ghi thêm
+    kể từ vị trí đã đọc lần trước, nên thấy cả câu trả lời do các worker khác ghi. Bộ đếm cùng vị
+    trí đó được lưu định kỳ ra tệp snapshot, nên các truy vấn thống kê không bao giờ quét nhật ký
+    thô, kể cả khi nhật ký có hàng triệu dòng.
+    """
+
+    def __init__(self, log_path: str, snapshot_path: str):
+        self.log_path = log_path
+        self.snapshot_path = snapshot_path
+        self._lock = threading.Lock()
+        # khóa bài -> [số lần trả lời, số lần đúng, {ID câu hỏi: [số lần trả lời, số lần đúng, {lựa chọn: số lần}]}]
+        self._quizzes = {}
+        # Số byte nhật ký đã được tổng hợp
+        self._offset = 0
+        self._unsaved = 0
+        # (vị trí nhật ký, tham số) -> bảng xếp hạng đã tính
+        self._ranking = None
+        self._load_snapshot()
+
+    @property
+    def offset(self) -> int:
+        return self._offset
+
+    def _load_snapshot(self):
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            return
+        for key, question_id, attempts, correct, options in snapshot.get('questions', []):
+            quiz = self._quizzes.setdefault(key, [0, 0, {}])
+            quiz[0] += attempts
+            quiz[1] += correct
+            quiz[2][question_id] = [attempts, correct, options]
+        self._offset = snapshot.get('offset', 0)
+
+    def save_snapshot(self):
+        """Ghi bộ đếm hiện tại cùng vị trí nhật ký đã đọc (ghi nguyên tử); bỏ qua nếu không có gì mới."""
+        with self._lock:
+            if not self._unsaved:
+                return
+            snapshot = {
+                'offset': self._offset,
+                'questions': [[key, question_id, *counters] for key, quiz in self._quizzes.items()
+                              for question_id, counters in quiz[2].items()]
+            }
+            self._unsaved = 0
+        atomic_write(self.snapshot_path, json.dumps(snapshot, ensure_ascii=False, separators=(',', ':')))
+
+    def reset(self):
+        with self._lock:
+            self._quizzes.clear()
+            self._offset = 0
+            self._unsaved = 0
+            self._ranking = None
+
+    def refresh(self) -> int:
+        """Cộng các câu trả lời mới được ghi vào nhật ký; trả về số câu trả lời vừa cộng."""
+        try:
+            size = os.path.getsize(self.log_path)
+        except OSError:
+            return 0
+        if size < self._offset:
+            # Nhật ký bị xóa hoặc thay bằng tệp mới: tổng hợp lại từ đầu
+            self.reset()
+        if size == self._offset:
+            return 0
+
+        added = 0
+        with self._lock:
+            with open(self.log_path, 'rb') as f:
+                f.seek(self._offset)
+                pending = b''
+                while True:
+                    chunk = f.read(READ_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    data = pending + chunk
+                    end = data.rfind(b'\n') + 1
+                    # Chỉ cộng các dòng đã ghi trọn; phần dở dang được đọc lại ở lần sau
+                    pending = data[end:]
+                    for line in data[:end].splitlines():
+                        if line:
+                            added += self._add(line)
+                    self._offset += end
+            if added:
+                self._ranking = None
+                self._unsaved += added
+            save = self._unsaved >= SNAPSHOT_EVERY
+        if save:
+            self.save_snapshot()
+        return added
+
+    def start_background_refresh(self):
+        """Cộng phần nhật ký chưa có trong snapshot trên một luồng nền khi khởi động."""
+        threading.Thread(target=self.refresh, name='attempt-stats', daemon=True).start()
+
+    def _add(self, line: bytes) -> int:
+        try:
+            event = json.loads(line)
+            key = event['quiz']
+            question_id = event['question_id']
+            correct = 1 if event['correct'] else 0
+        except (ValueError, KeyError, TypeError):
+            return 0
+        answer = event.get('answer')
+        option = answer if answer in OPTION_KEYS else '?'
+
+        quiz = self._quizzes.get(key)
+        if quiz is None:
+            quiz = self._quizzes[key] = [0, 0, {}]
+        quiz[0] += 1
+        quiz[1] += correct
+        counters = quiz[2].get(question_id)
+        if counters is None:
+            counters = quiz[2][question_id] = [0, 0, {}]
+        counters[0] += 1
+        counters[1] += correct
+        counters[2][option] = counters[2].get(option, 0) + 1
+        return 1
+
+    def question(self, key: str, question_id: int) -> Optional[QuestionStats]:
+        with self._lock:
+            counters = self._quizzes.get(key, (0, 0, {}))[2].get(question_id)
+            if counters is None:
+                return None
+            return QuestionStats(key, question_id, counters[0], counters[1], dict(counters[2]))
+
+    def quiz(self, key: str) -> Optional[dict]:
+        """Tổng hợp của một bài: số câu trả lời, số câu đúng và thống kê của từng câu hỏi."""
+        with self._lock:
+            quiz = self._quizzes.get(key)
+            if quiz is None:
+                return None
+            attempts, correct = quiz[0], quiz[1]
+            questions = [QuestionStats(key, question_id, counters[0], counters[1], dict(counters[2]))
+                         for question_id, counters in quiz[2].items()]
+        questions.sort(key=lambda stats: stats.question_id if isinstance(stats.question_id, int) else 0)
+        return {'attempts': attempts, 'correct': correct, 'questions': questions}
+
+    def hardest_by_subject(self, limit: int = 10, min_attempts: int = 5) -> dict:
+        """
+        Các câu hỏi có tỷ lệ đúng thấp nhất của từng môn (chỉ xét câu có ít nhất `min_attempts` lượt trả lời).
+
+        Chỉ duyệt các bộ đếm đã tổng hợp (một mục cho mỗi câu hỏi), và kết quả được giữ lại cho tới
+        khi có câu trả lời mới.
+        """
+        with self._lock:
+            cache_key = (self._offset, limit, min_attempts)
+            if self._ranking is not None and self._ranking[0] == cache_key:
+                return self._ranking[1]
+            by_subject = {}
+            for key, quiz in self._quizzes.items():
+                entry = describe_quiz(key)
+                if entry is None:
+                    continue
+                questions = by_subject.setdefault(entry['subject'], [])
+                for question_id, counters in quiz[2].items():
+                    if counters[0] >= min_attempts:
+                        questions.append(QuestionStats(key, question_id, counters[0], counters[1], counters[2]))
+            # Sao chép bộ đếm lựa chọn của các câu được chọn để kết quả không đổi theo các câu trả lời sau
+            ranking = {
+                subject: [stats._replace(options=dict(stats.options)) for stats in
+                          heapq.nsmallest(limit, questions, key=lambda stats: (stats.correct_rate, -stats.attempts))]
+                for subject, questions in sorted(by_subject.items()) if questions
+            }
+            self._ranking = (cache_key, ranking)
+            return ranking
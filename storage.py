@@ -0,0 +1,620 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from quiz_pack import PACKED_SUFFIX, PackedQuiz, encode as encode_packed
+
+try:
+    import fcntl
+except ImportError:  # Windows không có fcntl, dùng msvcrt để khóa tệp
+    fcntl = None
+    import msvcrt
+
+# --- PHẦN 0: GHI TỆP AN TOÀN ---
+LOCK_DIRNAME = '.locks'
+TITLES_FILENAME = '.titles.json'
+
+
+@contextmanager
+def file_lock(lock_path: str):
+    """Khóa độc quyền giữa các tiến trình (ví dụ các worker gunicorn) và giữa các luồng."""
+    os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+    with open(lock_path, 'a+b') as f:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def atomic_write(path: str, data, encoding: str = 'utf-8'):
+    """Ghi ra tệp tạm cùng thư mục rồi đổi tên, để người đọc không bao giờ thấy tệp ghi dở."""
+    if isinstance(data, str):
+        data = data.encode(encoding)
+    directory, basename = os.path.split(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{basename}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+# --- PHẦN 1: GIAO DIỆN CHUNG ---
+# Mỗi bài trắc nghiệm được xác định bằng một khóa dạng "subject---quiz"
+# (tên tệp không có phần mở rộng), giống quy ước đặt tên tệp trong thư mục data.
+
+
+class QuizStorage:
+    """Giao diện chung cho các cách lưu trữ bài trắc nghiệm."""
+
+    def __init__(self):
+        self._listeners = []
+
+    def subscribe(self, callback):
+        """Đăng ký hàm callback(key) được gọi sau mỗi lần một bài bị ghi hoặc xóa trong tiến trình này."""
+        self._listeners.append(callback)
+
+    def _notify(self, key: str):
+        for callback in self._listeners:
+            try:
+                callback(key)
+            except Exception as e:
+                print(f"Lỗi khi xử lý thay đổi của bài '{key}': {e}")
+
+    def list_quizzes(self) -> list:
+        """Trả về danh sách khóa của tất cả bài trắc nghiệm."""
+        raise NotImplementedError
+
+    def fingerprint(self):
+        """Giá trị rẻ để tính, thay đổi mỗi khi danh sách bài trắc nghiệm có thể đã thay đổi."""
+        raise NotImplementedError
+
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def version(self, key: str) -> Optional[tuple]:
+        """
+        Trả về (token, last_modified) của một bài, rẻ hơn nhiều so với đọc nội dung.
+
+        token thay đổi mỗi khi bài bị ghi (kể cả bởi tiến trình khác); last_modified là
+        thời điểm sửa đổi tính bằng giây. Trả về None nếu bài không tồn tại.
+        """
+        raise NotImplementedError
+
+    def load_quiz(self, key: str) -> Optional[list]:
+        """Trả về danh sách câu hỏi, hoặc None nếu không tìm thấy bài trắc nghiệm."""
+        raise NotImplementedError
+
+    def get_title(self, key: str) -> Optional[str]:
+        """Trả về tên gốc (có dấu) của bài trắc nghiệm nếu đã được lưu."""
+        return None
+
+    def save_quiz(self, key: str, title: str, questions: list):
+        """Tạo mới hoặc ghi đè toàn bộ một bài trắc nghiệm."""
+        raise NotImplementedError
+
+    def save_many(self, quizzes) -> int:
+        """Lưu nhiều bài trắc nghiệm (các bộ (khóa, tên, câu hỏi)). Trả về số bài đã lưu."""
+        count = 0
+        for key, title, questions in quizzes:
+            self.save_quiz(key, title, questions)
+            count += 1
+        return count
+
+    def open_writer(self, key: str, title: Optional[str]) -> 'QuizWriter':
+        """Ghi dần một bài từng câu hỏi (xem QuizWriter); bài chỉ thay đổi khi commit()."""
+        return QuizWriter(self, key, title)
+
+    def load_question(self, key: str, question_id: int) -> Optional[dict]:
+        """Một câu hỏi theo ID (câu đầu tiên nếu trùng ID), hoặc None nếu không có bài hay câu hỏi này."""
+        for question in self.load_quiz(key) or []:
+            if question.get('id') == question_id:
+                return question
+        return None
+
+    def update_question(self, key: str, question_id: int, fields: dict) -> bool:
+        """Cập nhật một câu hỏi. Trả về False nếu không có câu hỏi với ID này."""
+        return not self.update_questions(key, {question_id: fields})
+
+    def update_questions(self, key: str, updates: dict) -> list:
+        """
+        Áp dụng nhiều cập nhật {question_id: fields} cho một bài trong một lần ghi.
+
+        Returns:
+            Danh sách các ID không tìm thấy. Ném KeyError nếu bài trắc nghiệm không tồn tại.
+        """
+        raise NotImplementedError
+
+    def edit_quiz(self, key: str, edit) -> bool:
+        """
+        Đọc, sửa và ghi lại một bài mà không để tiến trình khác chen vào giữa.
+
+        edit(questions) nhận danh sách câu hỏi hiện tại và trả về danh sách mới, hoặc None nếu
+        không cần ghi. Trả về True nếu bài đã được ghi. Ném KeyError nếu bài không tồn tại.
+        """
+        raise NotImplementedError
+
+    def delete_quiz(self, key: str):
+        raise NotImplementedError
+
+
+class QuizWriter:
+    """
+    Nhận từng câu hỏi qua add() rồi lưu cả bài bằng commit(), ví dụ khi phân tích dần một tệp tải lên.
+
+    Mặc định các câu hỏi được gom trong bộ nhớ rồi lưu bằng save_quiz; FileStorage ghi thẳng từng câu
+    ra tệp tạm. Dùng trong khối with để bài dở dang bị hủy nếu không kịp commit().
+    """
+
+    def __init__(self, storage: QuizStorage, key: str, title: Optional[str]):
+        self.storage = storage
+        self.key = key
+        self.title = title
+        self.count = 0
+        self._questions = []
+
+    def add(self, question: dict):
+        self._questions.append(question)
+        self.count += 1
+
+    def commit(self) -> int:
+        self.storage.save_quiz(self.key, self.title, self._questions)
+        self._questions = []
+        return self.count
+
+    def abort(self):
+        self._questions = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        # Sau commit() không còn gì để hủy
+        self.abort()
+
+
+# --- PHẦN 2: LƯU TRỮ BẰNG TỆP JSON ---
+class FileStorage(QuizStorage):
+    """Mỗi bài trắc nghiệm là một tệp <khóa>.json trong thư mục dữ liệu (cách lưu truyền thống)."""
+    SUFFIX = '.json'
+
+    def __init__(self, data_dir: str):
+        super().__init__()
+        self.data_dir = data_dir
+        self._titles_path = os.path.join(data_dir, TITLES_FILENAME)
+        # (mtime_ns, {khóa: tên}) của tệp .titles.json lần đọc gần nhất
+        self._titles_cache = (None, {})
+
+    def quiz_path(self, key: str) -> str:
+        return os.path.join(self.data_dir, f"{key}{self.SUFFIX}")
+
+    def lock(self, key: str):
+        """Khóa ghi của một bài, dùng chung giữa các tiến trình qua data/.locks/<khóa>.lock."""
+        return file_lock(os.path.join(self.data_dir, LOCK_DIRNAME, f"{key}.lock"))
+
+    def list_quizzes(self) -> list:
+        try:
+            with os.scandir(self.data_dir) as it:
+                return [entry.name[:-len(self.SUFFIX)] for entry in it
+                        if entry.name.endswith(self.SUFFIX) and not entry.name.startswith('.')
+                        and entry.is_file()]
+        except OSError:
+            return []
+
+    def fingerprint(self):
+        try:
+            return os.stat(self.data_dir).st_mtime_ns
+        except OSError:
+            return None
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self.quiz_path(key))
+
+    def version(self, key: str) -> Optional[tuple]:
+        try:
+            st = os.stat(self.quiz_path(key))
+        except OSError:
+            return None
+        # Mỗi lần ghi là một tệp mới (đổi tên nguyên tử) nên inode cũng thay đổi
+        return (st.st_mtime_ns, st.st_size, st.st_ino), st.st_mtime
+
+    def load_quiz(self, key: str) -> Optional[list]:
+        try:
+            with open(self.quiz_path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _read_titles(self) -> dict:
+        try:
+            mtime = os.stat(self._titles_path).st_mtime_ns
+        except OSError:
+            return {}
+        if self._titles_cache[0] != mtime:
+            with open(self._titles_path, 'r', encoding='utf-8') as f:
+                self._titles_cache = (mtime, json.load(f))
+        return self._titles_cache[1]
+
+    def _set_title(self, key: str, title: Optional[str]):
+        self._set_titles({key: title})
+
+    def _set_titles(self, changes: dict):
+        """Đặt (hoặc xóa, nếu tên là None) tên của nhiều bài bằng một lần ghi."""
+        # Tên các bài được gom vào một tệp ẩn duy nhất thay vì thêm một tệp cho mỗi bài
+        with file_lock(os.path.join(self.data_dir, LOCK_DIRNAME, f"{TITLES_FILENAME}.lock")):
+            titles = dict(self._read_titles())
+            changed = False
+            for key, title in changes.items():
+                if title is None:
+                    changed |= titles.pop(key, None) is not None
+                elif titles.get(key) != title:
+                    titles[key] = title
+                    changed = True
+            if changed:
+                atomic_write(self._titles_path, json.dumps(titles, ensure_ascii=False, indent=4))
+
+    def get_title(self, key: str) -> Optional[str]:
+        return self._read_titles().get(key)
+
+    def _write(self, key: str, questions: list):
+        atomic_write(self.quiz_path(key), json.dumps(questions, ensure_ascii=False, indent=4))
+
+    def save_quiz(self, key: str, title: str, questions: list):
+        with self.lock(key):
+            self._write(key, questions)
+        if title is not None:
+            self._set_title(key, title)
+        self._notify(key)
+
+    def save_many(self, quizzes) -> int:
+        # Mỗi tệp vẫn được ghi dưới khóa riêng, nhưng tên các bài chỉ được ghi vào .titles.json một lần
+        saved, titles = [], {}
+        for key, title, questions in quizzes:
+            with self.lock(key):
+                self._write(key, questions)
+            saved.append(key)
+            if title is not None:
+                titles[key] = title
+        if titles:
+            self._set_titles(titles)
+        for key in saved:
+            self._notify(key)
+        return len(saved)
+
+    def update_questions(self, key: str, updates: dict) -> list:
+        # Đọc, sửa và ghi lại trong cùng một khóa để không mất cập nhật của tiến trình khác
+        with self.lock(key):
+            quiz_data = self.load_quiz(key)
+            if quiz_data is None:
+                raise KeyError(key)
+
+            remaining = dict(updates)
+            for question in quiz_data:
+                fields = remaining.pop(question.get('id'), None)
+                if fields is not None:
+                    question.update(fields)
+
+            if len(remaining) < len(updates):
+                self._write(key, quiz_data)
+        if len(remaining) < len(updates):
+            self._notify(key)
+        return list(remaining)
+
+    def edit_quiz(self, key: str, edit) -> bool:
+        with self.lock(key):
+            questions = self.load_quiz(key)
+            if questions is None:
+                raise KeyError(key)
+            edited = edit(questions)
+            if edited is not None:
+                self._write(key, edited)
+        if edited is not None:
+            self._notify(key)
+        return edited is not None
+
+    def open_writer(self, key: str, title: Optional[str]) -> QuizWriter:
+        return FileQuizWriter(self, key, title)
+
+    def delete_quiz(self, key: str):
+        with self.lock(key):
+            if os.path.exists(self.quiz_path(key)):
+                os.remove(self.quiz_path(key))
+        self._set_title(key, None)
+        self._notify(key)
+
+
+class FileQuizWriter(QuizWriter):
+    """Ghi từng câu hỏi ra tệp tạm trong thư mục dữ liệu, cùng định dạng với _write, rồi đổi tên khi commit()."""
+
+    def __init__(self, storage: FileStorage, key: str, title: Optional[str]):
+        super().__init__(storage, key, title)
+        path = storage.quiz_path(key)
+        directory, basename = os.path.split(path)
+        fd, self._tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{basename}.", suffix='.tmp')
+        self._file = os.fdopen(fd, 'w', encoding='utf-8')
+        self._file.write('[')
+
+    def add(self, question: dict):
+        # Giống hệt json.dumps(questions, indent=4) nhưng không cần giữ cả danh sách. Chỉ thụt lề sau '\n':
+        # textwrap.indent tách dòng cả ở U+2028, U+0085... nằm nguyên trong chuỗi (ensure_ascii=False)
+        body = '\n'.join('    ' + line for line in json.dumps(question, ensure_ascii=False, indent=4).split('\n'))
+        self._file.write(f"{',' if self.count else ''}\n{body}")
+        self.count += 1
+
+    def commit(self) -> int:
+        self._file.write('\n]' if self.count else ']')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.chmod(self._tmp_path, 0o644)
+        with self.storage.lock(self.key):
+            os.replace(self._tmp_path, self.storage.quiz_path(self.key))
+        if self.title is not None:
+            self.storage._set_title(self.key, self.title)
+        self.storage._notify(self.key)
+        return self.count
+
+    def abort(self):
+        self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+
+class PackedStorage(FileStorage):
+    """
+    Như FileStorage nhưng mỗi bài là một tệp nhị phân <khóa>.qpk (xem quiz_pack.py), đọc qua mmap.
+
+    Đọc một câu hỏi không cần giải mã cả bài, và sửa câu hỏi chỉ ghép lại các byte có sẵn thay vì
+    phân tích và tuần tự hóa lại toàn bộ JSON; phù hợp với các ngân hàng hàng chục nghìn câu.
+    """
+    SUFFIX = PACKED_SUFFIX
+
+    def load_quiz(self, key: str) -> Optional[list]:
+        try:
+            with PackedQuiz.open(self.quiz_path(key)) as quiz:
+                return quiz.questions()
+        except FileNotFoundError:
+            return None
+
+    def load_question(self, key: str, question_id: int) -> Optional[dict]:
+        try:
+            with PackedQuiz.open(self.quiz_path(key)) as quiz:
+                return quiz.find(question_id)
+        except FileNotFoundError:
+            return None
+
+    def _write(self, key: str, questions: list):
+        atomic_write(self.quiz_path(key), encode_packed(questions))
+
+    def open_writer(self, key: str, title: Optional[str]) -> QuizWriter:
+        # Bảng bản ghi đứng trước vùng chuỗi nên phải có đủ câu hỏi mới ghi được tệp .qpk
+        return QuizWriter(self, key, title)
+
+    def update_questions(self, key: str, updates: dict) -> list:
+        with self.lock(key):
+            try:
+                with PackedQuiz.open(self.quiz_path(key)) as quiz:
+                    data, missing = quiz.with_updates(updates)
+            except FileNotFoundError:
+                raise KeyError(key)
+            if data is not None:
+                atomic_write(self.quiz_path(key), data)
+        if data is not None:
+            self._notify(key)
+        return missing
+
+
+# --- PHẦN 3: LƯU TRỮ BẰNG SQLITE ---
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS quizzes (
+    key TEXT PRIMARY KEY,
+    title TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS questions (
+    quiz_key TEXT NOT NULL REFERENCES quizzes(key) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    id INTEGER NOT NULL,
+    question TEXT NOT NULL,
+    options TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    explanation TEXT NOT NULL,
+    PRIMARY KEY (quiz_key, position)
+);
+CREATE INDEX IF NOT EXISTS idx_questions_quiz_id ON questions (quiz_key, id);
+"""
+
+QUESTION_COLUMNS = ('question', 'options', 'answer', 'explanation')
+
+
+class SQLiteStorage(QuizStorage):
+    """
+    Lưu tất cả bài trắc nghiệm trong một tệp SQLite ở chế độ WAL.
+
+    Sửa một câu hỏi chỉ ghi đúng một dòng, liệt kê chỉ cần một truy vấn, và người đọc
+    không bị chặn trong khi có người ghi. Mỗi luồng dùng một kết nối riêng.
+    """
+
+    def __init__(self, db_path: str):
+        super().__init__()
+        self.db_path = db_path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def list_quizzes(self) -> list:
+        rows = self._connect().execute("SELECT key FROM quizzes ORDER BY key").fetchall()
+        return [row[0] for row in rows]
+
+    def fingerprint(self):
+        return self._connect().execute("SELECT count(*), max(updated_at) FROM quizzes").fetchone()
+
+    def exists(self, key: str) -> bool:
+        row = self._connect().execute("SELECT 1 FROM quizzes WHERE key = ?", (key,)).fetchone()
+        return row is not None
+
+    def version(self, key: str) -> Optional[tuple]:
+        row = self._connect().execute("SELECT updated_at FROM quizzes WHERE key = ?", (key,)).fetchone()
+        return (row[0], row[0]) if row else None
+
+    def get_title(self, key: str) -> Optional[str]:
+        row = self._connect().execute("SELECT title FROM quizzes WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def load_quiz(self, key: str) -> Optional[list]:
+        conn = self._connect()
+        if not self.exists(key):
+            return None
+        rows = conn.execute(
+            "SELECT id, question, options, answer, explanation FROM questions "
+            "WHERE quiz_key = ? ORDER BY position", (key,)
+        ).fetchall()
+        return [
+            {
+                "id": question_id,
+                "question": question,
+                "options": json.loads(options),
+                "answer": answer,
+                "explanation": explanation
+            }
+            for question_id, question, options, answer, explanation in rows
+        ]
+
+    def load_question(self, key: str, question_id: int) -> Optional[dict]:
+        row = self._connect().execute(
+            "SELECT id, question, options, answer, explanation FROM questions "
+            "WHERE quiz_key = ? AND id = ? ORDER BY position LIMIT 1", (key, question_id)
+        ).fetchone()
+        if row is None:
+            return None
+        question_id, question, options, answer, explanation = row
+        return {"id": question_id, "question": question, "options": json.loads(options),
+                "answer": answer, "explanation": explanation}
+
+    def save_quiz(self, key: str, title: str, questions: list):
+        with self._connect() as conn:
+            self._save(conn, key, title, questions)
+        self._notify(key)
+
+    def save_many(self, quizzes) -> int:
+        # Toàn bộ trong một giao dịch: chỉ một lần fsync cho cả lô
+        saved = []
+        with self._connect() as conn:
+            for key, title, questions in quizzes:
+                self._save(conn, key, title, questions)
+                saved.append(key)
+        for key in saved:
+            self._notify(key)
+        return len(saved)
+
+    def _save(self, conn: sqlite3.Connection, key: str, title: str, questions: list):
+        conn.execute(
+            "INSERT INTO quizzes (key, title, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET title = excluded.title, updated_at = excluded.updated_at",
+            (key, title, time.time())
+        )
+        conn.execute("DELETE FROM questions WHERE quiz_key = ?", (key,))
+        conn.executemany(
+            "INSERT INTO questions (quiz_key, position, id, question, options, answer, explanation) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                (key, position, q['id'], q['question'], json.dumps(q['options'], ensure_ascii=False),
+                 q['answer'], q['explanation'])
+                for position, q in enumerate(questions)
+            )
+        )
+
+    def update_questions(self, key: str, updates: dict) -> list:
+        missing = []
+        with self._connect() as conn:
+            if not self.exists(key):
+                raise KeyError(key)
+            for question_id, fields in updates.items():
+                columns = [column for column in QUESTION_COLUMNS if column in fields]
+                values = [
+                    json.dumps(fields[column], ensure_ascii=False) if column == 'options' else fields[column]
+                    for column in columns
+                ]
+                # Giống bản lưu bằng tệp: nếu trùng ID thì chỉ sửa câu hỏi xuất hiện đầu tiên
+                cursor = conn.execute(
+                    f"UPDATE questions SET {', '.join(f'{c} = ?' for c in columns)} "
+                    "WHERE quiz_key = ? AND position = "
+                    "(SELECT min(position) FROM questions WHERE quiz_key = ? AND id = ?)",
+                    (*values, key, key, question_id)
+                )
+                if cursor.rowcount == 0:
+                    missing.append(question_id)
+            if len(missing) < len(updates):
+                conn.execute("UPDATE quizzes SET updated_at = ? WHERE key = ?", (time.time(), key))
+        if len(missing) < len(updates):
+            self._notify(key)
+        return missing
+
+    def edit_quiz(self, key: str, edit) -> bool:
+        with self._connect() as conn:
+            # Giữ khóa ghi từ lúc đọc để không ai ghi chen vào trước khi giao dịch hoàn tất
+            conn.execute("BEGIN IMMEDIATE")
+            questions = self.load_quiz(key)
+            if questions is None:
+                raise KeyError(key)
+            edited = edit(questions)
+            if edited is not None:
+                self._save(conn, key, self.get_title(key), edited)
+        if edited is not None:
+            self._notify(key)
+        return edited is not None
+
+    def delete_quiz(self, key: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM quizzes WHERE key = ?", (key,))
+        self._notify(key)
+
+
+# --- PHẦN 4: KHỞI TẠO THEO CẤU HÌNH ---
+SQLITE_FILENAME = 'quizzes.sqlite3'
+
+
+def open_storage(kind: str, data_dir: str) -> QuizStorage:
+    """Tạo backend lưu trữ theo tên cấu hình: 'file' (mặc định), 'packed' hoặc 'sqlite'."""
+    if kind == 'sqlite':
+        return SQLiteStorage(os.path.join(data_dir, SQLITE_FILENAME))
+    if kind == 'file':
+        return FileStorage(data_dir)
+    if kind == 'packed':
+        return PackedStorage(data_dir)
+    raise ValueError(f"Kiểu lưu trữ không hợp lệ: {kind}")
@@ -0,0 +1,311 @@
+// Service worker của trang làm bài, được Flask render từ template này tại /quiz-sw.js.
+//
+// - Trang /data/<khóa>.html được trả ngay từ bộ nhớ đệm rồi kiểm tra lại ngầm (ETag, tối đa một lần
+//   mỗi SHELL_REVALIDATE_SECONDS giây); trang mới chứa phiên bản JSON mới nên lần mở sau dùng bản mới.
+// - Các URL có ?v=<phiên bản> không bao giờ đổi nội dung nên được lấy từ bộ nhớ đệm trước. Khi trang
+//   báo phiên bản đang dùng, JSON đầy đủ của bài được tải sẵn để dựng thứ tự xáo trộn và các trang câu
+//   hỏi ngay trong service worker: những lần mở sau không cần gọi máy chủ, kể cả khi mất mạng.
+// - Góp ý gửi lúc mất mạng được lưu trong IndexedDB và gửi lại theo lô qua /suggest-update/batch
+//   khi có mạng (Background Sync nếu trình duyệt hỗ trợ, hoặc khi trang báo đã online).
+const SHELL_CACHE = 'quiz-shell-v1';
+const DATA_CACHE = 'quiz-data-v1';
+const SHELL_REVALIDATE_SECONDS = {{ SHELL_REVALIDATE_SECONDS }};
+const SUGGESTION_BATCH_SIZE = {{ SUGGESTION_BATCH_SIZE }};
+const SYNC_TAG = 'quiz-suggestions';
+// Seed do service worker tự chọn nằm ngoài khoảng seed của máy chủ (0 .. 2^31 - 1)
+const LOCAL_SEED_BASE = 2 ** 31;
+// Số thứ tự xáo trộn cục bộ (mỗi lần mở bài một thứ tự) được giữ lại cho mỗi bài
+const MAX_LOCAL_ORDERS = 5;
+
+const lastRevalidated = new Map();
+
+self.addEventListener('install', () => self.skipWaiting());
+
+self.addEventListener('activate', (event) => {
+    event.waitUntil((async () => {
+        const keep = [SHELL_CACHE, DATA_CACHE];
+        for (const name of await caches.keys()) {
+            if (!keep.includes(name)) await caches.delete(name);
+        }
+        await self.clients.claim();
+        await flushSuggestions();
+    })());
+});
+
+// --- PHẦN 1: BỘ NHỚ ĐỆM THEO PHIÊN BẢN ---
+function canonical(url) {
+    const parsed = new URL(url, self.location.origin);
+    parsed.searchParams.sort();
+    return parsed.toString();
+}
+
+function jsonResponse(data, status = 200) {
+    return new Response(JSON.stringify(data), { status, headers: { 'Content-Type': 'application/json' } });
+}
+
+async function cached(cacheName, url) {
+    const cache = await caches.open(cacheName);
+    return cache.match(canonical(url), { ignoreVary: true });
+}
+
+async function fetchAndCache(cacheName, request, url = typeof request === 'string' ? request : request.url) {
+    const response = await fetch(request);
+    if (response.ok) {
+        const cache = await caches.open(cacheName);
+        await cache.put(canonical(url), response.clone());
+    }
+    return response;
+}
+
+function fullJsonUrl(key, version) {
+    return `/data/${key}.json?v=${version}`;
+}
+
+function outlineUrl(key, params) {
+    return `/api/quiz/${key}?${new URLSearchParams(params)}`;
+}
+
+async function serveShell(event) {
+    const hit = await cached(SHELL_CACHE, event.request.url);
+    if (!hit) return fetchAndCache(SHELL_CACHE, event.request);
+    const now = Date.now();
+    if (now - (lastRevalidated.get(event.request.url) || 0) > SHELL_REVALIDATE_SECONDS * 1000) {
+        lastRevalidated.set(event.request.url, now);
+        event.waitUntil(revalidateShell(event.request.url).catch(() => {}));
+    }
+    return hit;
+}
+
+async function revalidateShell(url) {
+    const response = await fetchAndCache(SHELL_CACHE, url);
+    if (response.status === 404) {
+        // Bài đã bị xóa: không giữ trang cũ nữa
+        const cache = await caches.open(SHELL_CACHE);
+        await cache.delete(canonical(url));
+    }
+}
+
+async function serveOutline(request, key, url) {
+    // /api/quiz/<khóa>?v=..&size=..: thứ tự xáo trộn mới mỗi lần mở, dựng từ JSON đầy đủ đã tải sẵn
+    const hit = await cached(DATA_CACHE, url);
+    if (hit) return hit;
+    const params = url.searchParams;
+    const version = params.get('v');
+    if (version && !params.has('seed') && params.get('shuffle') !== '0') {
+        const size = params.get('size');
+        const base = await cached(DATA_CACHE, outlineUrl(key, { v: version, size, shuffle: '0' }));
+        const full = await cached(DATA_CACHE, fullJsonUrl(key, version));
+        if (base && full) {
+            const outline = await base.json();
+            const order = outline.order.slice();
+            for (let i = order.length - 1; i > 0; i--) {
+                const j = Math.floor(Math.random() * (i + 1));
+                [order[i], order[j]] = [order[j], order[i]];
+            }
+            outline.order = order;
+            outline.seed = LOCAL_SEED_BASE + Math.floor(Math.random() * 2 ** 31);
+            const response = jsonResponse(outline);
+            // Lưu theo seed để các trang câu hỏi của lượt này được dựng theo đúng thứ tự trên
+            const cache = await caches.open(DATA_CACHE);
+            await cache.put(canonical(outlineUrl(key, { v: version, size, seed: outline.seed })), response.clone());
+            await pruneLocalOrders(cache, key);
+            return response;
+        }
+    }
+    const cacheable = version && (params.has('seed') || params.get('shuffle') === '0');
+    return cacheable ? fetchAndCache(DATA_CACHE, request) : fetch(request);
+}
+
+async function pruneLocalOrders(cache, key) {
+    // cache.keys() trả về theo thứ tự được thêm vào nên các seed đầu danh sách là cũ nhất
+    const requests = (await cache.keys()).filter(request => {
+        const url = new URL(request.url);
+        const path = decodeURIComponent(url.pathname);
+        return (path === `/api/quiz/${key}` || path.startsWith(`/api/quiz/${key}/`))
+            && Number(url.searchParams.get('seed')) >= LOCAL_SEED_BASE;
+    });
+    const seeds = [...new Set(requests.map(request => new URL(request.url).searchParams.get('seed')))];
+    const stale = new Set(seeds.slice(0, Math.max(0, seeds.length - MAX_LOCAL_ORDERS)));
+    for (const request of requests) {
+        if (stale.has(new URL(request.url).searchParams.get('seed'))) await cache.delete(request);
+    }
+}
+
+async function servePage(request, key, page, url) {
+    const hit = await cached(DATA_CACHE, url);
+    if (hit) return hit;
+    const params = url.searchParams;
+    const version = params.get('v');
+    const size = params.get('size');
+    const seed = params.get('seed');
+    const outline = await cached(DATA_CACHE, outlineUrl(key, seed === null
+        ? { v: version, size, shuffle: '0' } : { v: version, size, seed }));
+    const full = outline && await cached(DATA_CACHE, fullJsonUrl(key, version));
+    if (!outline || !full) {
+        if (seed !== null && Number(seed) >= LOCAL_SEED_BASE) {
+            // Thứ tự của seed cục bộ chỉ có trong bộ nhớ đệm này; máy chủ sẽ xáo trộn khác đi
+            return jsonResponse({ success: false, message: 'Dữ liệu ngoại tuyến của bài đã bị xóa, vui lòng tải lại trang.' }, 404);
+        }
+        return fetchAndCache(DATA_CACHE, request);
+    }
+    const { order, page_size: pageSize, pages } = await outline.json();
+    if (page >= pages) return jsonResponse({ success: false, message: `Không có trang ${page}.` }, 404);
+    const questions = await full.json();
+    const byId = new Map();
+    for (const question of questions) {
+        if (!byId.has(question.id)) byId.set(question.id, question);
+    }
+    const slice = order.slice(page * pageSize, (page + 1) * pageSize).map(id => byId.get(id));
+    const response = jsonResponse({ page, pages, page_size: pageSize, questions: slice });
+    const cache = await caches.open(DATA_CACHE);
+    await cache.put(canonical(url), response.clone());
+    return response;
+}
+
+async function precache(key, version, size) {
+    // JSON đầy đủ và thứ tự gốc của phiên bản đang dùng; xóa các phiên bản cũ của cùng bài
+    const cache = await caches.open(DATA_CACHE);
+    const urls = [fullJsonUrl(key, version), outlineUrl(key, { v: version, size, shuffle: '0' })];
+    for (const url of urls) {
+        if (!await cache.match(canonical(url), { ignoreVary: true })) await fetchAndCache(DATA_CACHE, url);
+    }
+    for (const request of await cache.keys()) {
+        const url = new URL(request.url);
+        const path = decodeURIComponent(url.pathname);
+        const sameQuiz = path === `/data/${key}.json` || path === `/api/quiz/${key}`
+            || path.startsWith(`/api/quiz/${key}/page/`);
+        if (sameQuiz && url.searchParams.get('v') !== version) await cache.delete(request);
+    }
+}
+
+// --- PHẦN 2: HÀNG ĐỢI GÓP Ý TRONG INDEXEDDB ---
+function openQueue() {
+    return new Promise((resolve, reject) => {
+        const open = indexedDB.open('quiz-offline', 1);
+        open.onupgradeneeded = () => open.result.createObjectStore('suggestions', { autoIncrement: true });
+        open.onsuccess = () => resolve(open.result);
+        open.onerror = () => reject(open.error);
+    });
+}
+
+async function queueTransaction(mode, work) {
+    const db = await openQueue();
+    return new Promise((resolve, reject) => {
+        const transaction = db.transaction('suggestions', mode);
+        work(transaction.objectStore('suggestions'));
+        transaction.oncomplete = () => { db.close(); resolve(); };
+        transaction.onerror = () => { db.close(); reject(transaction.error); };
+    });
+}
+
+function queueSuggestion(payload) {
+    return queueTransaction('readwrite', store => store.add(payload));
+}
+
+async function queuedSuggestions() {
+    const db = await openQueue();
+    return new Promise((resolve, reject) => {
+        const items = [];
+        const request = db.transaction('suggestions').objectStore('suggestions').openCursor();
+        request.onsuccess = () => {
+            const cursor = request.result;
+            if (!cursor || items.length >= SUGGESTION_BATCH_SIZE) {
+                db.close();
+                resolve(items);
+                return;
+            }
+            items.push({ id: cursor.key, payload: cursor.value });
+            cursor.continue();
+        };
+        request.onerror = () => { db.close(); reject(request.error); };
+    });
+}
+
+function removeSuggestions(ids) {
+    return queueTransaction('readwrite', store => ids.forEach(id => store.delete(id)));
+}
+
+let flushing = null;
+
+function flushSuggestions() {
+    // Chỉ một lần gửi lại chạy tại một thời điểm; mỗi lô là một request
+    if (!flushing) {
+        flushing = (async () => {
+            for (;;) {
+                const items = await queuedSuggestions();
+                if (!items.length) return;
+                let response;
+                try {
+                    response = await fetch('/suggest-update/batch', {
+                        method: 'POST',
+                        headers: { 'Content-Type': 'application/json' },
+                        body: JSON.stringify({ suggestions: items.map(item => item.payload) })
+                    });
+                } catch (error) {
+                    return; // Vẫn mất mạng: giữ nguyên hàng đợi
+                }
+                // Lỗi 5xx: thử lại cả lô sau; lỗi 4xx của từng góp ý thì không gửi lại được nữa
+                if (response.status >= 500) return;
+                await removeSuggestions(items.map(item => item.id));
+            }
+        })().finally(() => { flushing = null; });
+    }
+    return flushing;
+}
+
+async function submitSuggestion(event) {
+    const payload = await event.request.clone().json();
+    try {
+        const response = await fetch(event.request);
+        // Có mạng trở lại: gửi luôn các góp ý còn trong hàng đợi
+        event.waitUntil(flushSuggestions());
+        return response;
+    } catch (error) {
+        await queueSuggestion(payload);
+        if (self.registration.sync) {
+            await self.registration.sync.register(SYNC_TAG).catch(() => {});
+        }
+        return jsonResponse({
+            success: true,
+            queued: true,
+            message: 'Không có kết nối: góp ý đã được lưu và sẽ tự động gửi khi có mạng.'
+        }, 202);
+    }
+}
+
+// --- PHẦN 3: SỰ KIỆN ---
+self.addEventListener('fetch', (event) => {
+    const request = event.request;
+    const url = new URL(request.url);
+    if (url.origin !== self.location.origin) return;
+
+    if (request.method === 'POST' && url.pathname === '/suggest-update') {
+        event.respondWith(submitSuggestion(event));
+        return;
+    }
+    if (request.method !== 'GET') return;
+
+    let match;
+    if (/^\/data\/[^/]+\.html$/.test(url.pathname)) {
+        event.respondWith(serveShell(event));
+    } else if ((match = url.pathname.match(/^\/api\/quiz\/([^/]+)$/))) {
+        event.respondWith(serveOutline(request, decodeURIComponent(match[1]), url));
+    } else if ((match = url.pathname.match(/^\/api\/quiz\/([^/]+)\/page\/(\d+)$/))) {
+        event.respondWith(servePage(request, decodeURIComponent(match[1]), Number(match[2]), url));
+    } else if (url.searchParams.has('v') && /^\/data\/[^/]+\.json$/.test(url.pathname)) {
+        event.respondWith(cached(DATA_CACHE, url).then(hit => hit || fetchAndCache(DATA_CACHE, request)));
+    }
+});
+
+self.addEventListener('message', (event) => {
+    const data = event.data || {};
+    if (data.type === 'precache') {
+        event.waitUntil(precache(data.key, data.version, String(data.size)).catch(() => {}));
+    } else if (data.type === 'flush') {
+        event.waitUntil(flushSuggestions());
+    }
+});
+
+self.addEventListener('sync', (event) => {
+    if (event.tag === SYNC_TAG) event.waitUntil(flushSuggestions());
+});
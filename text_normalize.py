@@ -0,0 +1,44 @@
+"""
+Chuẩn hóa văn bản tiếng Việt: bỏ dấu cho tìm kiếm và chuyển tên môn/bài thành tên tệp.
+
+Việc bỏ dấu dùng một bảng str.translate dựng sẵn một lần thay vì một lượt re.sub cho mỗi nguyên âm,
+và nhận cả chữ hoa lẫn văn bản ở dạng tổ hợp NFD (chữ cái gốc + dấu rời, thường gặp khi sao chép
+từ macOS hoặc một số trình soạn thảo), cho cùng kết quả với dạng dựng sẵn NFC.
+"""
+import re
+import string
+from functools import lru_cache
+
+# Các nhóm chữ cái có dấu và chữ cái không dấu tương ứng (sau khi đã chuyển về chữ thường)
+DIACRITIC_GROUPS = {
+    'a': 'àáạảãâầấậẩẫăằắặẳẵ',
+    'e': 'èéẹẻẽêềếệểễ',
+    'i': 'ìíịỉĩ',
+    'o': 'òóọỏõôồốộổỗơờớợởỡ',
+    'u': 'ùúụủũưừứựửữ',
+    'y': 'ỳýỵỷỹ',
+    'd': 'đ',
+}
+# Các dấu rời của tiếng Việt ở dạng NFD: huyền, sắc, ngã, hỏi, nặng, mũ, trăng, móc
+COMBINING_MARKS = '\u0300\u0301\u0303\u0309\u0323\u0302\u0306\u031b'
+
+FOLD_TABLE = str.maketrans(
+    {char: base for base, chars in DIACRITIC_GROUPS.items() for char in chars}
+    | dict.fromkeys(COMBINING_MARKS)
+)
+WHITESPACE_RE = re.compile(r'\s+')
+INVALID_FILENAME_RE = re.compile('[^%s]' % re.escape("-_.() " + string.ascii_letters + string.digits))
+# Số tên khác nhau được nhớ kết quả chuẩn hóa
+NAME_CACHE_SIZE = 4096
+
+
+def fold_diacritics(text: str) -> str:
+    """Chuyển về chữ thường và bỏ dấu tiếng Việt ('Đáp Án' -> 'dap an'), dùng cho tên tệp và tìm kiếm."""
+    # lower() trước để chữ hoa có dấu thành chữ thường có dấu, rồi bỏ dấu trong một lượt
+    return text.lower().translate(FOLD_TABLE)
+
+
+@lru_cache(maxsize=NAME_CACHE_SIZE)
+def sanitize_filename(name: str) -> str:
+    """Chuẩn hóa chuỗi thành tên tệp hợp lệ ('Lịch Sử' -> 'lich_su'); kết quả được nhớ theo tên."""
+    return INVALID_FILENAME_RE.sub('', WHITESPACE_RE.sub('_', fold_diacritics(name)))
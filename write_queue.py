@@ -0,0 +1,129 @@
+import logging
+import threading
+import time
+
+from storage import QuizStorage
+
+# Lô bị lỗi khi ghi được xếp lại và ghi thử sau RETRY_BASE_DELAY * 2^(n-1) giây (tối đa RETRY_MAX_DELAY);
+# sau MAX_ATTEMPTS lần lỗi liên tiếp thì bỏ và ghi log lỗi kèm khóa bài và ID câu hỏi
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 60.0
+MAX_ATTEMPTS = 5
+
+
+class WriteBehindQueue:
+    """
+    Hàng đợi ghi trễ cho các góp ý sửa câu hỏi.
+
+    Các góp ý cho cùng một bài trong khoảng `delay` giây được gộp lại (góp ý sau cùng cho một
+    câu hỏi sẽ thắng) và ghi xuống backend lưu trữ bằng đúng một lần ghi cho mỗi bài, thay vì
+    ghi lại toàn bộ tệp sau mỗi lần bấm. Việc ghi vẫn đi qua khóa theo bài của backend nên
+    an toàn khi có nhiều tiến trình. Nếu backend báo lỗi, lô được xếp lại để ghi thử sau.
+    """
+
+    def __init__(self, storage: QuizStorage, delay: float, logger: logging.Logger = None):
+        self.storage = storage
+        self.delay = delay
+        self.logger = logger or logging.getLogger(__name__)
+        self._cond = threading.Condition()
+        # khóa bài -> {question_id: fields}
+        self._pending = {}
+        # khóa bài -> thời điểm (monotonic) phải ghi xuống
+        self._deadlines = {}
+        # khóa bài -> số lần ghi lỗi liên tiếp
+        self._attempts = {}
+        self._thread = None
+        # Giữ thứ tự ghi: một lô chỉ được ghi sau khi lô lấy ra trước nó đã ghi xong
+        self._apply_lock = threading.Lock()
+
+    def submit(self, key: str, question_id: int, fields: dict):
+        """Đưa một cập nhật vào hàng đợi; trả về ngay, không chờ ghi xuống đĩa."""
+        with self._cond:
+            updates = self._pending.setdefault(key, {})
+            updates.setdefault(question_id, {}).update(fields)
+            if key not in self._deadlines:
+                self._deadlines[key] = time.monotonic() + self.delay
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def pending_count(self) -> int:
+        with self._cond:
+            return sum(len(updates) for updates in self._pending.values())
+
+    def is_pending(self, key: str) -> bool:
+        """Bài có thể còn góp ý chưa ghi hay không (không chờ khóa; True cả khi đang có một lô được ghi)."""
+        return key in self._pending or self._apply_lock.locked()
+
+    def flush(self, key: str = None):
+        """Ghi ngay các cập nhật đang chờ của một bài (hoặc của tất cả các bài nếu key là None)."""
+        with self._apply_lock:
+            with self._cond:
+                keys = list(self._pending) if key is None else ([key] if key in self._pending else [])
+                batches = [(k, self._take(k)) for k in keys]
+            for k, updates in batches:
+                self._apply(k, updates)
+
+    def _take(self, key: str) -> dict:
+        self._deadlines.pop(key, None)
+        return self._pending.pop(key)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if not self._deadlines:
+                        self._cond.wait()
+                        continue
+                    remaining = min(self._deadlines.values()) - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            self._flush_due()
+
+    def _flush_due(self):
+        with self._apply_lock:
+            with self._cond:
+                now = time.monotonic()
+                due = [k for k, deadline in self._deadlines.items() if deadline <= now]
+                batches = [(k, self._take(k)) for k in due]
+            for key, updates in batches:
+                self._apply(key, updates)
+
+    def _apply(self, key: str, updates: dict):
+        try:
+            missing = self.storage.update_questions(key, updates)
+        except KeyError:
+            self.logger.warning("Bỏ qua %d góp ý (câu %s): bài trắc nghiệm '%s' không còn tồn tại.",
+                                len(updates), list(updates), key)
+            missing = None
+        except Exception as e:
+            self._retry(key, updates, e)
+            return
+        with self._cond:
+            self._attempts.pop(key, None)
+        if missing:
+            self.logger.warning("Không tìm thấy câu hỏi %s trong bài '%s', bỏ qua các góp ý này.", missing, key)
+
+    def _retry(self, key: str, updates: dict, error: Exception):
+        """Xếp lại một lô ghi lỗi; góp ý mới hơn cho cùng câu hỏi (gửi trong lúc ghi) vẫn được ưu tiên."""
+        with self._cond:
+            attempts = self._attempts.get(key, 0) + 1
+            if attempts >= MAX_ATTEMPTS:
+                self._attempts.pop(key, None)
+                self.logger.error("Bỏ %d góp ý của bài '%s' (câu %s) sau %d lần ghi lỗi: %s",
+                                  len(updates), key, list(updates), attempts, error)
+                return
+            self._attempts[key] = attempts
+            pending = self._pending.setdefault(key, {})
+            for question_id, fields in updates.items():
+                pending[question_id] = {**fields, **pending.get(question_id, {})}
+            delay = min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY)
+            self._deadlines[key] = time.monotonic() + delay
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        self.logger.warning("Lỗi khi ghi %d góp ý cho bài '%s' (câu %s), thử lại sau %g giây: %s",
+                            len(updates), key, list(updates), delay, error)